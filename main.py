@@ -1,6 +1,6 @@
 from ncatbot.core import BotClient
 
-bot = BotClient()
-
+# 分片进程池的工作进程会重新导入本模块，机器人只在主进程中创建
 if __name__ == "__main__":
+    bot = BotClient()
     bot.run_frontend()
@@ -0,0 +1 @@
+"""插件共享模块（非插件，需在 plugin_blacklist 中排除以免被重复加载）"""
@@ -0,0 +1,146 @@
+"""tracemalloc 内存分配统计"""
+
+import os
+import sysconfig
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+# 插件目录，其下一级目录名即插件名
+_PLUGINS_DIR = Path(__file__).resolve().parent.parent
+_PLUGINS_PREFIX = str(_PLUGINS_DIR) + os.sep
+_STDLIB_DIR = Path(sysconfig.get_paths()["stdlib"]).resolve()
+
+# 统计时排除 tracemalloc 自身、本模块和导入机制的分配
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__, all_frames=True),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def _owner(filename: str) -> str:
+    """分配所在文件的归属: 插件名 / 第三方包名 / stdlib"""
+    path = Path(filename)
+    parts = path.parts
+    if "site-packages" in parts:
+        index = parts.index("site-packages")
+        if index + 1 < len(parts):
+            return Path(parts[index + 1]).stem
+    if path.is_relative_to(_PLUGINS_DIR):
+        return path.relative_to(_PLUGINS_DIR).parts[0]
+    if path.is_relative_to(_STDLIB_DIR):
+        return "stdlib"
+    return path.name
+
+
+def _attribute(traceback: tracemalloc.Traceback) -> tracemalloc.Frame:
+    """分配计入的帧: 调用栈中最内层的插件代码，没有则为分配发生处
+
+    插件调用 json、sqlite3 等库时，分配发生在库的文件中，按发生处统计
+    会全部算到库上，看不出是哪个插件引起的。
+    """
+    # Traceback 从最外层排到最内层
+    for frame in reversed(traceback):
+        if frame.filename.startswith(_PLUGINS_PREFIX):
+            return frame
+    return traceback[-1]
+
+
+def _by_frame(snapshot: tracemalloc.Snapshot) -> dict[tuple[str, int], list[int]]:
+    """按 _attribute 的帧汇总 {(文件, 行号): [大小, 个数]}"""
+    totals: dict[tuple[str, int], list[int]] = {}
+    for stat in snapshot.statistics("traceback"):
+        frame = _attribute(stat.traceback)
+        entry = totals.setdefault((frame.filename, frame.lineno), [0, 0])
+        entry[0] += stat.size
+        entry[1] += stat.count
+    return totals
+
+
+def _location(filename: str, lineno: int) -> str:
+    return f"{_owner(filename)}/{Path(filename).name}:{lineno}"
+
+
+def _format_size(size: float) -> str:
+    if abs(size) < 1024:
+        return f"{size:.0f}B"
+    for unit in ("KB", "MB", "GB"):
+        size /= 1024
+        if abs(size) < 1024 or unit == "GB":
+            return f"{size:.1f}{unit}"
+
+
+class MemoryTracker:
+    """按插件汇总 Python 对象分配，并对比相邻两次快照的增长
+
+    tracemalloc 开启后每次分配都要记录调用位置，内存和 CPU 开销都不小，
+    因此默认关闭，排查时再开启。只统计开启之后的分配。记录 nframes 层
+    调用栈，每次分配计入栈中最内层的插件代码。
+    """
+
+    def __init__(self, nframes: int = 25):
+        self.nframes = nframes
+        self._last: Optional[dict[tuple[str, int], list[int]]] = None
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframes)
+        self._last = None
+
+    def stop(self):
+        tracemalloc.stop()
+        self._last = None
+
+    def report(self, limit: int = 10) -> list[str]:
+        """当前分配按插件和代码行排行，以及自上次报告以来增长最多的代码行"""
+        if not tracemalloc.is_tracing():
+            return ["内存追踪未开启"]
+        snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        totals = _by_frame(snapshot)
+        del snapshot
+
+        by_owner: Counter = Counter()
+        for (filename, _), (size, _) in totals.items():
+            by_owner[_owner(filename)] += size
+
+        lines = [
+            f"已追踪 {_format_size(current)}，峰值 {_format_size(peak)}，"
+            f"追踪开销 {_format_size(tracemalloc.get_tracemalloc_memory())}",
+            "按模块:",
+            *(f"  {_format_size(size):>9} {owner}" for owner, size in by_owner.most_common(limit)),
+            "按代码行:",
+        ]
+        top = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        for (filename, lineno), (size, count) in top:
+            lines.append(f"  {_format_size(size):>9} {count:>7}个 {_location(filename, lineno)}")
+
+        if self._last is not None:
+            growth = []
+            for key, (size, count) in totals.items():
+                last_size, last_count = self._last.get(key, (0, 0))
+                if size > last_size:
+                    growth.append((size - last_size, count - last_count, key))
+            growth.sort(reverse=True)
+            lines.append("自上次报告增长:")
+            lines += [
+                f"  {_format_size(size_diff):>9} {count_diff:>+7}个 {_location(*key)}"
+                for size_diff, count_diff, key in growth[:limit]
+            ] or ["  无"]
+        # 只保留最近一次的汇总用于下次对比，不必保留整个快照
+        self._last = totals
+        return lines
+
+
+# 全局共享实例
+memory_tracker = MemoryTracker()
+
+__all__ = ["MemoryTracker", "memory_tracker"]
@@ -0,0 +1,314 @@
+"""机器人进程运行指标"""
+
+import time
+import types
+import asyncio
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+import psutil
+
+# 延迟直方图桶上界(毫秒)，约 1.5 倍递增
+_BUCKETS_MS = [
+    0.1, 0.25, 0.5, 1, 1.5, 2.5, 4, 6, 10, 15, 25, 40, 60, 100, 150,
+    250, 400, 600, 1000, 1500, 2500, 4000, 6000, 10000, 30000, 60000,
+]
+
+
+class LatencyHistogram:
+    """固定桶的延迟直方图，记录 O(log 桶数)，百分位取所在桶上界"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, ms: float):
+        self.counts[bisect_left(_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(_BUCKETS_MS[i], self.max) if i < len(_BUCKETS_MS) else self.max
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class _CallCost:
+    """单次处理函数调用的 CPU 时间和 API 等待累计"""
+
+    __slots__ = ("cpu", "api_ms", "api_calls")
+
+    def __init__(self):
+        self.cpu = 0.0
+        self.api_ms = 0.0
+        self.api_calls = 0
+
+
+# 当前处理函数调用的累计，API 调用据此归属到发起它的处理函数
+_current_cost: ContextVar[Optional[_CallCost]] = ContextVar("current_cost", default=None)
+
+
+@types.coroutine
+def _cpu_timed(awaitable, cost: _CallCost):
+    """逐步驱动协程，只累计它自身每一步占用的线程 CPU 时间
+
+    挂起等待期间其它任务的 CPU 时间不计入。
+    """
+    it = awaitable.__await__()
+    value, error = None, None
+    while True:
+        start = time.thread_time()
+        try:
+            yielded = it.send(value) if error is None else it.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            cost.cpu += time.thread_time() - start
+        value = error = None
+        try:
+            value = yield yielded
+        except GeneratorExit:
+            it.close()
+            raise
+        except BaseException as e:
+            error = e
+
+
+class HandlerStats:
+    """单个处理函数的耗时分布: 墙钟、CPU、API 等待和其余(本地)时间"""
+
+    __slots__ = ("wall", "cpu", "api", "local", "api_calls")
+
+    def __init__(self):
+        self.wall = LatencyHistogram()
+        self.cpu = LatencyHistogram()
+        self.api = LatencyHistogram()
+        self.local = LatencyHistogram()
+        self.api_calls = 0
+
+    def record(self, wall_ms: float, cost: _CallCost):
+        self.wall.record(wall_ms)
+        self.cpu.record(cost.cpu * 1000)
+        self.api.record(cost.api_ms)
+        self.local.record(max(0.0, wall_ms - cost.api_ms))
+        self.api_calls += cost.api_calls
+
+    @property
+    def count(self) -> int:
+        return self.wall.count
+
+
+class BotMetrics:
+    """事件循环延迟、处理函数耗时和进程资源"""
+
+    def __init__(self, lag_interval: float = 0.5):
+        self.lag_interval = lag_interval
+        self.loop_lag = LatencyHistogram()
+        self.last_lag_ms = 0.0
+        self.handlers: dict[tuple[str, str], HandlerStats] = {}
+        self.api_calls: dict[str, LatencyHistogram] = {}
+        self.in_flight = 0
+        self._lag_task: Optional[asyncio.Task] = None
+        self._process = psutil.Process()
+
+    # ========== 事件循环延迟 ==========
+
+    def start(self):
+        if self._lag_task is None:
+            self._lag_task = asyncio.create_task(self._monitor_lag())
+
+    async def stop(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            await asyncio.gather(self._lag_task, return_exceptions=True)
+            self._lag_task = None
+
+    async def _monitor_lag(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, (time.perf_counter() - start - self.lag_interval) * 1000)
+            self.last_lag_ms = lag
+            self.loop_lag.record(lag)
+
+    # ========== 处理函数耗时 ==========
+
+    def record_handler(self, plugin: str, handler: str, ms: float, cost: Optional[_CallCost] = None):
+        key = (plugin, handler)
+        stats = self.handlers.get(key)
+        if stats is None:
+            stats = self.handlers[key] = HandlerStats()
+        stats.record(ms, cost or _CallCost())
+
+    def record_api(self, action: str, ms: float):
+        hist = self.api_calls.get(action)
+        if hist is None:
+            hist = self.api_calls[action] = LatencyHistogram()
+        hist.record(ms)
+        cost = _current_cost.get()
+        if cost is not None:
+            cost.api_ms += ms
+            cost.api_calls += 1
+
+    def install(self, api=None):
+        """为 ncatbot 的命令和事件处理函数分发加上计时，重复调用无副作用
+
+        所有命令、on_message 与 on_notice/on_request 处理函数都经由
+        UnifiedRegistryPlugin._execute_function 调用。被过滤器拦截或抛出异常时
+        该方法返回 False，这类调用不计入耗时。传入 api 时同时为 API 调用计时，
+        等待时间计入发起调用的处理函数。
+        """
+        from ncatbot.plugin_system.builtin_plugin.unified_registry.plugin import (
+            UnifiedRegistryPlugin,
+        )
+
+        metrics = self
+        original = UnifiedRegistryPlugin._execute_function
+        if getattr(original, "__metrics__", None) is not self:
+            # 插件重载后替换旧实例的包装
+            if hasattr(original, "__metrics__"):
+                original = original.__wrapped__
+
+            async def _execute_function(registry, func, *args, **kwargs):
+                metrics.in_flight += 1
+                cost = _CallCost()
+                token = _current_cost.set(cost)
+                start = time.perf_counter()
+                try:
+                    result = await _cpu_timed(original(registry, func, *args, **kwargs), cost)
+                finally:
+                    _current_cost.reset(token)
+                    metrics.in_flight -= 1
+                if result is not False:
+                    plugin = registry._find_plugin_for_function(func)
+                    metrics.record_handler(
+                        plugin.name if plugin else "ncatbot",
+                        func.__name__,
+                        (time.perf_counter() - start) * 1000,
+                        cost,
+                    )
+                return result
+
+            _execute_function.__wrapped__ = original
+            _execute_function.__metrics__ = self
+            UnifiedRegistryPlugin._execute_function = _execute_function
+
+        if api is None:
+            return
+        callback = api.async_callback
+        if getattr(callback, "__metrics__", None) is not self:
+            if hasattr(callback, "__metrics__"):
+                callback = callback.__wrapped__
+
+            async def async_callback(path: str, params: dict = None, *args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await callback(path, params, *args, **kwargs)
+                finally:
+                    metrics.record_api(path.strip("/"), (time.perf_counter() - start) * 1000)
+
+            async_callback.__wrapped__ = callback
+            async_callback.__metrics__ = self
+            api.async_callback = async_callback
+
+    def reset(self):
+        self.loop_lag = LatencyHistogram()
+        self.handlers.clear()
+        self.api_calls.clear()
+
+    # ========== 进程资源 ==========
+
+    def process_stats(self) -> dict:
+        with self._process.oneshot():
+            stats = {
+                "rss": self._process.memory_info().rss,
+                "threads": self._process.num_threads(),
+                "tasks": len(asyncio.all_tasks()),
+            }
+            try:
+                stats["fds"] = self._process.num_fds()
+            except AttributeError:
+                stats["fds"] = None  # Windows 无 FD 统计
+        return stats
+
+    # ========== 报告 ==========
+
+    def summary(self) -> list[str]:
+        """用于 /status 的简要指标"""
+        p = self.process_stats()
+        fds = p["fds"] if p["fds"] is not None else "-"
+        total = LatencyHistogram()
+        for hist in (stats.wall for stats in self.handlers.values()):
+            for i, n in enumerate(hist.counts):
+                total.counts[i] += n
+            total.count += hist.count
+            total.max = max(total.max, hist.max)
+        return [
+            f"事件循环延迟: {self.last_lag_ms:.1f}ms "
+            f"(p99 {self.loop_lag.percentile(99):.0f}ms, 最大 {self.loop_lag.max:.0f}ms)",
+            f"处理函数: {total.count}次 p50 {total.percentile(50):.0f}ms "
+            f"p99 {total.percentile(99):.0f}ms, 处理中 {self.in_flight}",
+            f"进程: RSS {p['rss'] // 1024 // 1024}MB, 任务 {p['tasks']}, "
+            f"线程 {p['threads']}, FD {fds}",
+        ]
+
+    def breakdown(self) -> list[str]:
+        """按插件和处理函数列出延迟分布"""
+        lines = []
+        for (plugin, handler), h in sorted(
+            ((key, stats.wall) for key, stats in self.handlers.items()),
+            key=lambda kv: kv[1].total, reverse=True,
+        ):
+            lines.append(
+                f"{plugin}.{handler}: {h.count}次 均值 {h.mean:.1f}ms "
+                f"p50 {h.percentile(50):g} p95 {h.percentile(95):g} "
+                f"p99 {h.percentile(99):g} 最大 {h.max:.0f}ms"
+            )
+        return lines
+
+    def top(self, limit: int = 10) -> list[str]:
+        """按总耗时排列处理函数，拆分 CPU、API 等待和本地时间，附 API 耗时排行"""
+        lines = []
+        for (plugin, handler), h in sorted(
+            self.handlers.items(), key=lambda kv: kv[1].wall.total, reverse=True
+        )[:limit]:
+            lines.append(
+                f"{plugin}.{handler}: {h.count}次 总 {h.wall.total / 1000:.1f}s\n"
+                f"  墙钟 均值 {h.wall.mean:.1f} p99 {h.wall.percentile(99):.0f} | "
+                f"CPU 均值 {h.cpu.mean:.1f} | "
+                f"API {h.api_calls / h.count:.1f}次 等待 {h.api.mean:.1f} | "
+                f"本地 {h.local.mean:.1f}"
+            )
+        if self.api_calls:
+            lines.append("API 调用(ms):")
+            for action, h in sorted(
+                self.api_calls.items(), key=lambda kv: kv[1].total, reverse=True
+            )[:limit]:
+                lines.append(
+                    f"  {action}: {h.count}次 均值 {h.mean:.1f} "
+                    f"p99 {h.percentile(99):.0f} 最大 {h.max:.0f}"
+                )
+        return lines
+
+
+# 全局共享实例
+bot_metrics = BotMetrics()
+
+__all__ = ["LatencyHistogram", "HandlerStats", "BotMetrics", "bot_metrics"]
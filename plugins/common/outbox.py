@@ -0,0 +1,227 @@
+"""群消息发送队列: 限速、合并与优先级"""
+
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from ncatbot.utils import get_log
+
+from .metrics import LatencyHistogram
+from .startup import defer_start
+
+logger = get_log("Outbox")
+
+SendFunc = Callable[[str], Awaitable]
+
+# 优先级，数值越小越先发送
+PRIORITY_REPLY = 0  # 命令回复
+PRIORITY_NOTICE = 1  # 后台通知
+
+
+@dataclass
+class _Batch:
+    target: str
+    priority: int
+    send: SendFunc
+    created: float
+    ready_at: float
+    texts: list[str] = field(default_factory=list)
+    size: int = 0
+    future: Optional[asyncio.Future] = None
+
+
+class Outbox:
+    """单任务发送队列
+
+    - 同一目标两次发送间隔不小于 target_interval，全局间隔不小于 global_interval
+    - 后台通知在 merge_window 秒内按目标合并为一条，超过 max_chars 另起一条
+    - 同时可发送时命令回复优先于通知，同优先级按入队顺序
+
+    submit() 可在任意线程调用（定时任务运行在独立线程的事件循环中）。
+    各插件在 on_load / on_close 中调用 install() / uninstall()，队列随第一个
+    插件启动，最后一个插件卸载时停止。
+    """
+
+    def __init__(
+        self,
+        target_interval: float = 1.0,
+        global_interval: float = 0.3,
+        merge_window: float = 2.0,
+        max_chars: int = 3000,
+    ):
+        self.target_interval = target_interval
+        self.global_interval = global_interval
+        self.merge_window = merge_window
+        self.max_chars = max_chars
+        self._batches: list[_Batch] = []
+        self._open: dict[str, _Batch] = {}  # 可继续合并的通知批次
+        self._target_last: dict[str, float] = {}
+        self._last_send = 0.0
+        self._wakeup = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._plugins: list = []
+        # 统计
+        self.delays = {PRIORITY_REPLY: LatencyHistogram(), PRIORITY_NOTICE: LatencyHistogram()}
+        self.sent = 0
+        self.merged = 0
+        self.failed = 0
+
+    # ========== 生命周期 ==========
+
+    def start(self):
+        """在主事件循环中启动，重复调用无副作用"""
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._task = self._loop.create_task(self._run())
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def install(self, plugin):
+        """在 on_load 中调用，队列未运行时在主事件循环上启动"""
+        if not any(p is plugin for p in self._plugins):
+            self._plugins.append(plugin)
+        if not self.running:
+            # start() 可重复调用，多个插件同时加载时只会启动一次
+            defer_start(plugin, self.start)
+
+    def uninstall(self, plugin):
+        """在 on_close 中调用，最后一个插件卸载时停止队列"""
+        self._plugins = [p for p in self._plugins if p is not plugin]
+        if not self._plugins and self.running:
+            self._call(self._stop)
+
+    def _stop(self):
+        self._task.cancel()
+        self._task = None
+        dropped = 0
+        for batch in self._batches:
+            if batch.future is not None and not batch.future.done():
+                batch.future.cancel()
+            dropped += 1
+        if dropped:
+            logger.warning(f"发送队列已停止，丢弃 {dropped} 条待发送消息")
+        self._batches.clear()
+        self._open.clear()
+
+    @property
+    def depth(self) -> int:
+        return len(self._batches)
+
+    # ========== 入队 ==========
+
+    def submit(self, group_id: str, text: str, send: SendFunc):
+        """提交后台通知，send(text) 执行实际发送"""
+        self._call(self._enqueue_notice, str(group_id), text, send)
+
+    async def reply(self, event, text: str):
+        """以回复优先级发送命令回复，等待发送完成
+
+        队列未启动时直接回复。
+        """
+        if not self.running:
+            await event.reply(text)
+            return
+        target = str(getattr(event, "group_id", None) or f"private:{event.user_id}")
+        future = self._loop.create_future()
+        self._call(self._enqueue_reply, target, text, event.reply, future)
+        await future
+
+    def _call(self, func, *args):
+        loop = self._loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is None or running is loop:
+            func(*args)
+        else:
+            loop.call_soon_threadsafe(func, *args)
+
+    def _enqueue_notice(self, target: str, text: str, send: SendFunc):
+        now = time.monotonic()
+        batch = self._open.get(target)
+        if batch is not None and batch.size + len(text) <= self.max_chars:
+            batch.texts.append(text)
+            batch.size += len(text)
+            self.merged += 1
+            return
+        batch = _Batch(target, PRIORITY_NOTICE, send, now, now + self.merge_window, [text], len(text))
+        self._open[target] = batch
+        self._batches.append(batch)
+        self._wakeup.set()
+
+    def _enqueue_reply(self, target: str, text: str, send: SendFunc, future: asyncio.Future):
+        now = time.monotonic()
+        self._batches.append(
+            _Batch(target, PRIORITY_REPLY, send, now, now, [text], len(text), future)
+        )
+        self._wakeup.set()
+
+    # ========== 发送 ==========
+
+    def _next_batch(self, now: float) -> tuple[Optional[_Batch], Optional[float]]:
+        """返回 (可立即发送的批次, 否则需等待的秒数)"""
+        best = None
+        wait = None
+        global_at = self._last_send + self.global_interval
+        for batch in self._batches:
+            eligible_at = max(
+                batch.ready_at,
+                self._target_last.get(batch.target, 0.0) + self.target_interval,
+                global_at,
+            )
+            if eligible_at <= now:
+                if best is None or batch.priority < best.priority:
+                    best = batch
+            elif wait is None or eligible_at - now < wait:
+                wait = eligible_at - now
+        return best, wait
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            batch, wait = self._next_batch(time.monotonic())
+            if batch is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._batches.remove(batch)
+            if self._open.get(batch.target) is batch:
+                del self._open[batch.target]
+            now = time.monotonic()
+            self._last_send = self._target_last[batch.target] = now
+            self.delays[batch.priority].record((now - batch.ready_at) * 1000)
+            try:
+                await batch.send("\n\n".join(batch.texts))
+                self.sent += 1
+                if batch.future is not None and not batch.future.done():
+                    batch.future.set_result(None)
+            except Exception as e:
+                self.failed += 1
+                if batch.future is not None and not batch.future.done():
+                    batch.future.set_exception(e)
+                else:
+                    logger.error(f"发送到 {batch.target} 失败: {e}")
+
+    # ========== 报告 ==========
+
+    def summary(self) -> list[str]:
+        reply, notice = self.delays[PRIORITY_REPLY], self.delays[PRIORITY_NOTICE]
+        return [
+            f"发送队列: 待发送 {self.depth}, 已发送 {self.sent}, 合并 {self.merged}, 失败 {self.failed}",
+            f"排队延迟: 回复 p50 {reply.percentile(50):.0f}ms p99 {reply.percentile(99):.0f}ms, "
+            f"通知 p50 {notice.percentile(50):.0f}ms p99 {notice.percentile(99):.0f}ms",
+        ]
+
+
+# 全局共享实例，所有插件共用同一限速
+outbox = Outbox()
+
+__all__ = ["Outbox", "outbox", "PRIORITY_REPLY", "PRIORITY_NOTICE"]
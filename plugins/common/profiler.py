@@ -0,0 +1,104 @@
+"""事件循环线程采样分析"""
+
+import sys
+import time
+import asyncio
+import threading
+from collections import Counter
+from pathlib import Path
+
+# 事件循环自身的调用栈，统计累计占比时跳过
+_LOOP_INTERNALS = (str(Path(asyncio.__file__).parent), str(Path(threading.__file__)))
+
+
+class SamplingProfiler:
+    """定时抓取事件循环线程的调用栈，统计各函数的独占和累计采样占比
+
+    采样在独立线程中进行，被分析的线程无需插桩；间隔 5ms 时开销约为
+    每秒 200 次栈遍历。叶子帧位于 selectors 中的采样视为空闲。
+
+    采样线程需要抢到 GIL 才能运行，被分析线程繁忙时实际间隔会被拉长，
+    因此每次采样按距上次采样的实际时长计权，而不是各计一次。
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.running = False
+        self.samples = 0
+        self.seconds = 0.0
+        # 按实际间隔计权的采样时长(秒)
+        self.sampled = 0.0
+        self.idle = 0.0
+        self._self: Counter = Counter()
+        self._total: Counter = Counter()
+
+    async def profile(self, seconds: float):
+        """在调用方所在的线程(即事件循环线程)上采样 seconds 秒"""
+        if self.running:
+            raise RuntimeError("已有采样在进行中")
+        self.running = True
+        self.samples = 0
+        self.sampled = self.idle = 0.0
+        self.seconds = seconds
+        self._self.clear()
+        self._total.clear()
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self._sample, args=(threading.get_ident(), stop),
+            name="perf-sampler", daemon=True,
+        )
+        thread.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            thread.join()
+            self.running = False
+
+    def _sample(self, target: int, stop: threading.Event):
+        current_frames = sys._current_frames
+        last = time.perf_counter()
+        while not stop.wait(self.interval):
+            frame = current_frames().get(target)
+            now = time.perf_counter()
+            weight, last = now - last, now
+            if frame is None:
+                continue
+            self.samples += 1
+            self.sampled += weight
+            code = frame.f_code
+            if code.co_filename.endswith("selectors.py"):
+                self.idle += weight
+                continue
+            self._self[(code.co_filename, code.co_firstlineno, code.co_name)] += weight
+            seen = set()
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_filename, code.co_firstlineno, code.co_name)
+                if key not in seen and not code.co_filename.startswith(_LOOP_INTERNALS):
+                    seen.add(key)
+                    self._total[key] += weight
+                frame = frame.f_back
+
+    def report(self, limit: int = 10) -> list[str]:
+        if not self.samples or not self.sampled:
+            return ["没有采样数据"]
+        busy = self.sampled - self.idle
+
+        def fmt(counter: Counter) -> list[str]:
+            return [
+                f"  {n / self.sampled:6.1%} {name} ({Path(filename).name}:{line})"
+                for (filename, line, name), n in counter.most_common(limit)
+            ]
+
+        return [
+            f"采样 {self.seconds:g}s 共 {self.samples} 次，"
+            f"繁忙 {busy / self.sampled:.1%}，空闲 {self.idle / self.sampled:.1%}",
+            "独占:",
+            *fmt(self._self),
+            "累计:",
+            *fmt(self._total),
+        ]
+
+
+__all__ = ["SamplingProfiler"]
@@ -0,0 +1,210 @@
+"""事件与 API 调用录制"""
+
+import gzip
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Optional
+
+from ncatbot.utils import get_log
+
+logger = get_log("Recorder")
+
+
+class EventRecorder:
+    """将收到的事件和 API 调用写入 gzip 压缩的 JSON Lines 日志
+
+    每行一条记录:
+      {"t": 时间戳, "e": 原始事件}
+      {"t": 时间戳, "a": 动作, "p": 参数, "r": 原始应答(去掉 echo), "ms": 耗时}
+
+    单个文件只追加写入，压缩后超过 max_bytes 时另起新文件，最多保留 keep 个。
+    写入后 flush_interval 秒内由定时线程刷新，进程异常退出时最多丢失这段时间
+    的数据。API 调用可能来自定时任务线程中的其它事件循环，写入均需持有锁。
+    """
+
+    def __init__(self):
+        self.directory: Optional[Path] = None
+        self.max_bytes = 0
+        self.keep = 0
+        self.flush_interval = 1.0
+        self.records = 0
+        self._segment = 0
+        self._raw = None
+        self._file: Optional[gzip.GzipFile] = None
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    @property
+    def active(self) -> bool:
+        return self._file is not None
+
+    # ========== 开关 ==========
+
+    def start(self, directory: Path, max_bytes: int = 50 * 1024 * 1024, keep: int = 5):
+        with self._lock:
+            self._close()
+            self.directory = directory
+            self.max_bytes = max_bytes
+            self.keep = keep
+            self.records = 0
+            directory.mkdir(parents=True, exist_ok=True)
+            self._open()
+
+    def stop(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._file is not None:
+            self._file.close()
+            self._raw.close()
+            self._file = self._raw = None
+
+    def _open(self):
+        self._segment += 1
+        name = f"events-{time.strftime('%Y%m%d-%H%M%S')}-{self._segment:04d}.jsonl.gz"
+        self._raw = open(self.directory / name, "ab")
+        self._file = gzip.GzipFile(fileobj=self._raw, mode="ab")
+        # 超出保留数量的旧文件
+        for old in self.segments()[:-self.keep]:
+            old.unlink(missing_ok=True)
+
+    def segments(self) -> list[Path]:
+        if self.directory is None:
+            return []
+        return sorted(self.directory.glob("events-*.jsonl.gz"))
+
+    # ========== 写入 ==========
+
+    def _write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        data = line.encode("utf-8")
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._file.write(data)
+                self.records += 1
+            except (OSError, ValueError) as e:
+                logger.error(f"录制写入失败，已停止: {e}")
+                self._close()
+                return
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush(self):
+        """定时线程中刷新到磁盘，压缩后超过上限时轮转"""
+        with self._lock:
+            self._timer = None
+            if self._file is None:
+                return
+            try:
+                self._file.flush()
+                if self._raw.tell() >= self.max_bytes:
+                    self._rotate()
+            except (OSError, ValueError) as e:
+                logger.error(f"录制写入失败，已停止: {e}")
+                self._close()
+
+    def _rotate(self):
+        self._file.close()
+        self._raw.close()
+        self._open()
+
+    def record_event(self, event: dict):
+        if self._file is not None:
+            self._write({"t": round(time.time(), 3), "e": event})
+
+    def record_call(self, action: str, params: dict, response: dict, ms: float):
+        if self._file is not None:
+            response = {k: v for k, v in response.items() if k != "echo"}
+            self._write({
+                "t": round(time.time(), 3), "a": action, "p": params,
+                "r": response, "ms": round(ms, 1),
+            })
+
+    # ========== 挂载 ==========
+
+    def install(self, api):
+        """挂载到适配器的事件入口和 API 调用出口，重复调用无副作用
+
+        事件经 Adapter._handle_event 分发；API 调用统一经由 BotAPI 构造时
+        传入的 async_callback(即 Adapter.send)。
+        """
+        from ncatbot.core.adapter.adapter import Adapter
+
+        recorder = self
+        handle_event = Adapter._handle_event
+        if getattr(handle_event, "__recorder__", None) is not self:
+            # 插件重载后替换旧实例的包装，保留其它模块的包装
+            if hasattr(handle_event, "__recorder__"):
+                handle_event = handle_event.__wrapped__
+
+            async def _handle_event(adapter, message: dict):
+                recorder.record_event(message)
+                return await handle_event(adapter, message)
+
+            _handle_event.__wrapped__ = handle_event
+            _handle_event.__recorder__ = self
+            Adapter._handle_event = _handle_event
+
+        callback = api.async_callback
+        if getattr(callback, "__recorder__", None) is not self:
+            if hasattr(callback, "__recorder__"):
+                callback = callback.__wrapped__
+
+            async def async_callback(path: str, params: dict = None, *args, **kwargs):
+                start = time.perf_counter()
+                response = await callback(path, params, *args, **kwargs)
+                if recorder.active and isinstance(response, dict):
+                    recorder.record_call(
+                        path.strip("/"), params or {}, response,
+                        (time.perf_counter() - start) * 1000,
+                    )
+                return response
+
+            async_callback.__wrapped__ = callback
+            async_callback.__recorder__ = self
+            api.async_callback = async_callback
+
+    # ========== 报告 ==========
+
+    def summary(self) -> str:
+        if not self.active:
+            return "录制未开启"
+        segments = self.segments()
+        size = sum(p.stat().st_size for p in segments)
+        return (
+            f"录制中: {self.records} 条记录, {len(segments)} 个文件, "
+            f"共 {size / 1024 / 1024:.1f}MB (单文件上限 {self.max_bytes // 1024 // 1024}MB, "
+            f"保留 {self.keep} 个)"
+        )
+
+
+def read_records(path: Path):
+    """按时间顺序读取录制文件或目录中的所有记录，末尾不完整的行会被跳过"""
+    files = sorted(path.glob("events-*.jsonl.gz")) if path.is_dir() else [path]
+    for file in files:
+        try:
+            with gzip.open(file, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+        except (EOFError, gzip.BadGzipFile):
+            # 进程异常退出时最后一段压缩数据不完整
+            continue
+
+
+# 全局共享实例
+event_recorder = EventRecorder()
+
+__all__ = ["EventRecorder", "event_recorder", "read_records"]
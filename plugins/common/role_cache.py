@@ -0,0 +1,126 @@
+"""群成员角色缓存"""
+
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+
+from ncatbot.utils import get_log
+
+logger = get_log("RoleCache")
+
+# 框架发布通知事件的类型，见 ncatbot.utils.assets.literals
+NOTICE_EVENT = "ncatbot.notice_event"
+
+
+class RoleCache:
+    """按 (group_id, user_id) 缓存群成员角色
+
+    查询成功的角色缓存 ttl 秒，查询失败（非群成员或接口错误）
+    缓存 negative_ttl 秒；同一成员的并发查询只发起一次请求。
+    群管理员变动、成员退群时通过 handle_notice 失效，通知处理由
+    install() 在其中一个使用缓存的插件上注册一次。
+    """
+
+    def __init__(self, ttl: float = 600, negative_ttl: float = 60, maxsize: int = 4096):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        # {(group_id, user_id): (role, expire_at)}，role 为 None 表示负缓存
+        self._entries: OrderedDict[tuple[str, str], tuple[Optional[str], float]] = OrderedDict()
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        # 使用缓存的插件，以及注册了通知处理的 (插件, 处理器ID)
+        self._plugins: list = []
+        self._handler: Optional[tuple] = None
+
+    async def get_role(self, api, group_id, user_id) -> Optional[str]:
+        """获取成员角色 owner/admin/member，查询失败返回 None"""
+        key = (str(group_id), str(user_id))
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        role = None
+        try:
+            info = await api.get_group_member_info(key[0], key[1])
+            role = info.role
+            logger.debug(f"group={key[0]}, user={key[1]}, role={role}")
+        except Exception as e:
+            logger.error(f"get_group_member_info error: {e}")
+        finally:
+            self._store(key, role)
+            del self._inflight[key]
+            future.set_result(role)
+        return role
+
+    async def is_group_admin(self, api, group_id, user_id) -> bool:
+        """检查用户是否是群主或管理员"""
+        return await self.get_role(api, group_id, user_id) in ("owner", "admin")
+
+    def _store(self, key: tuple[str, str], role: Optional[str]):
+        ttl = self.ttl if role is not None else self.negative_ttl
+        self._entries[key] = (role, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, group_id, user_id=None):
+        """失效指定成员，不指定 user_id 时失效整个群"""
+        group_id = str(group_id)
+        if user_id is not None:
+            self._entries.pop((group_id, str(user_id)), None)
+            return
+        for key in [k for k in self._entries if k[0] == group_id]:
+            del self._entries[key]
+
+    # ========== 挂载 ==========
+
+    def install(self, plugin):
+        """在 on_load 中调用，多个插件共用时通知处理只注册一次"""
+        if any(p is plugin for p in self._plugins):
+            return
+        self._plugins.append(plugin)
+        if self._handler is None:
+            self._register(plugin)
+
+    def uninstall(self, plugin):
+        """在 on_close 中调用，通知处理注册在该插件上时转交给其它插件"""
+        self._plugins = [p for p in self._plugins if p is not plugin]
+        if self._handler is not None and self._handler[0] is plugin:
+            plugin.unregister_handler(self._handler[1])
+            self._handler = None
+            if self._plugins:
+                self._register(self._plugins[0])
+
+    def _register(self, plugin):
+        async def handler(event):
+            self.handle_notice(event.data)
+
+        self._handler = (plugin, plugin.register_handler(NOTICE_EVENT, handler))
+
+    def handle_notice(self, event):
+        """根据群通知失效缓存"""
+        notice_type = getattr(event, "notice_type", None)
+        if notice_type not in ("group_admin", "group_decrease", "group_increase"):
+            return
+        if notice_type == "group_decrease" and event.sub_type == "kick_me":
+            self.invalidate(event.group_id)
+        else:
+            self.invalidate(event.group_id, event.user_id)
+
+
+# 全局共享实例
+role_cache = RoleCache()
+
+__all__ = ["RoleCache", "role_cache"]
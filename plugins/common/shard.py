@@ -0,0 +1,159 @@
+"""按群分片的进程池"""
+
+import os
+import sys
+import site
+import zlib
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable
+
+from ncatbot.utils import get_log
+
+logger = get_log("Shard")
+
+# 插件目录。框架只在导入插件期间把它加入 sys.path，工作进程需自行加入
+_PLUGINS_DIR = str(Path(__file__).resolve().parent.parent)
+
+# 工作进程内按 (类, 路径) 缓存的对象，避免每次调用重新初始化数据库
+_instances: dict[tuple[type, str], Any] = {}
+
+
+def _call_method(cls: type, path: str, method: str, args: tuple, kwargs: dict) -> Any:
+    key = (cls, path)
+    obj = _instances.get(key)
+    if obj is None:
+        obj = _instances[key] = cls(Path(path))
+    return getattr(obj, method)(*args, **kwargs)
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+class ShardPool:
+    """按键(通常为群号)哈希分片的进程池
+
+    每个分片是只有一个进程的执行器，同一个键的任务按提交顺序串行执行，
+    不同分片之间并行。workers 为 0 时不启动进程，任务在调用方线程中直接
+    执行，与未分片时行为一致。
+
+    提交的函数和参数需可 pickle，即模块级函数和普通数据。工作进程以
+    forkserver 方式启动，会重新导入主模块，入口代码需放在 __main__ 判断中；
+    启动时把插件目录加入 sys.path，以便按 common.x / <插件>.x 还原函数。
+
+    工作进程意外退出(如被 OOM 杀掉)后执行器不可再用，此时替换该分片的
+    执行器并重试一次。
+
+    多个插件共用全局实例时在 on_load / on_close 中调用 install() / uninstall()，
+    最后一个插件卸载时才结束进程。
+    """
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers
+        self._shards: list[ProcessPoolExecutor] = []
+        self.submitted: list[int] = []
+        self.inline = 0
+        self.restarts = 0
+        self._plugins: list = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._shards)
+
+    def start(self):
+        """创建各分片进程并预热，重复调用无副作用"""
+        if self._shards or self.workers <= 0:
+            return
+        self._shards = [self._new_shard() for _ in range(self.workers)]
+        self.submitted = [0] * self.workers
+        logger.info(f"分片进程池已启动: {self.workers} 个进程")
+
+    @staticmethod
+    def _new_shard() -> ProcessPoolExecutor:
+        method = "forkserver" if sys.platform != "win32" else "spawn"
+        # 初始化函数本身也要在子进程中还原，只能用标准库函数
+        shard = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context(method),
+            initializer=site.addsitedir, initargs=(_PLUGINS_DIR,),
+        )
+        shard.submit(_warm_up)
+        return shard
+
+    def _replace(self, index: int, broken: ProcessPoolExecutor):
+        # 并发的任务可能已替换过，只替换仍是 broken 的分片
+        if index < len(self._shards) and self._shards[index] is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._shards[index] = self._new_shard()
+            self.restarts += 1
+
+    def install(self, plugin):
+        """在 on_load 中调用，第一个插件加载时启动进程"""
+        if not any(p is plugin for p in self._plugins):
+            self._plugins.append(plugin)
+        self.start()
+
+    def uninstall(self, plugin):
+        """在 on_close 中调用，最后一个插件卸载时结束进程"""
+        self._plugins = [p for p in self._plugins if p is not plugin]
+        if not self._plugins:
+            self.shutdown()
+
+    def shutdown(self):
+        """结束各分片进程，之后的任务在调用方直接执行，可再次 start()"""
+        for shard in self._shards:
+            shard.shutdown(wait=False, cancel_futures=True)
+        self._shards = []
+
+    def shard_of(self, key: Any) -> int:
+        # 内置 hash 对字符串加盐，进程间不一致，这里用 crc32
+        return zlib.crc32(str(key).encode("utf-8")) % len(self._shards)
+
+    async def run(self, key: Any, func: Callable, *args, **kwargs) -> Any:
+        """在 key 对应的分片中执行 func(*args, **kwargs) 并返回结果"""
+        if not self._shards:
+            self.inline += 1
+            return func(*args, **kwargs)
+        index = self.shard_of(key)
+        self.submitted[index] += 1
+        loop = asyncio.get_running_loop()
+        task = functools.partial(func, *args, **kwargs)
+        shard = self._shards[index]
+        try:
+            return await loop.run_in_executor(shard, task)
+        except BrokenProcessPool:
+            logger.warning(f"分片 {index} 的工作进程已退出，重启后重试")
+            self._replace(index, shard)
+        if not self._shards:
+            # 等待期间进程池已关闭
+            self.inline += 1
+            return func(*args, **kwargs)
+        return await loop.run_in_executor(self._shards[index], task)
+
+    async def call(self, key: Any, obj: Any, method: str, *args, **kwargs) -> Any:
+        """调用 obj.method(...)，分片模式下在工作进程中以 type(obj)(obj.db_path) 重建对象"""
+        if not self._shards:
+            self.inline += 1
+            return getattr(obj, method)(*args, **kwargs)
+        return await self.run(
+            key, _call_method, type(obj), str(obj.db_path), method, args, kwargs
+        )
+
+    def summary(self) -> list[str]:
+        if not self._shards:
+            return [f"分片进程池: 未启用 (直接执行 {self.inline} 次)"]
+        counts = "/".join(str(n) for n in self.submitted)
+        return [
+            f"分片进程池: {self.workers} 个进程, 各分片任务数 {counts}, "
+            f"重启 {self.restarts} 次"
+        ]
+
+
+# 全局共享实例，进程数由环境变量 BOT_SHARD_WORKERS 指定，默认不启用
+shard_pool = ShardPool(int(os.environ.get("BOT_SHARD_WORKERS", "0") or 0))
+
+__all__ = ["ShardPool", "shard_pool"]
@@ -0,0 +1,84 @@
+"""插件启动耗时统计与延迟启动"""
+
+import time
+import inspect
+import functools
+from typing import Any, Callable
+
+# 主事件循环上发布的生命周期事件，见 ncatbot.utils.assets.literals
+STARTUP_EVENT = "ncatbot.startup_event"
+HEARTBEAT_EVENT = "ncatbot.heartbeat_event"
+
+
+class StartupProfile:
+    """记录各插件模块导入和 on_load 的耗时"""
+
+    def __init__(self):
+        self.imports: dict[str, float] = {}
+        self.loads: dict[str, float] = {}
+        self.started_at = time.time()
+
+    def record_import(self, plugin: str, started: float):
+        """在插件包 __init__ 末尾调用，started 为导入开始时的 perf_counter"""
+        self.imports[plugin] = (time.perf_counter() - started) * 1000
+
+    def timed_load(self, func: Callable) -> Callable:
+        """on_load 装饰器，记录耗时"""
+
+        @functools.wraps(func)
+        async def wrapper(plugin, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(plugin, *args, **kwargs)
+            finally:
+                self.loads[plugin.name] = (time.perf_counter() - start) * 1000
+
+        return wrapper
+
+    def report(self) -> list[str]:
+        names = sorted(
+            set(self.imports) | set(self.loads),
+            key=lambda n: self.imports.get(n, 0) + self.loads.get(n, 0),
+            reverse=True,
+        )
+        lines = []
+        for name in names:
+            imp = self.imports.get(name)
+            load = self.loads.get(name)
+            lines.append(
+                f"{name}: 导入 {'-' if imp is None else f'{imp:.0f}ms'}, "
+                f"on_load {'-' if load is None else f'{load:.0f}ms'}"
+            )
+        total = sum(self.imports.values()) + sum(self.loads.values())
+        lines.append(f"合计 {total:.0f}ms (on_load 由框架并发执行)")
+        return lines
+
+
+def defer_start(plugin, start: Callable[[], Any]):
+    """在主事件循环上执行一次 start，用于启动后台任务
+
+    框架在加载线程的临时事件循环中执行 on_load，结束后该循环即被关闭，
+    在 on_load 中创建的任务不会继续运行。这里改为收到启动事件时调用 start；
+    插件重载时启动事件已过，由下一次心跳事件触发。
+    """
+    handler_ids = []
+
+    async def handler(event):
+        if not handler_ids:
+            return
+        for handler_id in handler_ids:
+            plugin.unregister_handler(handler_id)
+        handler_ids.clear()
+        result = start()
+        if inspect.isawaitable(result):
+            await result
+
+    for event_type in (STARTUP_EVENT, HEARTBEAT_EVENT):
+        handler_ids.append(plugin.register_handler(event_type, handler))
+
+
+# 全局共享实例
+startup_profile = StartupProfile()
+
+
+__all__ = ["StartupProfile", "startup_profile", "defer_start"]
@@ -0,0 +1,192 @@
+"""插件共用的键值/文档存储（SQLite WAL）"""
+
+import json
+import sqlite3
+import asyncio
+import threading
+import dataclasses
+from pathlib import Path
+from typing import Any, Optional, TypeVar, get_args, get_origin, get_type_hints
+
+from ncatbot.utils import get_log
+
+logger = get_log("Store")
+
+T = TypeVar("T")
+
+
+def to_data(value: Any) -> Any:
+    """dataclass 转为可 JSON 序列化的数据"""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    return value
+
+
+def from_data(tp: Any, data: Any) -> Any:
+    """按类型注解还原 dataclass，支持 list[...] / dict[str, ...] 嵌套
+
+    数据中多余的字段会被忽略，缺少的字段使用默认值。
+    """
+    if data is None:
+        return None
+    if dataclasses.is_dataclass(tp):
+        hints = get_type_hints(tp)
+        return tp(**{
+            f.name: from_data(hints[f.name], data[f.name])
+            for f in dataclasses.fields(tp)
+            if f.init and f.name in data
+        })
+    origin = get_origin(tp)
+    if origin is list:
+        (item,) = get_args(tp) or (Any,)
+        return [from_data(item, v) for v in data]
+    if origin is dict:
+        _, item = get_args(tp) or (Any, Any)
+        return {k: from_data(item, v) for k, v in data.items()}
+    return data
+
+
+class Store:
+    """基于 SQLite WAL 的键值存储，值以 JSON 保存
+
+    set() 立即序列化并记入待写队列，flush_delay 秒内的多次写入合并为
+    一个事务，由后台定时线程提交，不阻塞事件循环；同一批写入要么全部
+    生效要么全部不生效。定时器不依赖事件循环，因此也可在定时任务的
+    线程中调用。
+    """
+
+    def __init__(self, db_path: Path, flush_delay: float = 0.5):
+        self.db_path = db_path
+        self.flush_delay = flush_delay
+        self._pending: dict[str, Optional[str]] = {}  # None 表示删除
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS kv (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    # ========== 读取 ==========
+
+    def _read(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def get(self, key: str, tp: Any = None, default: Any = None) -> Any:
+        """读取键值，指定 tp 时还原为对应的 dataclass"""
+        raw = self._read(key)
+        if raw is None:
+            return default
+        data = json.loads(raw)
+        return from_data(tp, data) if tp is not None else data
+
+    def __contains__(self, key: str) -> bool:
+        return self._read(key) is not None
+
+    def keys(self, prefix: str = "") -> list[str]:
+        """列出以 prefix 开头的键，包含尚未提交的写入"""
+        with self._connect() as conn:
+            keys = {
+                row[0] for row in conn.execute(
+                    "SELECT key FROM kv WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+                )
+            }
+        with self._lock:
+            for key, value in self._pending.items():
+                if key.startswith(prefix):
+                    if value is None:
+                        keys.discard(key)
+                    else:
+                        keys.add(key)
+        return sorted(keys)
+
+    # ========== 写入 ==========
+
+    def set(self, key: str, value: Any):
+        self.set_many({key: value})
+
+    def set_many(self, items: dict[str, Any]):
+        """写入多个键，保证在同一事务中提交"""
+        encoded = {
+            k: json.dumps(to_data(v), ensure_ascii=False) for k, v in items.items()
+        }
+        with self._lock:
+            self._pending.update(encoded)
+            self._schedule()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._pending[key] = None
+            self._schedule()
+
+    def _schedule(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """立即提交所有待写入的数据"""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not pending:
+                return
+            try:
+                with self._connect() as conn:
+                    conn.executemany(
+                        "INSERT INTO kv (key, value) VALUES (?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                        [(k, v) for k, v in pending.items() if v is not None],
+                    )
+                    conn.executemany(
+                        "DELETE FROM kv WHERE key = ?",
+                        [(k,) for k, v in pending.items() if v is None],
+                    )
+            except sqlite3.Error as e:
+                # 放回队列等待下次提交，不覆盖期间的新写入
+                with self._lock:
+                    self._pending = {**pending, **self._pending}
+                    self._schedule()
+                logger.error(f"写入 {self.db_path.name} 失败: {e}")
+
+    async def aflush(self):
+        await asyncio.to_thread(self.flush)
+
+    def close(self):
+        self.flush()
+
+    # ========== 迁移 ==========
+
+    def migrate_json(self, key: str, json_path: Path) -> bool:
+        """将旧版 JSON 文件一次性导入到 key，成功后改名为 .json.bak
+
+        解析失败时保留原文件并抛出异常，不会以空数据覆盖。
+        """
+        if not json_path.exists() or key in self:
+            return False
+        data = json.loads(json_path.read_text(encoding="utf-8"))
+        self.set(key, data)
+        self.flush()
+        json_path.rename(json_path.with_suffix(".json.bak"))
+        return True
+
+
+__all__ = ["Store", "to_data", "from_data"]
@@ -0,0 +1,116 @@
+"""消息监听器前缀索引"""
+
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from ncatbot.plugin_system.builtin_plugin.unified_registry.filter_system import BaseFilter
+
+
+@dataclass
+class ListenerStats:
+    """单个监听器的统计"""
+    checks: int = 0  # 收到的消息数
+    hits: int = 0  # 命中前缀、实际调用的次数
+    filter_time: float = 0.0  # 前缀匹配耗时(秒)
+    handler_time: float = 0.0  # 处理函数耗时(秒)
+
+
+class TriggerIndex:
+    """按消息前缀分发 on_message 监听器
+
+    所有监听器的前缀存放在同一棵字符前缀树中，同一条消息只匹配一次，
+    结果由各监听器的过滤器共享。匹配前会跳过开头的回复、艾特等 CQ 码。
+    """
+
+    def __init__(self):
+        self._root: dict = {}
+        self._max_len = 0
+        self._last_event = None
+        self._last_match: frozenset = frozenset()
+        self.stats: dict[str, ListenerStats] = {}
+
+    def register(self, listener: str, *prefixes: str):
+        """登记监听器的触发前缀"""
+        for prefix in prefixes:
+            node = self._root
+            for ch in prefix:
+                node = node.setdefault(ch, {})
+            node.setdefault(None, set()).add(listener)
+            self._max_len = max(self._max_len, len(prefix))
+        self.stats.setdefault(listener, ListenerStats())
+
+    @staticmethod
+    def _command_text(raw: str) -> str:
+        """去掉开头的 CQ 码和空白"""
+        text = raw.lstrip()
+        while text.startswith("[CQ:"):
+            end = text.find("]")
+            if end < 0:
+                break
+            text = text[end + 1:].lstrip()
+        return text
+
+    def match(self, event) -> frozenset:
+        """返回消息命中的监听器集合"""
+        if event is self._last_event:
+            return self._last_match
+        matched = set()
+        node = self._root
+        for ch in self._command_text(getattr(event, "raw_message", None) or "")[:self._max_len]:
+            node = node.get(ch)
+            if node is None:
+                break
+            matched.update(node.get(None, ()))
+        self._last_event = event
+        self._last_match = frozenset(matched)
+        return self._last_match
+
+    def filter(self, listener: str, *prefixes: str) -> "PrefixFilter":
+        """创建监听器的前缀过滤器，可直接作为装饰器使用"""
+        self.register(listener, *prefixes)
+        return PrefixFilter(self, listener)
+
+    @contextmanager
+    def measure(self, listener: str):
+        """统计处理函数耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stats[listener].handler_time += time.perf_counter() - start
+
+    def report(self) -> list[str]:
+        """各监听器统计文本"""
+        lines = []
+        for name, s in sorted(self.stats.items()):
+            lines.append(
+                f"{name}: 消息 {s.checks}, 调用 {s.hits}, "
+                f"匹配 {s.filter_time * 1000:.1f}ms, 处理 {s.handler_time * 1000:.1f}ms"
+            )
+        return lines
+
+
+class PrefixFilter(BaseFilter):
+    """只放行以登记前缀开头的消息"""
+
+    def __init__(self, index: TriggerIndex, listener: str):
+        super().__init__(f"prefix:{listener}")
+        self.index = index
+        self.listener = listener
+
+    def check(self, event) -> bool:
+        stats = self.index.stats[self.listener]
+        start = time.perf_counter()
+        hit = self.listener in self.index.match(event)
+        stats.filter_time += time.perf_counter() - start
+        stats.checks += 1
+        if hit:
+            stats.hits += 1
+        return hit
+
+
+# 全局共享索引
+trigger_index = TriggerIndex()
+
+__all__ = ["TriggerIndex", "PrefixFilter", "ListenerStats", "trigger_index"]
@@ -3,7 +3,7 @@
 from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True)
 class GroupRule:
     """群审核规则"""
     group_id: str
@@ -11,6 +11,10 @@ class GroupRule:
     pattern: str = ""  # 正则表达式
     auto_reject: bool = False
     reject_reason: str = "回答不正确"
+    retention_days: int = 0  # 退群记录保留天数，0 为不限
+    retention_records: int = 0  # 每个成员保留的记录条数，0 为不限
+    raid_threshold: int = 0  # 每分钟加群请求超过该值时暂停自动审批，0 为关闭
+    kicked_policy: str = "none"  # 被踢成员再次申请: none 不处理 / flag 提醒 / reject 拒绝
 
 
 @dataclass
@@ -1,12 +1,15 @@
 """成员记录数据库"""
 
+import json
+import time
+import zlib
 import sqlite3
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Tuple, Dict, Set
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class MemberRecord:
     """成员记录"""
     user_id: str
@@ -28,6 +31,8 @@ class MemberDB:
     def _init_db(self):
         """初始化数据库"""
         with sqlite3.connect(self.db_path) as conn:
+            # 分片模式下多个进程同时写入，WAL 避免读写互相阻塞
+            conn.execute("PRAGMA journal_mode = WAL")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS members (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -45,6 +50,40 @@ class MemberDB:
                 CREATE INDEX IF NOT EXISTS idx_group_user
                 ON members(group_id, user_id)
             """)
+            # 存量成员导入进度，用于中断后续传
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS backfill_progress (
+                    group_id TEXT PRIMARY KEY,
+                    next_index INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            # 被踢成员名单，不受归档影响，用于入群复审
+            migrate_kicked = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'kicked_users'"
+            ).fetchone() is None
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS kicked_users (
+                    group_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    PRIMARY KEY (group_id, user_id)
+                )
+            """)
+            if migrate_kicked:
+                conn.execute("""
+                    INSERT OR IGNORE INTO kicked_users (group_id, user_id)
+                    SELECT DISTINCT group_id, user_id FROM members WHERE leave_type = 'kick'
+                """)
+            # 归档表，每次压缩的记录以 zlib 压缩的 JSON 存为一行
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS members_archive (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    group_id TEXT NOT NULL,
+                    archived_at INTEGER NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    data BLOB NOT NULL
+                )
+            """)
             conn.commit()
 
     def add_join_record(
@@ -67,6 +106,66 @@ class MemberDB:
             )
             conn.commit()
 
+    def add_join_records_bulk(
+        self,
+        group_id: str,
+        records: List[Tuple[str, int]],
+        join_type: str = None,
+        offset: int = None,
+        total: int = None,
+    ) -> int:
+        """批量导入入群记录，返回实际插入条数
+
+        records 为 (user_id, join_time) 列表，整批在一个事务内写入。
+        已有未退群记录的成员会被跳过，重复记录由唯一索引忽略。
+        传入 offset/total 时在同一事务内更新导入进度。
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            before = conn.total_changes
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO members
+                (user_id, group_id, join_time, join_type)
+                SELECT ?, ?, ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM members
+                    WHERE group_id = ? AND user_id = ? AND leave_time IS NULL
+                )
+                """,
+                [
+                    (user_id, group_id, join_time, join_type, group_id, user_id)
+                    for user_id, join_time in records
+                ],
+            )
+            inserted = conn.total_changes - before
+            if offset is not None:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO backfill_progress (group_id, next_index, total)
+                    VALUES (?, ?, ?)
+                    """,
+                    (group_id, offset, total or 0),
+                )
+            conn.commit()
+            return inserted
+
+    def get_backfill_offset(self, group_id: str) -> int:
+        """获取存量导入进度，无进度返回 0"""
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT next_index FROM backfill_progress WHERE group_id = ?",
+                (group_id,),
+            ).fetchone()
+            return row[0] if row else 0
+
+    def clear_backfill_progress(self, group_id: str):
+        """清除存量导入进度"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "DELETE FROM backfill_progress WHERE group_id = ?", (group_id,)
+            )
+            conn.commit()
+
     def update_leave_record(
         self,
         user_id: str,
@@ -86,6 +185,25 @@ class MemberDB:
             )
             conn.commit()
 
+    def add_kicked_user(self, user_id: str, group_id: str):
+        """记录被踢成员"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO kicked_users (group_id, user_id) VALUES (?, ?)",
+                (group_id, user_id),
+            )
+            conn.commit()
+
+    def get_kicked_users(self) -> Dict[str, Set[str]]:
+        """获取所有被踢成员 {group_id: {user_id}}"""
+        result: Dict[str, Set[str]] = {}
+        with sqlite3.connect(self.db_path) as conn:
+            for group_id, user_id in conn.execute(
+                "SELECT group_id, user_id FROM kicked_users"
+            ):
+                result.setdefault(group_id, set()).add(user_id)
+        return result
+
     def get_member_records(
         self, group_id: str, user_id: str = None
     ) -> List[MemberRecord]:
@@ -114,3 +232,88 @@ class MemberDB:
                 )
                 for r in rows
             ]
+
+    def archive_old_records(
+        self, group_id: str, keep_days: int = 0, keep_records: int = 0
+    ) -> int:
+        """按保留策略将旧的退群记录移入归档表，返回归档条数
+
+        只处理已退群的记录；超过 keep_days 天，或超出每人最近
+        keep_records 条的记录会被归档。
+        """
+        conditions = []
+        params: list = [group_id]
+        if keep_days > 0:
+            conditions.append("leave_time < ?")
+            params.append(int(time.time()) - keep_days * 86400)
+        if keep_records > 0:
+            conditions.append("""
+                id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY user_id ORDER BY join_time DESC
+                        ) AS rn
+                        FROM members WHERE group_id = ?
+                    ) WHERE rn > ?
+                )
+            """)
+            params.extend([group_id, keep_records])
+        if not conditions:
+            return 0
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                f"""
+                SELECT * FROM members
+                WHERE group_id = ? AND leave_time IS NOT NULL
+                AND ({" OR ".join(conditions)})
+                """,
+                params,
+            ).fetchall()
+            if not rows:
+                return 0
+
+            data = zlib.compress(
+                json.dumps([dict(r) for r in rows], ensure_ascii=False).encode("utf-8")
+            )
+            conn.execute(
+                """
+                INSERT INTO members_archive (group_id, archived_at, row_count, data)
+                VALUES (?, ?, ?, ?)
+                """,
+                (group_id, int(time.time()), len(rows), data),
+            )
+            conn.executemany(
+                "DELETE FROM members WHERE id = ?", [(r["id"],) for r in rows]
+            )
+            conn.commit()
+            return len(rows)
+
+    def get_archived_records(self, group_id: str) -> List[MemberRecord]:
+        """读取归档记录"""
+        with sqlite3.connect(self.db_path) as conn:
+            blobs = conn.execute(
+                "SELECT data FROM members_archive WHERE group_id = ? ORDER BY id",
+                (group_id,),
+            ).fetchall()
+        records = []
+        for (blob,) in blobs:
+            for r in json.loads(zlib.decompress(blob).decode("utf-8")):
+                r.pop("id", None)
+                records.append(MemberRecord(**r))
+        return records
+
+    def optimize(self):
+        """更新统计信息并回收空间"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("ANALYZE")
+            conn.commit()
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+    def size(self) -> int:
+        """数据库文件大小（字节）"""
+        return self.db_path.stat().st_size if self.db_path.exists() else 0
@@ -0,0 +1,154 @@
+"""加群请求审批队列"""
+
+import re
+import time
+import asyncio
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from ncatbot.utils import get_log
+
+logger = get_log("GroupAdmin")
+
+# 审批回调: (flag, approve, reason)
+ApplyFunc = Callable[[str, bool, Optional[str]], Awaitable[None]]
+
+
+def match_answer(pattern: str, comment: str) -> bool:
+    """入群回答是否匹配规则正则，不区分大小写"""
+    return re.search(pattern, comment, re.IGNORECASE) is not None
+
+
+class PendingRequest(NamedTuple):
+    """待处理的加群请求，按元组保存以减少常驻内存，序列化为 JSON 数组"""
+    group_id: str
+    user_id: str
+    comment: str
+    time: float
+
+
+@dataclass(slots=True)
+class Decision:
+    """待执行的审批决定"""
+    flag: str
+    group_id: str
+    user_id: str
+    approve: bool
+    reason: Optional[str] = None
+    enqueued_at: float = 0.0
+
+
+class ApprovalPipeline:
+    """审批队列
+
+    决定先入队，由固定数量的 worker 执行，同一群内按最小间隔限速；
+    重复的 flag 会被忽略。同时统计到达速率，用于判断是否进入防刷模式。
+    """
+
+    def __init__(
+        self,
+        apply: ApplyFunc,
+        concurrency: int = 4,
+        group_interval: float = 0.5,
+        dedup_size: int = 4096,
+        latency_window: int = 200,
+        arrival_window: float = 60.0,
+    ):
+        self._apply = apply
+        self._concurrency = concurrency
+        self._group_interval = group_interval
+        self._dedup_size = dedup_size
+        self._arrival_window = arrival_window
+
+        self._queue: asyncio.Queue[Decision] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._next_slot: dict[str, float] = {}
+        self._arrivals: dict[str, deque] = {}
+        self._latencies: deque = deque(maxlen=latency_window)
+
+        self.processed = 0
+        self.failed = 0
+        self.duplicates = 0
+
+    # ========== 生命周期 ==========
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self._concurrency)
+        ]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # ========== 入队 ==========
+
+    def record_arrival(self, group_id: str) -> int:
+        """记录一次请求到达，返回窗口内该群的请求数"""
+        now = time.monotonic()
+        arrivals = self._arrivals.setdefault(group_id, deque())
+        arrivals.append(now)
+        while arrivals and now - arrivals[0] > self._arrival_window:
+            arrivals.popleft()
+        return len(arrivals)
+
+    def submit(self, decision: Decision) -> bool:
+        """提交审批决定，重复的 flag 返回 False"""
+        if decision.flag in self._seen:
+            self.duplicates += 1
+            return False
+        self._seen[decision.flag] = None
+        if len(self._seen) > self._dedup_size:
+            self._seen.popitem(last=False)
+
+        decision.enqueued_at = time.monotonic()
+        self._queue.put_nowait(decision)
+        return True
+
+    # ========== 执行 ==========
+
+    async def _wait_group_slot(self, group_id: str):
+        """按群限速，预约下一个可执行时刻"""
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(group_id, 0.0))
+        self._next_slot[group_id] = slot + self._group_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _worker(self):
+        while True:
+            decision = await self._queue.get()
+            try:
+                await self._wait_group_slot(decision.group_id)
+                await self._apply(decision.flag, decision.approve, decision.reason)
+                self.processed += 1
+                action = "通过" if decision.approve else "拒绝"
+                logger.info(
+                    f"自动{action}: group={decision.group_id}, user={decision.user_id}"
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"set_group_add_request failed for {decision.flag}: {e}")
+            finally:
+                self._latencies.append(time.monotonic() - decision.enqueued_at)
+                self._queue.task_done()
+
+    # ========== 统计 ==========
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def latency_stats(self) -> tuple[float, float]:
+        """最近决定的 (平均, 最大) 延迟，单位秒"""
+        if not self._latencies:
+            return 0.0, 0.0
+        return sum(self._latencies) / len(self._latencies), max(self._latencies)
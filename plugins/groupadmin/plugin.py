@@ -1,9 +1,10 @@
 """群管插件 - 处理加群请求和成员统计"""
 
-import re
-import json
+import sys
+import time
+import asyncio
 from pathlib import Path
-from dataclasses import asdict
+from typing import Optional
 
 from ncatbot.plugin_system import (
     NcatBotPlugin,
@@ -21,8 +22,15 @@ from ncatbot.core.event import (
 )
 from ncatbot.utils import get_log
 
+from common.startup import startup_profile, defer_start
+from common.store import Store
+from common.outbox import outbox
+from common.shard import shard_pool
+from common.role_cache import role_cache
+
 from .config import GroupRule, GroupAdminConfig
 from .database import MemberDB
+from .pipeline import ApprovalPipeline, Decision, PendingRequest, match_answer
 
 logger = get_log("GroupAdmin")
 
@@ -33,31 +41,83 @@ class GroupAdminPlugin(NcatBotPlugin):
     author = "Windsland52"
     dependencies = {}
 
+    # 存量成员导入: 每批写入条数 / 批间隔(秒)
+    BACKFILL_BATCH_SIZE = 500
+    BACKFILL_BATCH_INTERVAL = 0.05
+    # 数据库维护: 检查间隔 / 空闲判定(秒) / VACUUM 最小间隔(秒)
+    MAINTENANCE_INTERVAL = "1h"
+    MAINTENANCE_IDLE_SECONDS = 300
+    VACUUM_INTERVAL = 86400
+    # 审批队列: 并发数 / 同群审批最小间隔(秒)
+    APPROVAL_CONCURRENCY = 4
+    APPROVAL_GROUP_INTERVAL = 0.5
+    # 待处理加群请求: 持久化间隔 / 保留时长(秒)，超时的请求不再等待入群
+    CHECKPOINT_INTERVAL = "10s"
+    PENDING_REQUEST_TTL = 3 * 86400
+
+    @startup_profile.timed_load
     async def on_load(self):
         """插件加载"""
-        self.config_path = self.workspace / "config.json"
         self.db = MemberDB(self.workspace / "members.db")
+        self.store = Store(self.workspace / "store.db")
+        # 迁移旧版 config.json
+        try:
+            if self.store.migrate_json("config", self.workspace / "config.json"):
+                logger.info("已从 config.json 迁移群规则")
+        except Exception as e:
+            logger.error(f"config.json 迁移失败，原文件已保留: {e}")
         self.config = self._load_config()
-        # 缓存待处理的加群请求 {flag: (group_id, user_id, comment)}
-        self.pending_requests = {}
+        # 缓存待处理的加群请求 {flag: PendingRequest}
+        # 定期和卸载时写入存储，重启后入群记录仍能关联到回答
+        self.pending_requests = self._restore_pending_requests()
+        self._pending_dirty = False
+        self.add_scheduled_task(
+            self._checkpoint, "groupadmin_checkpoint", self.CHECKPOINT_INTERVAL
+        )
+        # 审批决定入队执行，限制并发和同群速率；工作任务需在主事件循环中启动
+        self.pipeline = ApprovalPipeline(
+            self.api.set_group_add_request,
+            concurrency=self.APPROVAL_CONCURRENCY,
+            group_interval=self.APPROVAL_GROUP_INTERVAL,
+        )
+        defer_start(self, self.pipeline.start)
+        # 群消息发送队列在主事件循环中运行
+        outbox.install(self)
+        # 入群回答筛选和成员记录写入可分派到分片进程(BOT_SHARD_WORKERS)，同一群保持顺序
+        shard_pool.install(self)
+        # 防刷模式下暂缓处理的请求数 {group_id: count}
+        self.held_requests = {}
+        # 被踢成员索引 {group_id: {user_id}}，入群请求时 O(1) 查询
+        self.kicked_index = self.db.get_kicked_users()
+        # 同一时间只允许一个导入任务，避免并发拉取成员列表
+        self._backfill_lock = asyncio.Lock()
+
+        # 空闲时执行归档和 VACUUM/ANALYZE
+        self._last_activity = time.time()
+        self._last_vacuum = 0.0
+        self.add_scheduled_task(
+            self._maintenance_task,
+            "groupadmin_maintenance",
+            self.MAINTENANCE_INTERVAL,
+            conditions=[self._is_idle],
+        )
+
+    async def on_close(self, *args, **kwargs):
+        """插件卸载"""
+        await self.pipeline.stop()
+        self._checkpoint()
+        await self.store.aflush()
+        outbox.uninstall(self)
+        # 没有其它插件使用时结束分片进程，避免插件重载后残留
+        shard_pool.uninstall(self)
 
     # ========== 配置管理 ==========
 
     def _load_config(self) -> GroupAdminConfig:
-        if self.config_path.exists():
-            try:
-                data = json.loads(self.config_path.read_text(encoding="utf-8"))
-                rules = [GroupRule(**r) for r in data.get("rules", [])]
-                return GroupAdminConfig(rules=rules)
-            except Exception:
-                pass
-        return GroupAdminConfig()
+        return self.store.get("config", GroupAdminConfig, GroupAdminConfig())
 
     def _save_config(self):
-        data = {"rules": [asdict(r) for r in self.config.rules]}
-        self.config_path.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+        self.store.set("config", self.config)
 
     def _get_rule(self, group_id: str) -> GroupRule:
         for rule in self.config.rules:
@@ -72,6 +132,66 @@ class GroupAdminPlugin(NcatBotPlugin):
             self.config.rules.append(rule)
         return rule
 
+    # ========== 检查点 ==========
+
+    def _restore_pending_requests(self) -> dict:
+        expire = time.time() - self.PENDING_REQUEST_TTL
+        saved = self.store.get("pending_requests", default={})
+        return {
+            flag: PendingRequest(sys.intern(entry[0]), *entry[1:])
+            for flag, entry in saved.items() if entry[3] >= expire
+        }
+
+    def _checkpoint(self):
+        """有变化时保存待处理加群请求的快照，丢弃超时的请求"""
+        if not self._pending_dirty:
+            return
+        self._pending_dirty = False
+        expire = time.time() - self.PENDING_REQUEST_TTL
+        # 在调度线程中执行，先复制再遍历
+        snapshot = {
+            flag: entry for flag, entry in self.pending_requests.copy().items()
+            if entry.time >= expire
+        }
+        self.store.set("pending_requests", snapshot)
+
+    # ========== 数据库维护 ==========
+
+    def _is_idle(self) -> bool:
+        return time.time() - self._last_activity >= self.MAINTENANCE_IDLE_SECONDS
+
+    def _run_maintenance(
+        self, vacuum: bool, group_id: Optional[str] = None
+    ) -> tuple[int, int, int]:
+        """按保留策略归档旧记录，返回 (归档条数, 压缩前大小, 压缩后大小)
+
+        指定 group_id 时只归档该群。
+        """
+        size_before = self.db.size()
+        archived = 0
+        for rule in self.config.rules:
+            if group_id is not None and rule.group_id != group_id:
+                continue
+            if rule.retention_days <= 0 and rule.retention_records <= 0:
+                continue
+            archived += self.db.archive_old_records(
+                rule.group_id, rule.retention_days, rule.retention_records
+            )
+        if vacuum:
+            self.db.optimize()
+            self._last_vacuum = time.time()
+        return archived, size_before, self.db.size()
+
+    async def _maintenance_task(self):
+        """定时维护任务"""
+        vacuum = time.time() - self._last_vacuum >= self.VACUUM_INTERVAL
+        archived, before, after = self._run_maintenance(vacuum)
+        if archived or vacuum:
+            logger.info(
+                f"数据库维护: 归档 {archived} 条, "
+                f"大小 {before // 1024}KB → {after // 1024}KB"
+            )
+
     # ========== 事件处理 ==========
 
     @on_group_request
@@ -79,6 +199,7 @@ class GroupAdminPlugin(NcatBotPlugin):
         """处理加群请求"""
         if not event.is_group_request():
             return
+        self._last_activity = time.time()
 
         group_id = event.group_id
         rule = self._get_rule(group_id)
@@ -89,17 +210,45 @@ class GroupAdminPlugin(NcatBotPlugin):
         comment = event.comment or ""
         user_id = event.user_id
 
-        # 缓存请求信息
-        self.pending_requests[event.flag] = (group_id, user_id, comment)
+        # 缓存请求信息，群号驻留后同群的请求共用一个字符串
+        self.pending_requests[event.flag] = PendingRequest(
+            sys.intern(group_id), user_id, comment, time.time()
+        )
+        self._pending_dirty = True
+
+        # 被踢成员再次申请
+        if rule.kicked_policy != "none" and user_id in self.kicked_index.get(group_id, ()):
+            if rule.kicked_policy == "reject":
+                self.pipeline.submit(
+                    Decision(event.flag, group_id, user_id, False, rule.reject_reason)
+                )
+            else:
+                outbox.submit(
+                    group_id,
+                    f"⚠️ 加群申请人 {user_id} 曾被移出本群，请管理员人工审核",
+                    lambda t: self.api.post_group_msg(group_id, text=t),
+                )
+            logger.info(f"被踢成员再次申请: group={group_id}, user={user_id}")
+            return
+
+        # 防刷模式: 请求速率超过阈值时暂缓自动审批，交由管理员处理
+        arrivals = self.pipeline.record_arrival(group_id)
+        if rule.raid_threshold and arrivals > rule.raid_threshold:
+            self.held_requests[group_id] = self.held_requests.get(group_id, 0) + 1
+            logger.warning(
+                f"防刷模式暂缓审批: group={group_id}, user={user_id}, "
+                f"{arrivals}次/分钟"
+            )
+            return
 
-        # 检查回答是否匹配
+        # 检查回答是否匹配，决定入队异步执行
         if rule.pattern:
-            if re.search(rule.pattern, comment, re.IGNORECASE):
-                await event.approve(True)
-                logger.info(f"自动通过: group={group_id}, user={user_id}")
+            if await shard_pool.run(group_id, match_answer, rule.pattern, comment):
+                self.pipeline.submit(Decision(event.flag, group_id, user_id, True))
             elif rule.auto_reject:
-                await event.approve(False, reason=rule.reject_reason)
-                logger.info(f"自动拒绝: group={group_id}, user={user_id}")
+                self.pipeline.submit(
+                    Decision(event.flag, group_id, user_id, False, rule.reject_reason)
+                )
 
     @on_group_increase
     async def handle_group_increase(self, event: NoticeEvent):
@@ -107,6 +256,7 @@ class GroupAdminPlugin(NcatBotPlugin):
         group_id = event.group_id
         user_id = event.user_id
         join_type = event.sub_type  # approve/invite
+        self._last_activity = time.time()
 
         rule = self._get_rule(group_id)
         if rule is None or not rule.enabled:
@@ -114,14 +264,16 @@ class GroupAdminPlugin(NcatBotPlugin):
 
         # 尝试从缓存获取入群回答
         join_answer = None
-        for flag, (g, u, comment) in list(self.pending_requests.items()):
+        for flag, (g, u, comment, _) in list(self.pending_requests.items()):
             if g == group_id and u == user_id:
                 join_answer = comment
                 del self.pending_requests[flag]
+                self._pending_dirty = True
                 break
 
         # 记录入群
-        self.db.add_join_record(
+        await shard_pool.call(
+            group_id, self.db, "add_join_record",
             user_id=user_id,
             group_id=group_id,
             join_time=event.time,
@@ -135,6 +287,7 @@ class GroupAdminPlugin(NcatBotPlugin):
         """处理退群事件"""
         if event.notice_type != "group_decrease":
             return
+        self._last_activity = time.time()
 
         group_id = event.group_id
         user_id = event.user_id
@@ -144,12 +297,16 @@ class GroupAdminPlugin(NcatBotPlugin):
         if rule is None or not rule.enabled:
             return
 
-        self.db.update_leave_record(
+        await shard_pool.call(
+            group_id, self.db, "update_leave_record",
             user_id=user_id,
             group_id=group_id,
             leave_time=event.time,
             leave_type=leave_type,
         )
+        if leave_type == "kick":
+            await shard_pool.call(group_id, self.db, "add_kicked_user", user_id, group_id)
+            self.kicked_index.setdefault(group_id, set()).add(user_id)
         logger.info(f"退群记录: group={group_id}, user={user_id}")
 
     # ========== 管理命令 ==========
@@ -161,7 +318,7 @@ class GroupAdminPlugin(NcatBotPlugin):
         rule = self._get_or_create_rule(group_id)
         rule.enabled = True
         self._save_config()
-        await event.reply("群管功能已启用")
+        await outbox.reply(event, "群管功能已启用")
 
     @command_registry.command("ga_disable", description="[管理员] 禁用本群群管功能")
     async def cmd_disable(self, event: GroupMessageEvent):
@@ -171,7 +328,7 @@ class GroupAdminPlugin(NcatBotPlugin):
         if rule:
             rule.enabled = False
             self._save_config()
-        await event.reply("群管功能已禁用")
+        await outbox.reply(event, "群管功能已禁用")
 
     @command_registry.command("ga_pattern", description="[管理员] 设置入群验证正则")
     @param(name="pattern", default="", help="正则表达式，留空则清除")
@@ -182,9 +339,9 @@ class GroupAdminPlugin(NcatBotPlugin):
         rule.pattern = pattern
         self._save_config()
         if pattern:
-            await event.reply(f"入群验证正则已设置: {pattern}")
+            await outbox.reply(event, f"入群验证正则已设置: {pattern}")
         else:
-            await event.reply("入群验证正则已清除")
+            await outbox.reply(event, "入群验证正则已清除")
 
     @command_registry.command("ga_reject", description="[管理员] 设置自动拒绝")
     @param(name="enabled", default=True, help="是否启用自动拒绝")
@@ -199,7 +356,90 @@ class GroupAdminPlugin(NcatBotPlugin):
         rule.reject_reason = reason
         self._save_config()
         status = "启用" if enabled else "禁用"
-        await event.reply(f"自动拒绝已{status}，理由: {reason}")
+        await outbox.reply(event, f"自动拒绝已{status}，理由: {reason}")
+
+    @command_registry.command("ga_retention", description="[管理员] 设置成员记录保留策略")
+    @param(name="days", default=0, help="退群记录保留天数，0 为不限")
+    @param(name="records", default=0, help="每个成员保留记录条数，0 为不限")
+    async def cmd_retention(
+        self, event: GroupMessageEvent, days: int = 0, records: int = 0
+    ):
+        """设置成员记录保留策略"""
+        if days < 0 or records < 0:
+            await outbox.reply(event, "参数不能为负数")
+            return
+        group_id = str(event.group_id)
+        rule = self._get_or_create_rule(group_id)
+        rule.retention_days = days
+        rule.retention_records = records
+        self._save_config()
+        await outbox.reply(
+            event,
+            f"记录保留策略已设置: {days or '不限'}天 / 每人{records or '不限'}条",
+        )
+
+    @command_registry.command("ga_compact", description="[管理员] 立即归档本群记录，root 同时压缩数据库")
+    async def cmd_compact(self, event: GroupMessageEvent):
+        """立即归档本群记录；VACUUM/ANALYZE 作用于整个数据库，仅 root 可执行"""
+        group_id = str(event.group_id)
+        user_id = str(event.user_id)
+        is_root = self.rbac_manager.user_has_role(user_id, "root")
+        if not is_root and not await role_cache.is_group_admin(self.api, group_id, user_id):
+            await outbox.reply(event, "需要管理员权限")
+            return
+        # 归档和 VACUUM 可能耗时较长，在线程中执行避免阻塞事件循环
+        archived, before, after = await asyncio.to_thread(
+            self._run_maintenance, is_root, group_id
+        )
+        lines = [f"已归档 {archived} 条记录"]
+        if is_root:
+            lines.append(f"数据库大小: {before // 1024}KB → {after // 1024}KB")
+        await outbox.reply(event, "\n".join(lines))
+
+    @command_registry.command("ga_raid", description="[管理员] 设置防刷模式阈值")
+    @param(name="threshold", default=0, help="每分钟加群请求数阈值，0 为关闭")
+    async def cmd_raid(self, event: GroupMessageEvent, threshold: int = 0):
+        """设置防刷模式阈值"""
+        if threshold < 0:
+            await outbox.reply(event, "阈值不能为负数")
+            return
+        group_id = str(event.group_id)
+        rule = self._get_or_create_rule(group_id)
+        rule.raid_threshold = threshold
+        self._save_config()
+        self.held_requests.pop(group_id, None)
+        if threshold:
+            await outbox.reply(event, f"防刷模式已启用: 超过 {threshold} 次/分钟时暂缓自动审批")
+        else:
+            await outbox.reply(event, "防刷模式已关闭")
+
+    @command_registry.command("ga_repeat", description="[管理员] 设置被踢成员再次申请的处理方式")
+    @param(name="policy", default="none", help="none 不处理 / flag 提醒 / reject 拒绝")
+    async def cmd_repeat(self, event: GroupMessageEvent, policy: str = "none"):
+        """设置被踢成员再次申请的处理方式"""
+        if policy not in ("none", "flag", "reject"):
+            await outbox.reply(event, "处理方式只能是 none/flag/reject")
+            return
+        group_id = str(event.group_id)
+        rule = self._get_or_create_rule(group_id)
+        rule.kicked_policy = policy
+        self._save_config()
+        await outbox.reply(event, f"被踢成员再次申请处理方式: {policy}")
+
+    @command_registry.command("ga_queue", description="查看加群审批队列状态")
+    async def cmd_queue(self, event: GroupMessageEvent):
+        """查看审批队列状态"""
+        group_id = str(event.group_id)
+        avg, peak = self.pipeline.latency_stats()
+        lines = [
+            "审批队列:",
+            f"  排队: {self.pipeline.depth}",
+            f"  已处理: {self.pipeline.processed} (失败 {self.pipeline.failed}, "
+            f"重复 {self.pipeline.duplicates})",
+            f"  延迟: 平均 {avg * 1000:.0f}ms / 最大 {peak * 1000:.0f}ms",
+            f"  本群暂缓: {self.held_requests.get(group_id, 0)}",
+        ]
+        await outbox.reply(event, "\n".join(lines))
 
     @command_registry.command("ga_status", description="查看本群群管状态")
     async def cmd_status(self, event: GroupMessageEvent):
@@ -207,14 +447,18 @@ class GroupAdminPlugin(NcatBotPlugin):
         group_id = str(event.group_id)
         rule = self._get_rule(group_id)
         if rule is None or not rule.enabled:
-            await event.reply("群管功能未启用")
+            await outbox.reply(event, "群管功能未启用")
             return
         lines = [
             "群管状态:",
             f"  正则: {rule.pattern or '未设置'}",
             f"  自动拒绝: {'是' if rule.auto_reject else '否'}",
+            f"  记录保留: {rule.retention_days or '不限'}天 / "
+            f"每人{rule.retention_records or '不限'}条",
+            f"  防刷阈值: {rule.raid_threshold or '关闭'}",
+            f"  被踢成员再次申请: {rule.kicked_policy}",
         ]
-        await event.reply("\n".join(lines))
+        await outbox.reply(event, "\n".join(lines))
 
     @command_registry.command("ga_query", description="[管理员] 查询成员记录")
     @param(name="user_id", default=None, help="用户QQ号，不填则查询最近记录")
@@ -226,7 +470,7 @@ class GroupAdminPlugin(NcatBotPlugin):
         records = self.db.get_member_records(group_id, user_id)
 
         if not records:
-            await event.reply("无记录")
+            await outbox.reply(event, "无记录")
             return
 
         # 只显示最近10条
@@ -238,7 +482,74 @@ class GroupAdminPlugin(NcatBotPlugin):
             answer = (r.join_answer[:20] + "...") if r.join_answer and len(r.join_answer) > 20 else (r.join_answer or "")
             lines.append(f"  {r.user_id}: {join_time}→{leave_time} [{answer}]")
 
-        await event.reply("\n".join(lines))
+        await outbox.reply(event, "\n".join(lines))
+
+    @command_registry.command("ga_backfill", description="[管理员] 导入本群现有成员记录")
+    async def cmd_backfill(self, event: GroupMessageEvent):
+        """从群成员列表导入存量成员的入群记录（可断点续传）"""
+        group_id = str(event.group_id)
+        rule = self._get_rule(group_id)
+        if rule is None or not rule.enabled:
+            await outbox.reply(event, "群管功能未启用")
+            return
+
+        if self._backfill_lock.locked():
+            await outbox.reply(event, "已有导入任务在进行中，请稍后再试")
+            return
+
+        async with self._backfill_lock:
+            try:
+                member_list = await self.api.get_group_member_list(group_id)
+            except Exception as e:
+                logger.error(f"get_group_member_list failed: {e}")
+                await outbox.reply(event, f"获取成员列表失败: {e}")
+                return
+
+            # 按 QQ 号排序，保证续传时顺序一致
+            members = sorted(
+                (
+                    (str(m.user_id), int(m.join_time))
+                    for m in member_list.members
+                    if m.join_time
+                ),
+                key=lambda x: x[0],
+            )
+            total = len(members)
+            start = self.db.get_backfill_offset(group_id)
+            if start >= total:
+                start = 0
+
+            if start:
+                await outbox.reply(event, f"继续导入: {start}/{total}")
+
+            inserted = 0
+            begin = time.perf_counter()
+            for i in range(start, total, self.BACKFILL_BATCH_SIZE):
+                batch = members[i:i + self.BACKFILL_BATCH_SIZE]
+                inserted += self.db.add_join_records_bulk(
+                    group_id,
+                    batch,
+                    join_type="backfill",
+                    offset=i + len(batch),
+                    total=total,
+                )
+                # 让出事件循环，避免长时间阻塞其它事件处理
+                await asyncio.sleep(self.BACKFILL_BATCH_INTERVAL)
+            elapsed = time.perf_counter() - begin
+
+            self.db.clear_backfill_progress(group_id)
+
+        processed = total - start
+        rate = processed / elapsed if elapsed > 0 else processed
+        logger.info(
+            f"成员导入: group={group_id}, processed={processed}, "
+            f"inserted={inserted}, {rate:.0f} rows/s"
+        )
+        await outbox.reply(
+            event,
+            f"导入完成: 处理 {processed} 人，新增 {inserted} 条记录，"
+            f"耗时 {elapsed:.2f}s ({rate:.0f} 条/秒)",
+        )
 
 
 __all__ = ["GroupAdminPlugin"]
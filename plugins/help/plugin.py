@@ -4,13 +4,19 @@ import re
 from ncatbot.plugin_system import NcatBotPlugin, command_registry, param
 from ncatbot.core.event import GroupMessageEvent, PrivateMessageEvent, BaseMessageEvent
 
+from common.outbox import outbox
+from common.role_cache import role_cache
+from common.startup import startup_profile
+
 
 class HelpPlugin(NcatBotPlugin):
     name = "HelpPlugin"
-    version = "1.2.0"
+    version = "1.3.0"
     author = "Windsland52"
     dependencies = {}
 
+    PERMISSIONS = ("root", "admin", "user")
+
     # 插件显示名称映射
     PLUGIN_NAMES = {
         "help": "帮助",
@@ -20,6 +26,24 @@ class HelpPlugin(NcatBotPlugin):
         "todo": "待办",
     }
 
+    @startup_profile.timed_load
+    async def on_load(self):
+        """插件加载"""
+        # 帮助索引在首次 /help 时构建（此时插件已全部加载），插件重载时失效
+        self._help_index = None
+        self._help_fingerprint = None
+        self.register_handler("ncatbot.plugin_load", self._invalidate_help_index)
+        self.register_handler("ncatbot.plugin_unload", self._invalidate_help_index)
+        # 管理员变动、成员进出群时失效角色缓存
+        role_cache.install(self)
+        # 命令回复经共享发送队列限速
+        outbox.install(self)
+
+    async def on_close(self, *args, **kwargs):
+        """插件卸载"""
+        role_cache.uninstall(self)
+        outbox.uninstall(self)
+
     def _get_plugin_display_name(self, plugin_name: str) -> str:
         """获取插件显示名称"""
         return self.PLUGIN_NAMES.get(plugin_name, plugin_name)
@@ -34,12 +58,8 @@ class HelpPlugin(NcatBotPlugin):
 
         # 检查群管理员
         if isinstance(event, GroupMessageEvent):
-            try:
-                info = await self.api.get_group_member_info(event.group_id, event.user_id)
-                if info.role in ("owner", "admin"):
-                    return "admin"
-            except Exception:
-                pass
+            if await role_cache.is_group_admin(self.api, event.group_id, event.user_id):
+                return "admin"
 
         return "user"
 
@@ -68,57 +88,102 @@ class HelpPlugin(NcatBotPlugin):
             grouped[plugin].append((cmd_name, cmd_spec))
         return grouped
 
-    @command_registry.command("help", description="显示帮助信息")
-    @param(name="module", default=None, help="模块名称")
-    async def help_cmd(self, event: BaseMessageEvent, module: str = None):
-        """显示帮助信息"""
-        permission = await self._get_user_permission(event)
-        grouped = self._group_commands_by_plugin()
+    # ========== 帮助索引 ==========
 
-        # 过滤用户有权限的命令
-        filtered = {}
-        for plugin, cmds in grouped.items():
-            visible_cmds = [
-                (name, spec) for name, spec in cmds
-                if self._can_use_command(spec.description, permission)
-            ]
-            if visible_cmds:
-                filtered[plugin] = visible_cmds
+    async def _invalidate_help_index(self, event=None):
+        self._help_index = None
+
+    def _registry_fingerprint(self) -> tuple:
+        """命令注册表的廉价指纹，用于发现未通过事件通知的变化"""
+        root = command_registry.root_group
+        return len(root.commands), len(root.subgroups)
+
+    def _build_help_index(self) -> dict:
+        """按权限预渲染模块列表和各模块命令
+
+        返回 {permission: {"list": 文本, "modules": {插件: 文本}, "lookup": {名称: 插件}}}
+        """
+        grouped = self._group_commands_by_plugin()
+        index = {}
+        for permission in self.PERMISSIONS:
+            filtered = {}
+            for plugin, cmds in grouped.items():
+                visible_cmds = [
+                    (name, spec) for name, spec in cmds
+                    if self._can_use_command(spec.description, permission)
+                ]
+                if visible_cmds:
+                    filtered[plugin] = sorted(visible_cmds, key=lambda x: x[0])
 
-        if module is None:
-            # 显示模块列表
             lines = ["📚 可用模块:"]
+            modules = {}
+            lookup = {}
             for plugin, cmds in sorted(filtered.items()):
                 display_name = self._get_plugin_display_name(plugin)
                 lines.append(f"  • {display_name} ({len(cmds)}个命令)")
+
+                module_lines = [f"📦 {display_name} 命令:"]
+                for cmd_name, cmd_spec in cmds:
+                    desc = cmd_spec.description or "无描述"
+                    module_lines.append(f"  /{cmd_name} - {desc}")
+                modules[plugin] = "\n".join(module_lines)
+                lookup[plugin.lower()] = plugin
+                lookup[display_name.lower()] = plugin
             lines.append("")
             lines.append("输入 /help <模块名> 查看详细命令")
-            await event.reply("\n".join(lines))
-        else:
-            # 查找匹配的模块
-            target_plugin = None
-            module_lower = module.lower()
-            for plugin in filtered.keys():
-                if plugin.lower() == module_lower:
-                    target_plugin = plugin
-                    break
-                display = self._get_plugin_display_name(plugin)
-                if display == module:
-                    target_plugin = plugin
-                    break
-
-            if target_plugin is None:
-                await event.reply(f"未找到模块: {module}")
-                return
-
-            # 显示该模块的命令
-            cmds = filtered[target_plugin]
-            display_name = self._get_plugin_display_name(target_plugin)
-            lines = [f"📦 {display_name} 命令:"]
-            for cmd_name, cmd_spec in sorted(cmds, key=lambda x: x[0]):
-                desc = cmd_spec.description or "无描述"
-                lines.append(f"  /{cmd_name} - {desc}")
-            await event.reply("\n".join(lines))
+            index[permission] = {
+                "list": "\n".join(lines),
+                "modules": modules,
+                "lookup": lookup,
+            }
+        return index
+
+    def _get_help_index(self) -> dict:
+        fingerprint = self._registry_fingerprint()
+        if self._help_index is None or fingerprint != self._help_fingerprint:
+            self._help_index = self._build_help_index()
+            self._help_fingerprint = fingerprint
+        return self._help_index
+
+    @staticmethod
+    def _match_module(lookup: dict, module: str) -> tuple:
+        """按 精确 > 前缀 > 模糊 匹配模块，返回 (插件名, 候选列表)"""
+        key = module.lower()
+        if key in lookup:
+            return lookup[key], []
+        candidates = sorted({p for name, p in lookup.items() if name.startswith(key)})
+        if len(candidates) == 1:
+            return candidates[0], []
+        if not candidates:
+            import difflib  # 仅模糊匹配时需要
+
+            close = difflib.get_close_matches(key, lookup.keys(), n=3, cutoff=0.6)
+            candidates = sorted({lookup[name] for name in close})
+            if len(candidates) == 1:
+                return candidates[0], []
+        return None, candidates
+
+    @command_registry.command("help", description="显示帮助信息")
+    @param(name="module", default=None, help="模块名称")
+    async def help_cmd(self, event: BaseMessageEvent, module: str = None):
+        """显示帮助信息"""
+        permission = await self._get_user_permission(event)
+        entry = self._get_help_index()[permission]
+
+        if module is None:
+            await outbox.reply(event, entry["list"])
+            return
+
+        target_plugin, candidates = self._match_module(entry["lookup"], module)
+        if target_plugin is None:
+            if candidates:
+                names = "、".join(self._get_plugin_display_name(p) for p in candidates)
+                await outbox.reply(event, f"未找到模块: {module}，你是不是要找: {names}")
+            else:
+                await outbox.reply(event, f"未找到模块: {module}")
+            return
+
+        await outbox.reply(event, entry["modules"][target_plugin])
 
 
 __all__ = ["HelpPlugin"]
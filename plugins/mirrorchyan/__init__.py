@@ -1,6 +1,12 @@
-from .plugin import MirrorChyanPlugin
+import time
+
+_import_started = time.perf_counter()
+
+from common.startup import startup_profile  # noqa: E402
+from .plugin import MirrorChyanPlugin  # noqa: E402
 
 # 修正模块名以便 loader 能找到插件类
 MirrorChyanPlugin.__module__ = __name__
+startup_profile.record_import(__name__, _import_started)
 
 __all__ = ["MirrorChyanPlugin"]
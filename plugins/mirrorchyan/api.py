@@ -3,7 +3,8 @@
 import hashlib
 from pathlib import Path
 from typing import Optional, Tuple
-import httpx
+
+from common.shard import shard_pool
 
 API_BASE = "https://mirrorchyan.com/api/resources"
 USER_AGENT = "37Bot"
@@ -58,6 +59,8 @@ async def get_latest_version(
     if cdk:
         params["cdk"] = cdk
 
+    import httpx  # 首次请求时才导入，加快插件加载
+
     try:
         async with httpx.AsyncClient() as client:
             resp = await client.get(url, params=params, timeout=30)
@@ -88,6 +91,8 @@ async def download_resource(
         params["os"] = "win"
         params["arch"] = "x64"
 
+    import httpx
+
     try:
         async with httpx.AsyncClient() as client:
             resp = await client.get(url, params=params, timeout=30)
@@ -104,26 +109,55 @@ async def download_resource(
             expected_sha256 = data.get("sha256", "")
 
             # 下载前检测：本地文件已存在且hash匹配则跳过
+            # 校验在分片进程中进行(启用时)，不阻塞事件循环
             if expected_sha256 and Path(save_path).exists():
-                local_hash = _calc_sha256(save_path)
+                local_hash = await shard_pool.run(save_path, _calc_sha256, save_path)
                 if local_hash == expected_sha256:
                     return True, "文件已存在且hash匹配，跳过下载", data
 
+            # 未完成的下载保存为 .part 文件，按 hash 区分版本，重启后用 Range 续传。
+            # 没有 hash 时无法确认残留文件属于哪个版本，也无法校验，只能从头下载
+            target = Path(save_path)
+            part_path = target.with_name(
+                f"{target.name}.{expected_sha256[:16]}.part" if expected_sha256 else f"{target.name}.part"
+            )
+            # 文件名可能含 [ 等通配符，按前缀匹配而不用 glob
+            if target.parent.is_dir():
+                for stale in target.parent.iterdir():
+                    name = stale.name
+                    if not (name.startswith(f"{target.name}.") and name.endswith(".part")):
+                        continue
+                    if stale != part_path or not expected_sha256:
+                        stale.unlink(missing_ok=True)
+            offset = part_path.stat().st_size if part_path.exists() else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+
             # 流式下载
-            async with client.stream("GET", data["url"], timeout=600, follow_redirects=True) as dl_resp:
-                if dl_resp.status_code != 200:
+            async with client.stream(
+                "GET", data["url"], headers=headers, timeout=600, follow_redirects=True
+            ) as dl_resp:
+                if dl_resp.status_code == 416 and offset:
+                    pass  # 上次已下载完整，交给下方校验
+                elif dl_resp.status_code in (200, 206):
+                    # 服务端不支持 Range 时返回 200，从头下载
+                    if dl_resp.status_code == 200:
+                        offset = 0
+                    with open(part_path, "ab" if offset else "wb") as f:
+                        async for chunk in dl_resp.aiter_bytes(chunk_size=8192):
+                            f.write(chunk)
+                else:
                     return False, f"下载失败: {dl_resp.status_code}", None
-                with open(save_path, "wb") as f:
-                    async for chunk in dl_resp.aiter_bytes(chunk_size=8192):
-                        f.write(chunk)
 
             # 下载后校验
             if expected_sha256:
-                actual_hash = _calc_sha256(save_path)
+                actual_hash = await shard_pool.run(save_path, _calc_sha256, str(part_path))
                 if actual_hash != expected_sha256:
-                    Path(save_path).unlink(missing_ok=True)
+                    part_path.unlink(missing_ok=True)
                     return False, f"hash校验失败: 期望{expected_sha256[:16]}... 实际{actual_hash[:16]}...", None
+            part_path.replace(target)
 
+            if offset:
+                return True, f"已从 {offset / 1024 / 1024:.1f}MB 处续传完成", data
             return True, "", data
     except Exception as e:
         return False, str(e), None
@@ -3,7 +3,7 @@
 from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True)
 class ResourceConfig:
     """单个资源的配置"""
 
@@ -28,3 +28,15 @@ class MirrorConfig:
 
     subscriptions: list[GroupSubscription] = field(default_factory=list)
     cdk: str = ""
+
+
+@dataclass(slots=True)
+class UploadJob:
+    """进行中的下载上传任务，完成前持久化，重启后继续"""
+
+    group_id: str
+    rid: str
+    type: int
+    channel: str = "stable"
+    auto: bool = False  # 订阅自动上传 / 手动 /mirror_download
+    created: int = 0
@@ -1,16 +1,22 @@
 """MirrorChyan 软件更新检测插件"""
 
-import re
-import json
+import time
+import asyncio
 from pathlib import Path
-from dataclasses import asdict
 
 from ncatbot.plugin_system import NcatBotPlugin, command_registry, param
 from ncatbot.core.event import GroupMessageEvent, PrivateMessageEvent
 from ncatbot.utils import get_log
 
-from .config import MirrorConfig, GroupSubscription, ResourceConfig
+from common.role_cache import role_cache
+from common.startup import startup_profile, defer_start
+from common.store import Store
+from common.outbox import outbox
+from common.shard import shard_pool
+
+from .config import MirrorConfig, GroupSubscription, ResourceConfig, UploadJob
 from .api import get_latest_version, download_resource
+from .release_note import parse_release_note
 
 logger = get_log("MirrorChyan")
 
@@ -21,47 +27,110 @@ class MirrorChyanPlugin(NcatBotPlugin):
     author = "Windsland52"
     dependencies = {}
 
+    # 停机期间已到期的检查在启动后按此间隔(秒)依次执行
+    RESUME_STAGGER = 5
+
+    @startup_profile.timed_load
     async def on_load(self):
         """插件加载"""
         # 使用框架提供的 workspace 目录
         self.data_dir = self.workspace
-        self.config_path = self.data_dir / "config.json"
-        self.state_path = self.data_dir / "state.json"
+        self.store = Store(self.data_dir / "store.db")
+        # 迁移旧版 config.json / state.json
+        for key in ("config", "state"):
+            json_path = self.data_dir / f"{key}.json"
+            try:
+                if self.store.migrate_json(key, json_path):
+                    logger.info(f"已从 {json_path.name} 迁移数据")
+            except Exception as e:
+                logger.error(f"{json_path.name} 迁移失败，原文件已保留: {e}")
 
         self.config = self._load_config()
         self.state = self._load_state()  # {rid: last_version}
+        # 正在执行的下载上传任务键，避免同一资源重复下载
+        self._running_jobs: set[str] = set()
+        self._job_tasks: set[asyncio.Task] = set()
 
-        # 启动定时检查
+        # 启动定时检查，从上次检查时间继续计时
         self._start_check_tasks()
+        # 管理员变动、成员进出群时失效角色缓存
+        role_cache.install(self)
+        # 群消息发送队列在主事件循环中运行
+        outbox.install(self)
+        # 更新说明解析和文件校验可分派到分片进程(BOT_SHARD_WORKERS)
+        shard_pool.install(self)
+        # 继续重启前未完成的下载上传
+        defer_start(self, self._resume_jobs)
+
+    async def on_close(self, *args, **kwargs):
+        """插件卸载"""
+        # 取消的任务保留持久化记录，下次启动时继续
+        for task in self._job_tasks:
+            task.cancel()
+        await asyncio.gather(*self._job_tasks, return_exceptions=True)
+        await self.store.aflush()
+        role_cache.uninstall(self)
+        outbox.uninstall(self)
+        # 没有其它插件使用时结束分片进程，插件重载时由 on_load 重新启动；关闭后的任务直接执行
+        shard_pool.uninstall(self)
 
     async def _is_group_admin(self, group_id: str, user_id: str) -> bool:
         """检查用户是否是群主或管理员"""
-        try:
-            info = await self.api.get_group_member_info(group_id, user_id)
-            role = info.role
-            logger.info(f"group={group_id}, user={user_id}, role={role}")
-            return role in ("owner", "admin")
-        except Exception as e:
-            logger.error(f"get_group_member_info error: {e}")
-            return False
+        return await role_cache.is_group_admin(self.api, group_id, user_id)
+
+    @staticmethod
+    def _task_name(group_id: str, res: ResourceConfig) -> str:
+        return f"mirror_{group_id}_{res.rid}_{res.type}"
 
     def _start_check_tasks(self):
-        """启动所有订阅的定时检查任务"""
+        """启动所有订阅的定时检查任务
+
+        有上次检查时间的资源在 上次检查 + 间隔 时首次检查；停机期间已到期的
+        错开执行，避免启动时同时触发。
+        """
+        now = time.time()
+        overdue = 0
         for sub in self.config.subscriptions:
             for res in sub.resources:
-                task_name = (
-                    f"mirror_{sub.group_id}_{res.rid}_{res.type}"
-                )
-                self.add_scheduled_task(
-                    self._make_check_task(sub.group_id, res),
-                    task_name,
-                    f"{res.interval}s",
-                )
+                last_run = self.store.get(f"last_run:{self._task_name(sub.group_id, res)}")
+                delay = None
+                if last_run is not None:
+                    delay = last_run + res.interval - now
+                    if delay <= 0:
+                        overdue += 1
+                        delay = overdue * self.RESUME_STAGGER
+                self._schedule_check(sub.group_id, res, delay)
+
+    def _schedule_check(self, group_id: str, res: ResourceConfig, first_delay: float = None):
+        """注册定时检查，first_delay 秒后首次检查，之后每 interval 秒一次"""
+        task_name = self._task_name(group_id, res)
+        if first_delay is None or first_delay >= res.interval:
+            self.add_scheduled_task(
+                self._make_check_task(group_id, res), task_name, f"{res.interval}s"
+            )
+            return
+
+        async def first_run():
+            # 先注册周期任务，使之后的检查以本次为起点
+            self.add_scheduled_task(
+                self._make_check_task(group_id, res), task_name, f"{res.interval}s"
+            )
+            await self._make_check_task(group_id, res)()
+
+        self.add_scheduled_task(
+            first_run, f"{task_name}_resume", f"{max(1, int(first_delay))}s", max_runs=1
+        )
+
+    def _unschedule_check(self, group_id: str, res: ResourceConfig):
+        task_name = self._task_name(group_id, res)
+        self.remove_scheduled_task(task_name)
+        self.remove_scheduled_task(f"{task_name}_resume")
 
     def _make_check_task(self, group_id: str, res: ResourceConfig):
         """创建检查任务闭包"""
 
         async def task():
+            self.store.set(f"last_run:{self._task_name(group_id, res)}", int(time.time()))
             await self._check_resource(group_id, res)
 
         return task
@@ -69,51 +138,13 @@ class MirrorChyanPlugin(NcatBotPlugin):
     # ========== 配置管理 ==========
 
     def _load_config(self) -> MirrorConfig:
-        if self.config_path.exists():
-            try:
-                data = json.loads(self.config_path.read_text(encoding="utf-8"))
-                return self._dict_to_config(data)
-            except Exception:
-                pass
-        return MirrorConfig()
+        return self.store.get("config", MirrorConfig, MirrorConfig())
 
     def _save_config(self):
-        data = self._config_to_dict(self.config)
-        self.config_path.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+        self.store.set("config", self.config)
 
     def _load_state(self) -> dict:
-        if self.state_path.exists():
-            try:
-                return json.loads(self.state_path.read_text(encoding="utf-8"))
-            except Exception:
-                pass
-        return {}
-
-    def _save_state(self):
-        self.state_path.write_text(
-            json.dumps(self.state, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
-
-    def _dict_to_config(self, data: dict) -> MirrorConfig:
-        subs = []
-        for s in data.get("subscriptions", []):
-            resources = [ResourceConfig(**r) for r in s.get("resources", [])]
-            subs.append(GroupSubscription(group_id=s["group_id"], resources=resources))
-        return MirrorConfig(
-            subscriptions=subs,
-            cdk=data.get("cdk", ""),
-        )
-
-    def _config_to_dict(self, cfg: MirrorConfig) -> dict:
-        return {
-            "subscriptions": [
-                {"group_id": s.group_id, "resources": [asdict(r) for r in s.resources]}
-                for s in cfg.subscriptions
-            ],
-            "cdk": cfg.cdk,
-        }
+        return self.store.get("state", default={})
 
     # ========== 定时检查 ==========
 
@@ -129,12 +160,19 @@ class MirrorChyanPlugin(NcatBotPlugin):
 
         if version and version != last_version:
             self.state[state_key] = version
-            self._save_state()
+            # 自动上传任务与版本状态在同一事务中提交，重启后继续上传而不会重复通知
+            items = {"state": self.state}
+            job = None
+            if res.auto and self.config.cdk:
+                job = UploadJob(
+                    group_id, res.rid, res.type, res.channel, auto=True, created=int(time.time())
+                )
+                items[self._job_key(job)] = job
+            self.store.set_many(items)
             await self._notify_update(group_id, res, data)
 
-            # 自动上传
-            if res.auto and self.config.cdk:
-                await self._auto_upload(group_id, res, data)
+            if job is not None:
+                await self._run_job(job)
 
     async def _check_resource_force(self, group_id: str, res: ResourceConfig):
         """强制获取并显示更新信息"""
@@ -143,69 +181,24 @@ class MirrorChyanPlugin(NcatBotPlugin):
             return
         await self._notify_update(group_id, res, data)
 
-    def _parse_release_note(self, note: str) -> str:
-        """解析并格式化更新说明"""
-        if not note:
-            return ""
-
-        # 移除 HTML 注释
-        note = re.sub(r'<!--.*?-->', '', note, flags=re.DOTALL)
-        # 移除链接但保留文字
-        note = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', note)
-        # 移除图片
-        note = re.sub(r'!\[.*?\]\(.*?\)', '', note)
-        # 移除引用块标记
-        note = re.sub(r'^>\s*', '', note, flags=re.MULTILINE)
-
-        sections = {}
-        current_section = None
-        current_items = []
-
-        for line in note.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-
-            # 检测分类标题 (### 🐛 Bug修复)
-            if line.startswith('#'):
-                if current_section and current_items:
-                    sections[current_section] = current_items
-                # 提取标题文字
-                title = re.sub(r'^#+\s*', '', line)
-                current_section = title
-                current_items = []
-            # 检测列表项 (- xxx 或 * xxx)
-            elif line.startswith(('-', '*')) and current_section:
-                item = re.sub(r'^[-*]\s*', '', line)
-                # 清理粗体/斜体
-                item = re.sub(r'\*+([^*]+)\*+', r'\1', item)
-                if item:
-                    current_items.append(item)
-
-        if current_section and current_items:
-            sections[current_section] = current_items
-
-        # 格式化输出
-        result = []
-        for title, items in sections.items():
-            if items:
-                result.append(title)
-                for item in items:
-                    result.append(f"  • {item}")
-
-        return '\n'.join(result) if result else "无详细说明"
+    def _notify(self, group_id: str, text: str):
+        """后台通知经发送队列限速，短时间内发往同一群的消息合并为一条"""
+        outbox.submit(group_id, text, lambda t: self.api.post_group_msg(group_id, text=t))
 
     async def _notify_update(self, group_id: str, res: ResourceConfig, data: dict):
         """发送更新通知"""
         version = data.get('version_name', '')
-        release_note = self._parse_release_note(data.get('release_note', ''))
+        # 解析在分片进程中进行(启用时)，同一群的通知保持顺序
+        release_note = await shard_pool.run(
+            group_id, parse_release_note, data.get('release_note', '')
+        )
 
         msg = (
             f"📦 {res.rid} 更新 {version}\n"
             f"━━━━━━━━━━━━━━\n"
             f"{release_note}"
         )
-        await self.api.post_group_msg(group_id, text=msg)
+        self._notify(group_id, msg)
 
     async def _get_or_create_folder(self, group_id: str, folder_name: str) -> tuple[str, str]:
         """获取或创建文件夹，返回 (文件夹ID, 错误信息)"""
@@ -254,37 +247,81 @@ class MirrorChyanPlugin(NcatBotPlugin):
             logger.error(f"检查文件是否存在失败: {e}")
         return False
 
-    async def _auto_upload(self, group_id: str, res: ResourceConfig, data: dict):
-        """自动下载并上传到群文件"""
-        type_name = "通用" if res.type == 0 else "win-x64"
-        filename = f"{res.rid}-{type_name}.zip"
+    # ========== 下载上传任务 ==========
+
+    @staticmethod
+    def _job_key(job: UploadJob) -> str:
+        return f"upload:{job.group_id}:{job.rid}:{job.type}"
+
+    def _resume_jobs(self):
+        """继续重启前未完成的下载上传任务，已下载的部分会续传"""
+        for key in self.store.keys("upload:"):
+            job = self.store.get(key, UploadJob)
+            if job is None or not self.config.cdk:
+                self.store.delete(key)
+                continue
+            logger.info(f"继续未完成的任务: {job.rid} → 群{job.group_id}")
+            task = asyncio.create_task(self._run_job(job))
+            self._job_tasks.add(task)
+            task.add_done_callback(self._job_tasks.discard)
+
+    async def _run_job(self, job: UploadJob, report=None):
+        """执行下载上传任务，结束后移除持久化记录
+
+        report 为异步的结果回复函数，默认发送群通知。任务被取消(插件卸载)时
+        保留记录，下次启动继续。
+        """
+        if report is None:
+            async def report(text: str):
+                self._notify(job.group_id, text)
+
+        key = self._job_key(job)
+        if key in self._running_jobs:
+            await report(f"{job.rid} 正在下载中")
+            return
+        self._running_jobs.add(key)
+        try:
+            await self._download_and_upload(job, report)
+        finally:
+            self._running_jobs.discard(key)
+        self.store.delete(key)
+
+    async def _download_and_upload(self, job: UploadJob, report):
+        """下载资源并上传到群文件"""
+        prefix = "自动" if job.auto else ""
+        type_name = "通用" if job.type == 0 else "win-x64"
+        filename = f"{job.rid}-{type_name}.zip"
         save_path = str((self.data_dir / filename).resolve())
 
-        ok, err, _ = await download_resource(
-            res.rid, res.type, res.channel, self.config.cdk, save_path
+        ok, msg, data = await download_resource(
+            job.rid, job.type, job.channel, self.config.cdk, save_path
         )
 
         if not ok:
-            await self.api.post_group_msg(group_id, text=f"自动下载失败: {err}")
+            await report(f"{prefix}下载失败: {msg}")
             return
 
+        # 提示跳过下载或续传完成
+        if msg and not job.auto:
+            await report(msg)
+
         try:
             version = data.get("version_name", "")
-            upload_name = f"{res.rid}-{type_name}-{version}.zip"
-            folder_id, folder_err = await self._get_or_create_folder(group_id, f"{res.rid}下载")
+            upload_name = f"{job.rid}-{type_name}-{version}.zip"
+            folder_id, folder_err = await self._get_or_create_folder(job.group_id, f"{job.rid}下载")
 
             if folder_err:
-                await self.api.post_group_msg(group_id, text=f"{folder_err}，上传到根目录")
+                await report(f"{folder_err}，上传到根目录")
 
             # 检查是否已存在同名文件
-            if await self._file_exists_in_folder(group_id, folder_id, upload_name):
-                await self.api.post_group_msg(group_id, text=f"群文件已存在: {upload_name}，跳过上传")
+            if await self._file_exists_in_folder(job.group_id, folder_id, upload_name):
+                await report(f"群文件已存在: {upload_name}，跳过上传")
                 return
 
-            await self.api.upload_group_file(group_id, save_path, upload_name, folder=folder_id)
-            await self.api.post_group_msg(group_id, text=f"自动上传成功: {upload_name}")
+            await self.api.upload_group_file(job.group_id, save_path, upload_name, folder=folder_id)
+            await report(f"{prefix}上传成功: {upload_name}")
         except Exception as e:
-            await self.api.post_group_msg(group_id, text=f"自动上传失败: {e}")
+            await report(f"{prefix}上传失败: {e}")
 
     # ========== 群聊命令 ==========
 
@@ -313,18 +350,18 @@ class MirrorChyanPlugin(NcatBotPlugin):
     ):
         """订阅资源"""
         if not await self._is_group_admin(event.group_id, event.user_id):
-            await event.reply("需要管理员权限")
+            await outbox.reply(event, "需要管理员权限")
             return
 
         # 参数验证
         if type not in (0, 1):
-            await event.reply("类型只能是 0(通用) 或 1(跨平台)")
+            await outbox.reply(event, "类型只能是 0(通用) 或 1(跨平台)")
             return
         if channel not in ("stable", "beta", "alpha"):
-            await event.reply("渠道只能是 stable/beta/alpha")
+            await outbox.reply(event, "渠道只能是 stable/beta/alpha")
             return
         if interval < 60:
-            await event.reply("检查间隔至少60秒")
+            await outbox.reply(event, "检查间隔至少60秒")
             return
 
         group_id = str(event.group_id)
@@ -333,7 +370,7 @@ class MirrorChyanPlugin(NcatBotPlugin):
         # 检查是否已订阅
         for r in sub.resources:
             if r.rid == rid and r.type == type:
-                await event.reply(f"已订阅 {rid}")
+                await outbox.reply(event, f"已订阅 {rid}")
                 return
 
         res = ResourceConfig(
@@ -347,17 +384,13 @@ class MirrorChyanPlugin(NcatBotPlugin):
         self._save_config()
 
         # 启动定时任务
-        task_name = f"mirror_{group_id}_{res.rid}_{res.type}"
-        self.add_scheduled_task(
-            self._make_check_task(group_id, res),
-            task_name,
-            f"{res.interval}s",
-        )
+        self._schedule_check(group_id, res)
 
         type_name = "通用" if type == 0 else "跨平台"
         auto_str = "是" if auto else "否"
-        await event.reply(
-            f"订阅成功: {rid} ({type_name}, {channel}, {interval}s, 自动上传:{auto_str})"
+        await outbox.reply(
+            event,
+            f"订阅成功: {rid} ({type_name}, {channel}, {interval}s, 自动上传:{auto_str})",
         )
 
     @command_registry.command("mirror_unsub", description="[管理员] 取消订阅")
@@ -367,7 +400,7 @@ class MirrorChyanPlugin(NcatBotPlugin):
     ):
         """取消订阅"""
         if not await self._is_group_admin(event.group_id, event.user_id):
-            await event.reply("需要管理员权限")
+            await outbox.reply(event, "需要管理员权限")
             return
         group_id = str(event.group_id)
         for sub in self.config.subscriptions:
@@ -377,11 +410,11 @@ class MirrorChyanPlugin(NcatBotPlugin):
                         sub.resources.remove(r)
                         self._save_config()
                         # 停止定时任务
-                        task_name = f"mirror_{group_id}_{rid}_{type}"
-                        self.remove_scheduled_task(task_name)
-                        await event.reply(f"已取消订阅: {rid}")
+                        self._unschedule_check(group_id, r)
+                        self.store.delete(f"last_run:{self._task_name(group_id, r)}")
+                        await outbox.reply(event, f"已取消订阅: {rid}")
                         return
-        await event.reply(f"未找到订阅: {rid}")
+        await outbox.reply(event, f"未找到订阅: {rid}")
 
     @command_registry.command("mirror_list", description="查看本群订阅")
     async def cmd_list(self, event: GroupMessageEvent):
@@ -393,9 +426,9 @@ class MirrorChyanPlugin(NcatBotPlugin):
                 for r in sub.resources:
                     t = "通用" if r.type == 0 else "跨平台"
                     lines.append(f"  {r.rid} ({t}, {r.channel})")
-                await event.reply("\n".join(lines))
+                await outbox.reply(event, "\n".join(lines))
                 return
-        await event.reply("本群暂无订阅")
+        await outbox.reply(event, "本群暂无订阅")
 
     @command_registry.command("mirror_check", description="[管理员] 立即检查更新")
     @param(name="rid", default=None, help="资源ID，不填则检查全部")
@@ -403,7 +436,7 @@ class MirrorChyanPlugin(NcatBotPlugin):
     async def cmd_check(self, event: GroupMessageEvent, rid: str = None, force: bool = False):
         """手动检查更新"""
         if not await self._is_group_admin(event.group_id, event.user_id):
-            await event.reply("需要管理员权限")
+            await outbox.reply(event, "需要管理员权限")
             return
 
         group_id = str(event.group_id)
@@ -418,11 +451,11 @@ class MirrorChyanPlugin(NcatBotPlugin):
                             await self._check_resource(group_id, r)
                         checked += 1
                 if checked > 0:
-                    await event.reply(f"已检查 {checked} 个资源")
+                    await outbox.reply(event, f"已检查 {checked} 个资源")
                 else:
-                    await event.reply(f"未找到资源: {rid}")
+                    await outbox.reply(event, f"未找到资源: {rid}")
                 return
-        await event.reply("本群暂无订阅")
+        await outbox.reply(event, "本群暂无订阅")
 
     @command_registry.command("mirror_config", description="[管理员] 修改订阅配置")
     @param(name="type", default=0, help="资源类型 0通用/1跨平台")
@@ -440,7 +473,7 @@ class MirrorChyanPlugin(NcatBotPlugin):
     ):
         """更新配置 用法: /mirror_config <资源ID> [类型0/1] [检查间隔秒] [自动上传]"""
         if not await self._is_group_admin(event.group_id, event.user_id):
-            await event.reply("需要管理员权限")
+            await outbox.reply(event, "需要管理员权限")
             return
 
         group_id = str(event.group_id)
@@ -453,30 +486,24 @@ class MirrorChyanPlugin(NcatBotPlugin):
                             r.interval = interval
                             updated.append(f"检查间隔={interval}s")
                             # 重新注册定时任务
-                            task_name = (
-                                f"mirror_{group_id}_{r.rid}_{r.type}"
-                            )
-                            self.add_scheduled_task(
-                                self._make_check_task(group_id, r),
-                                task_name,
-                                f"{r.interval}s",
-                            )
+                            self._unschedule_check(group_id, r)
+                            self._schedule_check(group_id, r)
                         if auto is not None:
                             r.auto = auto
                             updated.append(f"自动上传={'是' if auto else '否'}")
                         if channel is not None:
                             if channel not in ("stable", "beta", "alpha"):
-                                await event.reply("渠道只能是 stable/beta/alpha")
+                                await outbox.reply(event, "渠道只能是 stable/beta/alpha")
                                 return
                             r.channel = channel
                             updated.append(f"渠道={channel}")
                         if updated:
                             self._save_config()
-                            await event.reply(f"配置已更新: {', '.join(updated)}")
+                            await outbox.reply(event, f"配置已更新: {', '.join(updated)}")
                         else:
-                            await event.reply("未指定要更新的配置")
+                            await outbox.reply(event, "未指定要更新的配置")
                         return
-        await event.reply(f"未找到订阅: {rid}")
+        await outbox.reply(event, f"未找到订阅: {rid}")
 
     @command_registry.command("mirror_download", description="[管理员] 下载资源到群文件")
     @param(name="type", default=1, help="类型 0通用/1跨平台")
@@ -490,58 +517,27 @@ class MirrorChyanPlugin(NcatBotPlugin):
     ):
         """下载并上传"""
         if not await self._is_group_admin(event.group_id, event.user_id):
-            await event.reply("需要管理员权限")
+            await outbox.reply(event, "需要管理员权限")
             return
 
         # 参数验证
         if type not in (0, 1):
-            await event.reply("类型只能是 0(通用) 或 1(跨平台)")
+            await outbox.reply(event, "类型只能是 0(通用) 或 1(跨平台)")
             return
         if channel not in ("stable", "beta", "alpha"):
-            await event.reply("渠道只能是 stable/beta/alpha")
+            await outbox.reply(event, "渠道只能是 stable/beta/alpha")
             return
 
         if not self.config.cdk:
-            await event.reply("未设置CDK，请管理员私聊设置")
+            await outbox.reply(event, "未设置CDK，请管理员私聊设置")
             return
 
-        await event.reply(f"开始下载 {rid}...")
-
-        # 下载文件
-        type_name = "通用" if type == 0 else "win-x64"
-        filename = f"{rid}-{type_name}.zip"
-        save_path = str((self.data_dir / filename).resolve())
-
-        ok, msg, data = await download_resource(
-            rid, type, channel, self.config.cdk, save_path
-        )
+        await outbox.reply(event, f"开始下载 {rid}...")
 
-        if not ok:
-            await event.reply(f"下载失败: {msg}")
-            return
-
-        # 提示跳过下载或下载完成
-        if msg:
-            await event.reply(msg)
-
-        # 上传到群文件
-        try:
-            version = data.get("version_name", "")
-            upload_name = f"{rid}-{type_name}-{version}.zip"
-            folder_id, folder_err = await self._get_or_create_folder(str(event.group_id), f"{rid}下载")
-
-            if folder_err:
-                await event.reply(f"{folder_err}，上传到根目录")
-
-            # 检查是否已存在同名文件
-            if await self._file_exists_in_folder(str(event.group_id), folder_id, upload_name):
-                await event.reply(f"群文件已存在: {upload_name}，跳过上传")
-                return
-
-            await self.api.upload_group_file(event.group_id, save_path, upload_name, folder=folder_id)
-            await event.reply(f"上传成功: {upload_name}")
-        except Exception as e:
-            await event.reply(f"上传失败: {e}")
+        # 任务先持久化，重启后继续并把结果发到群里
+        job = UploadJob(str(event.group_id), rid, type, channel, created=int(time.time()))
+        self.store.set(self._job_key(job), job)
+        await self._run_job(job, lambda text: outbox.reply(event, text))
 
     # ========== 私聊命令 ==========
 
@@ -550,15 +546,15 @@ class MirrorChyanPlugin(NcatBotPlugin):
         """设置CDK"""
         # 只允许私聊
         if event.message_type != "private":
-            await event.reply("请私聊设置CDK")
+            await outbox.reply(event, "请私聊设置CDK")
             return
         # 只允许 root
         if not self.rbac_manager.user_has_role(str(event.user_id), "root"):
-            await event.reply("需要root权限")
+            await outbox.reply(event, "需要root权限")
             return
         self.config.cdk = cdk
         self._save_config()
-        await event.reply("CDK 设置成功")
+        await outbox.reply(event, "CDK 设置成功")
 
 
 __all__ = ["MirrorChyanPlugin"]
@@ -0,0 +1,59 @@
+"""更新说明解析"""
+
+import re
+
+
+def parse_release_note(note: str) -> str:
+    """解析并格式化更新说明"""
+    if not note:
+        return ""
+
+    # 移除 HTML 注释
+    note = re.sub(r'<!--.*?-->', '', note, flags=re.DOTALL)
+    # 移除链接但保留文字
+    note = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', note)
+    # 移除图片
+    note = re.sub(r'!\[.*?\]\(.*?\)', '', note)
+    # 移除引用块标记
+    note = re.sub(r'^>\s*', '', note, flags=re.MULTILINE)
+
+    sections = {}
+    current_section = None
+    current_items = []
+
+    for line in note.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        # 检测分类标题 (### 🐛 Bug修复)
+        if line.startswith('#'):
+            if current_section and current_items:
+                sections[current_section] = current_items
+            # 提取标题文字
+            title = re.sub(r'^#+\s*', '', line)
+            current_section = title
+            current_items = []
+        # 检测列表项 (- xxx 或 * xxx)
+        elif line.startswith(('-', '*')) and current_section:
+            item = re.sub(r'^[-*]\s*', '', line)
+            # 清理粗体/斜体
+            item = re.sub(r'\*+([^*]+)\*+', r'\1', item)
+            if item:
+                current_items.append(item)
+
+    if current_section and current_items:
+        sections[current_section] = current_items
+
+    # 格式化输出
+    result = []
+    for title, items in sections.items():
+        if items:
+            result.append(title)
+            for item in items:
+                result.append(f"  • {item}")
+
+    return '\n'.join(result) if result else "无详细说明"
+
+
+__all__ = ["parse_release_note"]
@@ -1,24 +1,120 @@
 """服务器状态查询插件"""
 
 import time
+import asyncio
 import psutil
-from ncatbot.plugin_system import NcatBotPlugin, command_registry
+from ncatbot.plugin_system import NcatBotPlugin, command_registry, param
 from ncatbot.core.event import BaseMessageEvent
+from ncatbot.utils import get_log
+
+from common.triggers import trigger_index
+from common.metrics import bot_metrics
+from common.startup import startup_profile, defer_start
+from common.outbox import outbox
+from common.shard import shard_pool
+from common.recorder import event_recorder
+from common.profiler import SamplingProfiler
+from common.memory import memory_tracker
+
+from .sampler import Sample, SystemSampler
+from .rrd import MetricStore, parse_span, sparkline
+
+# 历史指标: 名称 -> (显示名, 单位)
+HISTORY_METRICS = {
+    "cpu": ("CPU", "%"),
+    "mem": ("内存", "%"),
+    "swap": ("Swap", "%"),
+    "disk": ("磁盘", "%"),
+    "load": ("负载", ""),
+    "lag": ("事件循环延迟", "ms"),
+    "rss": ("进程内存", "MB"),
+}
+
+logger = get_log("Status")
 
 
 class StatusPlugin(NcatBotPlugin):
     name = "StatusPlugin"
-    version = "1.0.0"
+    version = "1.4.0"
     author = "Windsland52"
     dependencies = {}
 
+    HISTORY_WIDTH = 40  # 走势图字符数
+
+    @startup_profile.timed_load
+    async def on_load(self):
+        """插件加载"""
+        # 历史数据写入固定大小的环形文件，按 10 秒/1 分钟/10 分钟三档精度降采样
+        self.history = MetricStore(self.workspace / "history", list(HISTORY_METRICS))
+        # 后台定时采样，/status 直接读取最新数据
+        self.sampler = SystemSampler(on_sample=self._record_history)
+        # 机器人进程指标: 事件循环延迟、处理函数耗时和 API 等待
+        bot_metrics.install(self.api)
+        self.profiler = SamplingProfiler()
+        self._profile_task = None
+        # 事件录制默认关闭，由 /record 开启
+        event_recorder.install(self.api)
+        # 采样和延迟监测任务需在主事件循环中启动
+        defer_start(self, self._start_background)
+        # 命令回复经共享发送队列限速
+        outbox.install(self)
+
+    def _start_background(self):
+        self.sampler.start()
+        bot_metrics.start()
+        for line in startup_profile.report():
+            logger.info(f"启动耗时 {line}")
+
+    async def on_close(self, *args, **kwargs):
+        """插件卸载"""
+        if self._profile_task is not None:
+            self._profile_task.cancel()
+        await self.sampler.stop()
+        await bot_metrics.stop()
+        self.history.close()
+        event_recorder.stop()
+        if memory_tracker.running:
+            memory_tracker.stop()
+        outbox.uninstall(self)
+
+    def _record_history(self, s: Sample):
+        self.history.add(s.time, {
+            "cpu": s.cpu,
+            "mem": s.mem_percent,
+            "swap": s.swap_percent,
+            "disk": s.disk_percent,
+            "load": s.load[0],
+            "lag": bot_metrics.last_lag_ms,
+            "rss": bot_metrics.process_stats()["rss"] / 1024 / 1024,
+        })
+
+    def _format_averages(self, field: str) -> str:
+        values = [self.sampler.average(field, m * 60) for m in (1, 5, 15)]
+        return "/".join("-" if v is None else f"{v:.1f}" for v in values)
+
     @command_registry.command("status", description="查询服务器状态")
-    async def status_cmd(self, event: BaseMessageEvent):
-        """查询服务器 CPU、内存、磁盘使用率和运行时间"""
-        cpu = psutil.cpu_percent(interval=1)
-        mem = psutil.virtual_memory()
-        swap = psutil.swap_memory()
-        disk = psutil.disk_usage("/")
+    @param(name="action", default="", help="history: 查看历史走势")
+    @param(name="metric", default="cpu", help="指标: " + "/".join(HISTORY_METRICS))
+    @param(name="span", default="1h", help="时间范围，如 30m/6h/7d")
+    async def status_cmd(
+        self,
+        event: BaseMessageEvent,
+        action: str = "",
+        metric: str = "cpu",
+        span: str = "1h",
+    ):
+        """查询服务器 CPU、内存、磁盘使用率和运行时间
+
+        /status history <指标> <范围> 查看历史走势
+        """
+        if action == "history":
+            await outbox.reply(event, self._format_history(metric, span))
+            return
+        if action:
+            await outbox.reply(event, "用法: /status [history <指标> <范围>]")
+            return
+
+        s = await self.sampler.latest()
 
         uptime_seconds = time.time() - psutil.boot_time()
         days, remainder = divmod(int(uptime_seconds), 86400)
@@ -26,13 +122,148 @@ class StatusPlugin(NcatBotPlugin):
         minutes, _ = divmod(remainder, 60)
 
         status_text = (
-            f"CPU: {cpu}%\n"
-            f"内存: {mem.percent}% ({mem.used // 1024 // 1024}MB / {mem.total // 1024 // 1024}MB)\n"
-            f"Swap: {swap.percent}% ({swap.used // 1024 // 1024}MB / {swap.total // 1024 // 1024}MB)\n"
-            f"磁盘: {disk.percent}% ({disk.used // 1024 // 1024 // 1024}GB / {disk.total // 1024 // 1024 // 1024}GB)\n"
-            f"运行时间: {days}天 {hours}小时 {minutes}分钟"
+            f"CPU: {s.cpu}% (1/5/15分钟均值: {self._format_averages('cpu')}%)\n"
+            f"负载: {s.load[0]:.2f} {s.load[1]:.2f} {s.load[2]:.2f}\n"
+            f"内存: {s.mem_percent}% ({s.mem_used // 1024 // 1024}MB / {s.mem_total // 1024 // 1024}MB)"
+            f" (均值: {self._format_averages('mem_percent')}%)\n"
+            f"Swap: {s.swap_percent}% ({s.swap_used // 1024 // 1024}MB / {s.swap_total // 1024 // 1024}MB)\n"
+            f"磁盘: {s.disk_percent}% ({s.disk_used // 1024 // 1024 // 1024}GB / {s.disk_total // 1024 // 1024 // 1024}GB)\n"
+            f"运行时间: {days}天 {hours}小时 {minutes}分钟\n"
+            + "\n".join(bot_metrics.summary())
         )
-        await event.reply(status_text)
+        await outbox.reply(event, status_text)
+
+    def _format_history(self, metric: str, span: str) -> str:
+        if metric not in HISTORY_METRICS:
+            return f"未知指标: {metric}\n可用: {'/'.join(HISTORY_METRICS)}"
+        seconds = parse_span(span)
+        if not seconds:
+            return f"无效的时间范围: {span}，示例: 30m/6h/7d"
+
+        now = time.time()
+        step, values = self.history.read(metric, now - seconds, now)
+        # 合并相邻桶，压缩到走势图宽度
+        group = max(1, -(-len(values) // self.HISTORY_WIDTH))
+        points = []
+        for i in range(0, len(values), group):
+            chunk = [v for v in values[i:i + group] if v is not None]
+            points.append(sum(chunk) / len(chunk) if chunk else None)
+
+        present = [v for v in values if v is not None]
+        label, unit = HISTORY_METRICS[metric]
+        if not present:
+            return f"{label} 最近 {span} 暂无数据"
+        return (
+            f"{label} 最近 {span} (每格 {step * group}s):\n"
+            f"{sparkline(points)}\n"
+            f"最小 {min(present):.1f}{unit} 平均 {sum(present) / len(present):.1f}{unit} "
+            f"最大 {max(present):.1f}{unit}"
+        )
+
+    @command_registry.command("status_detail", description="[root] 查看各处理函数耗时明细")
+    @param(name="reset", default=False, help="查看后清空统计")
+    async def status_detail_cmd(self, event: BaseMessageEvent, reset: bool = False):
+        """按插件和处理函数列出调用次数与延迟分位数"""
+        if not self.rbac_manager.user_has_role(str(event.user_id), "root"):
+            await outbox.reply(event, "需要root权限")
+            return
+        lines = ["处理函数耗时(ms):"] + (bot_metrics.breakdown() or ["  暂无数据"])
+        lines += ["", *bot_metrics.summary(), *outbox.summary(), *shard_pool.summary()]
+        if reset:
+            bot_metrics.reset()
+            lines.append("统计已清空")
+        await outbox.reply(event, "\n".join(lines))
+
+    @command_registry.command("perf", description="[root] 查看命令与处理函数性能")
+    @param(name="action", default="top", help="top 耗时排行 / reset 清空 / profile 采样分析")
+    @param(name="seconds", default=10, help="profile 采样时长(秒)")
+    async def perf_cmd(self, event: BaseMessageEvent, action: str = "top", seconds: int = 10):
+        """按处理函数列出调用次数、墙钟/CPU 时间和 API 等待，或采样分析事件循环"""
+        if not self.rbac_manager.user_has_role(str(event.user_id), "root"):
+            await outbox.reply(event, "需要root权限")
+            return
+        if action == "top":
+            lines = bot_metrics.top()
+            await outbox.reply(event, "\n".join(["处理函数耗时(ms):"] + (lines or ["  暂无数据"])))
+        elif action == "reset":
+            bot_metrics.reset()
+            await outbox.reply(event, "性能统计已清空")
+        elif action == "profile":
+            if self.profiler.running:
+                await outbox.reply(event, "已有采样在进行中")
+                return
+            seconds = max(1, min(seconds, 120))
+            # 事件按顺序处理，采样需在后台进行，否则会阻塞后续事件
+            self._profile_task = asyncio.create_task(self._run_profile(event, seconds))
+            await outbox.reply(event, f"开始采样 {seconds}s")
+        else:
+            await outbox.reply(event, "用法: /perf [top|reset|profile <秒数>]")
+
+    async def _run_profile(self, event: BaseMessageEvent, seconds: int):
+        try:
+            await self.profiler.profile(seconds)
+            await outbox.reply(event, "\n".join(self.profiler.report()))
+        except Exception as e:
+            logger.error(f"采样分析失败: {e}")
+        finally:
+            self._profile_task = None
+
+    @command_registry.command("mem", description="[root] 查看内存分配排行")
+    @param(name="action", default="", help="start 开启追踪 / stop 关闭，不填查看报告")
+    async def mem_cmd(self, event: BaseMessageEvent, action: str = ""):
+        """tracemalloc 按插件和代码行统计分配，每次报告与上一次对比增长"""
+        if not self.rbac_manager.user_has_role(str(event.user_id), "root"):
+            await outbox.reply(event, "需要root权限")
+            return
+        rss = psutil.Process().memory_info().rss / 1024 / 1024
+        if action == "start":
+            memory_tracker.start()
+            await outbox.reply(event, f"内存追踪已开启，进程内存 {rss:.1f}MB")
+        elif action == "stop":
+            memory_tracker.stop()
+            await outbox.reply(event, "内存追踪已关闭")
+        elif action == "":
+            if not memory_tracker.running:
+                await outbox.reply(event, "内存追踪未开启，用 /mem start 开启")
+                return
+            # 快照遍历全部分配，在线程中执行避免阻塞事件循环
+            lines = await asyncio.to_thread(memory_tracker.report)
+            await outbox.reply(event, "\n".join([f"进程内存 {rss:.1f}MB"] + lines))
+        else:
+            await outbox.reply(event, "用法: /mem [start|stop]")
+
+    @command_registry.command("startup", description="[root] 查看插件启动耗时")
+    async def startup_cmd(self, event: BaseMessageEvent):
+        """查看各插件模块导入和 on_load 耗时"""
+        if not self.rbac_manager.user_has_role(str(event.user_id), "root"):
+            await outbox.reply(event, "需要root权限")
+            return
+        await outbox.reply(event, "\n".join(["插件启动耗时:"] + startup_profile.report()))
+
+    @command_registry.command("record", description="[root] 开关事件录制")
+    @param(name="action", default="", help="on 开启 / off 关闭，不填查看状态")
+    @param(name="max_mb", default=50, help="单个文件大小上限(MB)")
+    async def record_cmd(self, event: BaseMessageEvent, action: str = "", max_mb: int = 50):
+        """录制收到的事件和 API 调用，用于 tools/replay.py 离线回放分析"""
+        if not self.rbac_manager.user_has_role(str(event.user_id), "root"):
+            await outbox.reply(event, "需要root权限")
+            return
+        if action == "on":
+            event_recorder.start(self.workspace / "recordings", max_bytes=max_mb * 1024 * 1024)
+        elif action == "off":
+            event_recorder.stop()
+            await outbox.reply(event, f"录制已关闭，文件位于 {self.workspace / 'recordings'}")
+            return
+        await outbox.reply(event, event_recorder.summary())
+
+    @command_registry.command("triggers", description="[root] 查看消息监听器统计")
+    async def triggers_cmd(self, event: BaseMessageEvent):
+        """查看各 on_message 监听器的调用次数和耗时"""
+        if not self.rbac_manager.user_has_role(str(event.user_id), "root"):
+            await outbox.reply(event, "需要root权限")
+            return
+        lines = trigger_index.report()
+        await outbox.reply(event, "\n".join(["监听器统计:"] + lines) if lines else "暂无监听器")
 
 
 __all__ = ["StatusPlugin"]
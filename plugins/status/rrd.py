@@ -0,0 +1,123 @@
+"""多精度环形时间序列存储"""
+
+import re
+import mmap
+import struct
+from pathlib import Path
+from typing import Optional
+
+# 每个槽位: 桶起始时间(uint32) + 平均值(float32)
+_SLOT = struct.Struct("<If")
+
+# (步长秒, 槽位数): 10 秒 × 1 小时, 1 分钟 × 1 天, 10 分钟 × 30 天
+DEFAULT_TIERS = ((10, 360), (60, 1440), (600, 4320))
+
+_SPARK = "▁▂▃▄▅▆▇█"
+_SPAN_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_span(text: str) -> Optional[int]:
+    """解析时间范围，如 30m / 6h / 7d"""
+    match = re.fullmatch(r"(\d+)([smhd])", text.strip().lower())
+    if not match:
+        return None
+    return int(match.group(1)) * _SPAN_UNITS[match.group(2)]
+
+
+def sparkline(values: list[Optional[float]]) -> str:
+    """将数值渲染为文本走势图，缺失值显示为空格"""
+    present = [v for v in values if v is not None]
+    if not present:
+        return ""
+    low, high = min(present), max(present)
+    scale = (len(_SPARK) - 1) / (high - low) if high > low else 0
+    return "".join(
+        " " if v is None else _SPARK[int((v - low) * scale)] for v in values
+    )
+
+
+class RoundRobinSeries:
+    """单个指标的环形存储，文件大小固定，通过 mmap 读写
+
+    文件依次存放各精度的槽位。写入时每个精度维护当前桶的累加值，
+    并把当前平均值直接写入对应槽位，因此无需单独刷新。
+    """
+
+    def __init__(self, path: Path, tiers=DEFAULT_TIERS):
+        self.tiers = tiers
+        self._offsets = []
+        offset = 0
+        for _, slots in tiers:
+            self._offsets.append(offset)
+            offset += slots * _SLOT.size
+        size = offset
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a+b") as f:
+            if f.seek(0, 2) != size:
+                f.truncate(size)
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        # 每个精度当前桶的 (桶起始时间, 累加和, 数量)
+        self._acc = [(0, 0.0, 0) for _ in tiers]
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def _slot_offset(self, tier: int, bucket: int) -> int:
+        step, slots = self.tiers[tier]
+        return self._offsets[tier] + (bucket // step) % slots * _SLOT.size
+
+    def add(self, ts: float, value: float):
+        ts = int(ts)
+        for i, (step, _) in enumerate(self.tiers):
+            bucket = ts - ts % step
+            start, total, count = self._acc[i]
+            if start != bucket:
+                total, count = 0.0, 0
+            total += value
+            count += 1
+            self._acc[i] = (bucket, total, count)
+            _SLOT.pack_into(self._mm, self._slot_offset(i, bucket), bucket, total / count)
+
+    def read(self, start: float, end: float) -> tuple[int, list[Optional[float]]]:
+        """读取时间范围内的数据，自动选择能覆盖该范围的最细精度
+
+        返回 (步长, 数值列表)，缺失的桶为 None
+        """
+        span = end - start
+        tier = next(
+            (i for i, (step, slots) in enumerate(self.tiers) if step * slots >= span),
+            len(self.tiers) - 1,
+        )
+        step, slots = self.tiers[tier]
+        first = int(max(start, end - step * slots))
+        first -= first % step
+        values = []
+        for bucket in range(first, int(end) + 1, step):
+            stored_ts, value = _SLOT.unpack_from(self._mm, self._slot_offset(tier, bucket))
+            values.append(value if stored_ts == bucket else None)
+        return step, values
+
+
+class MetricStore:
+    """一组指标的环形存储，每个指标一个文件"""
+
+    def __init__(self, directory: Path, metrics: list[str], tiers=DEFAULT_TIERS):
+        self.series = {
+            name: RoundRobinSeries(directory / f"{name}.rrd", tiers) for name in metrics
+        }
+
+    def add(self, ts: float, values: dict[str, float]):
+        for name, value in values.items():
+            series = self.series.get(name)
+            if series is not None and value is not None:
+                series.add(ts, value)
+
+    def read(self, metric: str, start: float, end: float):
+        return self.series[metric].read(start, end)
+
+    def close(self):
+        for series in self.series.values():
+            series.close()
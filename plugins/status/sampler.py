@@ -0,0 +1,100 @@
+"""后台系统状态采样"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import psutil
+
+
+@dataclass
+class Sample:
+    """一次系统状态采样"""
+    time: float
+    cpu: float
+    mem_percent: float
+    mem_used: int
+    mem_total: int
+    swap_percent: float
+    swap_used: int
+    swap_total: int
+    disk_percent: float
+    disk_used: int
+    disk_total: int
+    load: tuple[float, float, float]
+
+
+def take_sample() -> Sample:
+    """采集一次系统状态（不阻塞等待 CPU 统计）"""
+    mem = psutil.virtual_memory()
+    swap = psutil.swap_memory()
+    disk = psutil.disk_usage("/")
+    load = os.getloadavg() if hasattr(os, "getloadavg") else (0.0, 0.0, 0.0)
+    return Sample(
+        time=time.time(),
+        cpu=psutil.cpu_percent(interval=None),
+        mem_percent=mem.percent,
+        mem_used=mem.used,
+        mem_total=mem.total,
+        swap_percent=swap.percent,
+        swap_used=swap.used,
+        swap_total=swap.total,
+        disk_percent=disk.percent,
+        disk_used=disk.used,
+        disk_total=disk.total,
+        load=load,
+    )
+
+
+class SystemSampler:
+    """定时采样并保存在固定大小的环形缓冲区中"""
+
+    def __init__(
+        self,
+        interval: float = 5.0,
+        window: float = 900.0,
+        on_sample: Optional[Callable[[Sample], None]] = None,
+    ):
+        self.interval = interval
+        self.on_sample = on_sample
+        self.samples: deque[Sample] = deque(maxlen=int(window // interval) + 1)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            # 首次调用 cpu_percent 只建立基准
+            psutil.cpu_percent(interval=None)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            sample = await asyncio.to_thread(take_sample)
+            self.samples.append(sample)
+            if self.on_sample is not None:
+                self.on_sample(sample)
+
+    async def latest(self) -> Sample:
+        """最新采样，尚无数据时立即采集一次"""
+        if self.samples:
+            return self.samples[-1]
+        sample = await asyncio.to_thread(take_sample)
+        self.samples.append(sample)
+        return sample
+
+    def average(self, field: str, seconds: float) -> Optional[float]:
+        """最近 seconds 秒内某项指标的平均值"""
+        cutoff = time.time() - seconds
+        values = [getattr(s, field) for s in self.samples if s.time >= cutoff]
+        if not values:
+            return None
+        return sum(values) / len(values)
@@ -1,5 +1,11 @@
-from .plugin import TodoPlugin
+import time
+
+_import_started = time.perf_counter()
+
+from common.startup import startup_profile  # noqa: E402
+from .plugin import TodoPlugin  # noqa: E402
 
 TodoPlugin.__module__ = __name__
+startup_profile.record_import(__name__, _import_started)
 
 __all__ = ["TodoPlugin"]
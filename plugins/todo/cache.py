@@ -0,0 +1,35 @@
+"""消息快照缓存"""
+
+from collections import OrderedDict
+from typing import Optional
+
+
+class MessageCache:
+    """已解析消息的 LRU 缓存，并记住已失效的消息ID"""
+
+    def __init__(self, maxsize: int = 512, dead_maxsize: int = 2048):
+        self.maxsize = maxsize
+        self.dead_maxsize = dead_maxsize
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._dead: OrderedDict[str, None] = OrderedDict()
+
+    def get(self, message_id: str) -> Optional[dict]:
+        snapshot = self._entries.get(message_id)
+        if snapshot is not None:
+            self._entries.move_to_end(message_id)
+        return snapshot
+
+    def put(self, message_id: str, snapshot: dict):
+        self._entries[message_id] = snapshot
+        self._entries.move_to_end(message_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def is_dead(self, message_id: str) -> bool:
+        return message_id in self._dead
+
+    def mark_dead(self, message_id: str):
+        self._dead[message_id] = None
+        self._dead.move_to_end(message_id)
+        while len(self._dead) > self.dead_maxsize:
+            self._dead.popitem(last=False)
@@ -0,0 +1,320 @@
+"""待办数据库"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Optional, List, Tuple
+from dataclasses import dataclass
+
+from common.store import from_data
+
+
+@dataclass(slots=True)
+class TodoItem:
+    """待办项"""
+    id: int
+    content: str  # 文本内容
+    message_id: Optional[str] = None  # 原消息ID（如果是回复添加的）
+    user_id: str = ""  # 添加者
+    create_time: int = 0
+    snapshot: Optional[str] = None  # 回复消息快照(JSON)，添加时保存
+    due_time: Optional[int] = None  # 截止时间，到期时提醒
+    reminded: bool = False  # 是否已提醒
+
+
+class TodoDB:
+    """待办数据库（WAL 模式，按群独立编号）"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _init_db(self):
+        """初始化数据库"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS todos (
+                    group_id TEXT NOT NULL,
+                    id INTEGER NOT NULL,
+                    content TEXT NOT NULL DEFAULT '',
+                    message_id TEXT,
+                    user_id TEXT NOT NULL DEFAULT '',
+                    create_time INTEGER NOT NULL DEFAULT 0,
+                    snapshot TEXT,
+                    due_time INTEGER,
+                    reminded INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (group_id, id)
+                )
+            """)
+            # 旧库补充新增列
+            columns = {r[1] for r in conn.execute("PRAGMA table_info(todos)")}
+            for name, decl in (
+                ("snapshot", "TEXT"),
+                ("due_time", "INTEGER"),
+                ("reminded", "INTEGER NOT NULL DEFAULT 0"),
+            ):
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE todos ADD COLUMN {name} {decl}")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_todos_due
+                ON todos(due_time) WHERE due_time IS NOT NULL AND reminded = 0
+            """)
+            # 每群的下一个待办编号
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS todo_counters (
+                    group_id TEXT PRIMARY KEY,
+                    next_id INTEGER NOT NULL
+                )
+            """)
+            self.fts_enabled = self._init_fts(conn)
+            conn.commit()
+
+    def _init_fts(self, conn: sqlite3.Connection) -> bool:
+        """初始化全文索引（FTS5 trigram，支持中文子串），不支持时返回 False"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'todos_fts'"
+        ).fetchone() is not None
+        try:
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts
+                USING fts5(group_id UNINDEXED, body, tokenize = 'trigram')
+            """)
+        except sqlite3.OperationalError:
+            return False
+
+        # 由触发器随增删改增量维护，rowid 与 todos 一致
+        body = "COALESCE(new.content, '') || ' ' || COALESCE(json_extract(new.snapshot, '$.text'), '')"
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN
+                INSERT INTO todos_fts (rowid, group_id, body)
+                VALUES (new.rowid, new.group_id, {body});
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN
+                DELETE FROM todos_fts WHERE rowid = old.rowid;
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS todos_fts_update
+            AFTER UPDATE OF content, snapshot ON todos BEGIN
+                UPDATE todos_fts SET body = {body} WHERE rowid = new.rowid;
+            END
+        """)
+        if not exists:
+            conn.execute("""
+                INSERT INTO todos_fts (rowid, group_id, body)
+                SELECT rowid, group_id,
+                    COALESCE(content, '') || ' ' || COALESCE(json_extract(snapshot, '$.text'), '')
+                FROM todos
+            """)
+        return True
+
+    def search(self, group_id: str, keywords: List[str], limit: int = 20) -> List[TodoItem]:
+        """按关键词搜索本群待办（所有关键词都需命中）"""
+        keywords = [k for k in keywords if k]
+        if not keywords:
+            return []
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            if self.fts_enabled and all(len(k) >= 3 for k in keywords):
+                # trigram 索引要求每个词至少 3 个字符
+                query = " AND ".join('"' + k.replace('"', '""') + '"' for k in keywords)
+                rows = conn.execute(
+                    """
+                    SELECT t.* FROM todos_fts f JOIN todos t ON t.rowid = f.rowid
+                    WHERE todos_fts MATCH ? AND f.group_id = ?
+                    ORDER BY f.rank LIMIT ?
+                    """,
+                    (query, group_id, limit),
+                ).fetchall()
+            else:
+                # 短词或不支持 FTS5 时在本群范围内逐条匹配
+                like = " AND ".join(
+                    "(t.content LIKE ? OR json_extract(t.snapshot, '$.text') LIKE ?)"
+                    for _ in keywords
+                )
+                params = [p for k in keywords for p in (f"%{k}%", f"%{k}%")]
+                rows = conn.execute(
+                    f"""
+                    SELECT t.* FROM todos t
+                    WHERE t.group_id = ? AND {like}
+                    ORDER BY t.id LIMIT ?
+                    """,
+                    (group_id, *params, limit),
+                ).fetchall()
+            return [self._row_to_item(r) for r in rows]
+
+    def migrate_from_json(self, json_path: Path) -> int:
+        """从旧版 todos.json 导入，成功后重命名为 .bak，返回导入条数"""
+        if not json_path.exists():
+            return 0
+        data = json.loads(json_path.read_text(encoding="utf-8"))
+        count = 0
+        with self._connect() as conn:
+            for group_id, items in data.items():
+                rows = [from_data(TodoItem, item) for item in items]
+                conn.executemany(
+                    """
+                    INSERT OR IGNORE INTO todos
+                    (group_id, id, content, message_id, user_id, create_time)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (group_id, r.id, r.content, r.message_id, r.user_id, r.create_time)
+                        for r in rows
+                    ],
+                )
+                if rows:
+                    conn.execute(
+                        """
+                        INSERT INTO todo_counters (group_id, next_id) VALUES (?, ?)
+                        ON CONFLICT(group_id) DO UPDATE
+                        SET next_id = MAX(next_id, excluded.next_id)
+                        """,
+                        (group_id, max(r.id for r in rows) + 1),
+                    )
+                count += len(rows)
+            conn.commit()
+        json_path.rename(json_path.with_suffix(".json.bak"))
+        return count
+
+    def add(
+        self,
+        group_id: str,
+        content: str,
+        message_id: str = None,
+        user_id: str = "",
+        create_time: int = 0,
+        snapshot: str = None,
+        due_time: int = None,
+    ) -> TodoItem:
+        """添加待办，返回带编号的待办项"""
+        with self._connect() as conn:
+            next_id = conn.execute(
+                """
+                INSERT INTO todo_counters (group_id, next_id) VALUES (?, 2)
+                ON CONFLICT(group_id) DO UPDATE SET next_id = next_id + 1
+                RETURNING next_id - 1
+                """,
+                (group_id,),
+            ).fetchone()[0]
+            item = TodoItem(
+                id=next_id,
+                content=content,
+                message_id=message_id,
+                user_id=user_id,
+                create_time=create_time,
+                snapshot=snapshot,
+                due_time=due_time,
+            )
+            conn.execute(
+                """
+                INSERT INTO todos
+                (group_id, id, content, message_id, user_id, create_time, snapshot, due_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    group_id, item.id, item.content, item.message_id,
+                    item.user_id, item.create_time, item.snapshot, item.due_time,
+                ),
+            )
+            conn.commit()
+            return item
+
+    def remove(self, group_id: str, todo_id: int) -> bool:
+        """删除待办，返回是否存在"""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "DELETE FROM todos WHERE group_id = ? AND id = ?",
+                (group_id, todo_id),
+            )
+            conn.commit()
+            return cur.rowcount > 0
+
+    def set_snapshots(self, group_id: str, snapshots: dict[int, str]):
+        """批量补存消息快照 {todo_id: snapshot}"""
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE todos SET snapshot = ? WHERE group_id = ? AND id = ?",
+                [(snap, group_id, todo_id) for todo_id, snap in snapshots.items()],
+            )
+            conn.commit()
+
+    def get_pending_reminders(self) -> List[Tuple[int, str, int]]:
+        """所有未提醒的截止时间 [(due_time, group_id, todo_id)]"""
+        with self._connect() as conn:
+            return conn.execute(
+                """
+                SELECT due_time, group_id, id FROM todos
+                WHERE due_time IS NOT NULL AND reminded = 0
+                """
+            ).fetchall()
+
+    def mark_reminded(self, group_id: str, todo_ids: List[int]) -> List[TodoItem]:
+        """标记已提醒，返回其中仍存在且未提醒过的待办"""
+        placeholders = ", ".join("?" for _ in todo_ids)
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                f"""
+                SELECT * FROM todos
+                WHERE group_id = ? AND id IN ({placeholders}) AND reminded = 0
+                ORDER BY id
+                """,
+                (group_id, *todo_ids),
+            ).fetchall()
+            conn.execute(
+                f"UPDATE todos SET reminded = 1 WHERE group_id = ? AND id IN ({placeholders})",
+                (group_id, *todo_ids),
+            )
+            conn.commit()
+            return [self._row_to_item(r) for r in rows]
+
+    def get(self, group_id: str, todo_id: int) -> Optional[TodoItem]:
+        """查询单条待办"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                "SELECT * FROM todos WHERE group_id = ? AND id = ?",
+                (group_id, todo_id),
+            ).fetchone()
+            return self._row_to_item(row) if row else None
+
+    def get_todos(
+        self, group_id: str, limit: int = -1, offset: int = 0
+    ) -> List[TodoItem]:
+        """按编号顺序列出本群待办，limit 为 -1 时不限条数"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                "SELECT * FROM todos WHERE group_id = ? ORDER BY id LIMIT ? OFFSET ?",
+                (group_id, limit, offset),
+            ).fetchall()
+            return [self._row_to_item(r) for r in rows]
+
+    def count(self, group_id: str) -> int:
+        """本群待办数量"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM todos WHERE group_id = ?", (group_id,)
+            ).fetchone()[0]
+
+    @staticmethod
+    def _row_to_item(r: sqlite3.Row) -> TodoItem:
+        return TodoItem(
+            id=r["id"],
+            content=r["content"],
+            message_id=r["message_id"],
+            user_id=r["user_id"],
+            create_time=r["create_time"],
+            snapshot=r["snapshot"],
+            due_time=r["due_time"],
+            reminded=bool(r["reminded"]),
+        )
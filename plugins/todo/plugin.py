@@ -1,27 +1,25 @@
 """Todo 插件 - 群待办功能"""
 
 import json
-from pathlib import Path
-from dataclasses import dataclass, asdict
+import asyncio
+from datetime import datetime
 from typing import Optional
 
 from ncatbot.plugin_system import NcatBotPlugin, command_registry, param, on_message
 from ncatbot.core.event import GroupMessageEvent
-from ncatbot.core.event.message_segment import Reply, Text
+from ncatbot.core.event.message_segment import Reply, Text, MessageArray
 from ncatbot.core.helper import ForwardConstructor
 from ncatbot.utils import get_log
 
-logger = get_log("Todo")
+from common.triggers import trigger_index
+from common.startup import startup_profile, defer_start
+from common.outbox import outbox
 
+from .database import TodoDB, TodoItem
+from .cache import MessageCache
+from .reminder import ReminderScheduler, parse_due
 
-@dataclass
-class TodoItem:
-    """待办项"""
-    id: int
-    content: str  # 文本内容
-    message_id: Optional[str] = None  # 原消息ID（如果是回复添加的）
-    user_id: str = ""  # 添加者
-    create_time: int = 0
+logger = get_log("Todo")
 
 
 class TodoPlugin(NcatBotPlugin):
@@ -30,50 +28,114 @@ class TodoPlugin(NcatBotPlugin):
     author = "Windsland52"
     dependencies = {}
 
+    # 获取回复消息的最大并发数
+    MSG_FETCH_CONCURRENCY = 8
+    # 分页条数 / 单条转发消息的最大节点数和估算字符数 / 发送重试次数
+    LIST_PAGE_SIZE = 30
+    FORWARD_MAX_NODES = 30
+    FORWARD_MAX_CHARS = 20000
+    FORWARD_RETRIES = 2
+
+    @startup_profile.timed_load
     async def on_load(self):
         """插件加载"""
-        self.data_path = self.workspace / "todos.json"
-        self.todos = self._load_todos()  # {group_id: [TodoItem]}
-
-    def _load_todos(self) -> dict:
-        if self.data_path.exists():
+        self.db = TodoDB(self.workspace / "todos.db")
+        self.msg_cache = MessageCache()
+        # 迁移旧版 todos.json
+        json_path = self.workspace / "todos.json"
+        if json_path.exists():
             try:
-                data = json.loads(self.data_path.read_text(encoding="utf-8"))
-                result = {}
-                for gid, items in data.items():
-                    result[gid] = [TodoItem(**item) for item in items]
-                return result
-            except Exception:
-                pass
-        return {}
-
-    def _save_todos(self):
-        data = {
-            gid: [asdict(item) for item in items]
-            for gid, items in self.todos.items()
+                count = self.db.migrate_from_json(json_path)
+                logger.info(f"已从 todos.json 迁移 {count} 条待办")
+            except Exception as e:
+                logger.error(f"todos.json 迁移失败，原文件已保留: {e}")
+
+        # 截止提醒: 从数据库重建调度堆，调度任务在主事件循环中启动
+        self.reminders = ReminderScheduler(self._fire_reminders)
+        self.reminders.load(self.db.get_pending_reminders())
+        defer_start(self, self.reminders.start)
+        # 提醒和命令回复经共享发送队列限速
+        outbox.install(self)
+
+    async def on_close(self, *args, **kwargs):
+        """插件卸载"""
+        await self.reminders.stop()
+        outbox.uninstall(self)
+
+    # ========== 截止提醒 ==========
+
+    async def _fire_reminders(self, batch: dict[str, list[int]]):
+        """发送到期提醒，同一轮到期的待办按群合并为一条消息"""
+        for group_id, todo_ids in batch.items():
+            items = self.db.mark_reminded(group_id, todo_ids)
+            if not items:
+                continue
+            lines = ["⏰ 待办到期:"]
+            for item in items:
+                text = item.content
+                if not text and item.snapshot:
+                    text = json.loads(item.snapshot).get("text", "")
+                lines.append(f"  #{item.id} {text or '[消息]'}")
+            outbox.submit(
+                group_id,
+                "\n".join(lines),
+                lambda t, gid=group_id: self.api.post_group_msg(gid, text=t),
+            )
+
+    # ========== 消息快照 ==========
+
+    async def _fetch_snapshot(self, message_id: str) -> Optional[dict]:
+        """获取消息快照，失效的消息返回 None"""
+        snapshot = self.msg_cache.get(message_id)
+        if snapshot is not None:
+            return snapshot
+        if self.msg_cache.is_dead(message_id):
+            return None
+        try:
+            msg = await self.api.get_msg(message_id)
+        except Exception as e:
+            logger.error(f"get_msg failed for {message_id}: {e}")
+            self.msg_cache.mark_dead(message_id)
+            return None
+        snapshot = {
+            "user_id": str(msg.user_id),
+            "nickname": msg.sender.nickname if msg.sender else None,
+            "message": msg.message.to_list(),
+            "text": msg.message.concatenate_text(),
         }
-        self.data_path.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
+        self.msg_cache.put(message_id, snapshot)
+        return snapshot
 
-    def _get_next_id(self, group_id: str) -> int:
-        items = self.todos.get(group_id, [])
-        if not items:
-            return 1
-        return max(item.id for item in items) + 1
+    async def _resolve_snapshots(self, group_id: str, items: list[TodoItem]) -> dict:
+        """并发补全缺少快照的待办，返回 {todo_id: snapshot}，并回写数据库"""
+        sem = asyncio.Semaphore(self.MSG_FETCH_CONCURRENCY)
+
+        async def fetch(item: TodoItem):
+            async with sem:
+                return item.id, await self._fetch_snapshot(item.message_id)
+
+        pending = [i for i in items if i.message_id and not i.snapshot]
+        results = await asyncio.gather(*(fetch(i) for i in pending))
+        resolved = {tid: snap for tid, snap in results if snap is not None}
+        if resolved:
+            self.db.set_snapshots(
+                group_id,
+                {tid: json.dumps(snap, ensure_ascii=False) for tid, snap in resolved.items()},
+            )
+        return resolved
 
     @on_message
+    @trigger_index.filter("todo_add", "/todo_add", "!todo_add")
     async def handle_todo_add(self, event: GroupMessageEvent):
-        """监听 /todo_add 命令（支持回复消息）"""
-        import time
-
+        """监听 /todo_add 命令（支持回复消息），仅在消息以命令开头时触发"""
         if not isinstance(event, GroupMessageEvent):
             return
+        with trigger_index.measure("todo_add"):
+            await self._todo_add(event)
 
-        # 检查是否包含 /todo_add 命令
-        raw = event.raw_message or ""
-        if "/todo_add" not in raw and "!todo_add" not in raw:
-            return
+    async def _todo_add(self, event: GroupMessageEvent):
+        """添加待办"""
+        import time
 
         group_id = str(event.group_id)
 
@@ -92,72 +154,174 @@ class TodoPlugin(NcatBotPlugin):
                     if text:
                         content = text
 
+        content, due_time = parse_due(content)
+
         if not content and not reply_msg_id:
-            await event.reply("请输入待办内容或回复一条消息")
+            await outbox.reply(event, "请输入待办内容或回复一条消息")
             return
 
-        if group_id not in self.todos:
-            self.todos[group_id] = []
+        # 保存回复消息快照，避免原消息过期后无法展示
+        snapshot = None
+        if reply_msg_id:
+            snap = await self._fetch_snapshot(str(reply_msg_id))
+            if snap is not None:
+                snapshot = json.dumps(snap, ensure_ascii=False)
 
-        item = TodoItem(
-            id=self._get_next_id(group_id),
+        item = self.db.add(
+            group_id,
             content=content,
             message_id=reply_msg_id,
             user_id=str(event.user_id),
             create_time=int(time.time()),
+            snapshot=snapshot,
+            due_time=due_time,
         )
-        self.todos[group_id].append(item)
-        self._save_todos()
-        await event.reply(f"已添加待办 #{item.id}")
+        if due_time is None:
+            await outbox.reply(event, f"已添加待办 #{item.id}")
+            return
+        self.reminders.add(due_time, group_id, item.id)
+        due = datetime.fromtimestamp(due_time).strftime("%m-%d %H:%M")
+        await outbox.reply(event, f"已添加待办 #{item.id}，截止 {due}")
+
+    def _build_nodes(self, items: list[TodoItem], resolved: dict) -> list[tuple]:
+        """生成转发节点 (内容, user_id, nickname, 估算字符数)"""
+        nodes = []
+        for item in items:
+            snap = None
+            if item.message_id:
+                snap = json.loads(item.snapshot) if item.snapshot else resolved.get(item.id)
+            if snap is not None:
+                size = len(json.dumps(snap["message"], ensure_ascii=False))
+                nodes.append((snap["message"], snap["user_id"], snap["nickname"], size))
+            elif item.message_id:
+                text = f"#{item.id} [消息已失效]"
+                nodes.append((text, None, None, len(text)))
+            else:
+                text = f"#{item.id} {item.content}"
+                if item.due_time:
+                    due = datetime.fromtimestamp(item.due_time).strftime("%m-%d %H:%M")
+                    text += f" (截止 {due})"
+                nodes.append((text, None, None, len(text)))
+        return nodes
+
+    def _split_chunks(self, nodes: list[tuple]) -> list[list[tuple]]:
+        """按节点数和估算大小切分为多条转发消息"""
+        chunks, current, size = [], [], 0
+        for node in nodes:
+            if current and (
+                len(current) >= self.FORWARD_MAX_NODES
+                or size + node[3] > self.FORWARD_MAX_CHARS
+            ):
+                chunks.append(current)
+                current, size = [], 0
+            current.append(node)
+            size += node[3]
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _send_chunk(self, group_id, info, chunk: list[tuple]) -> Optional[Exception]:
+        """构建并发送一条转发消息，失败时单独重试，返回最后的错误"""
+        fc = ForwardConstructor(info.user_id, info.nickname)
+        for content, user_id, nickname, _ in chunk:
+            if user_id is None:
+                fc.attach_text(content)
+            else:
+                fc.attach(MessageArray.from_list(content), user_id, nickname or info.nickname)
+        forward = fc.to_forward()
+
+        error = None
+        for attempt in range(self.FORWARD_RETRIES + 1):
+            try:
+                await self.api.post_group_forward_msg(group_id, forward)
+                return None
+            except Exception as e:
+                error = e
+                logger.error(f"post_group_forward_msg failed (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(1 + attempt)
+        return error
 
     @command_registry.command("todo_list", description="查看待办列表")
-    async def cmd_list(self, event: GroupMessageEvent):
-        """查看待办列表（转发消息展示）"""
+    @param(name="page", default=0, help="页码，不填则显示全部")
+    async def cmd_list(self, event: GroupMessageEvent, page: int = 0):
+        """查看待办列表（转发消息展示，过长时分段发送）"""
         group_id = str(event.group_id)
-        items = self.todos.get(group_id, [])
+        total = self.db.count(group_id)
 
-        if not items:
-            await event.reply("暂无待办")
+        if not total:
+            await outbox.reply(event, "暂无待办")
+            return
+
+        pages = (total + self.LIST_PAGE_SIZE - 1) // self.LIST_PAGE_SIZE
+        if page < 0 or page > pages:
+            await outbox.reply(event, f"页码超出范围，共 {pages} 页")
             return
+        if page:
+            offset, end = (page - 1) * self.LIST_PAGE_SIZE, min(page * self.LIST_PAGE_SIZE, total)
+            await outbox.reply(event, f"第 {page}/{pages} 页，共 {total} 条待办")
+        else:
+            offset, end = 0, total
 
-        # 构建转发消息
         info = await self.api.get_login_info()
-        fc = ForwardConstructor(info.user_id, info.nickname)
 
-        for item in items:
-            if item.message_id:
-                # 手动异步获取消息
-                try:
-                    msg = await self.api.get_msg(item.message_id)
-                    user_id = msg.user_id
-                    nickname = msg.sender.nickname if msg.sender else info.nickname
-                    fc.attach(msg.message, user_id, nickname)
-                except Exception as e:
-                    logger.error(f"get_msg failed for {item.message_id}: {e}")
-                    fc.attach_text(f"#{item.id} [消息已失效]")
-            else:
-                fc.attach_text(f"#{item.id} {item.content}")
+        # 按页逐批读取和解析，上一段发送的同时准备下一段
+        sending = None
+        index = 0
+        failed = []
+        while offset < end:
+            batch = self.db.get_todos(
+                group_id, limit=min(self.LIST_PAGE_SIZE, end - offset), offset=offset
+            )
+            if not batch:
+                break
+            offset += len(batch)
+            resolved = await self._resolve_snapshots(group_id, batch)
+            for chunk in self._split_chunks(self._build_nodes(batch, resolved)):
+                if sending is not None and await sending is not None:
+                    failed.append(index)
+                index += 1
+                sending = asyncio.create_task(
+                    self._send_chunk(event.group_id, info, chunk)
+                )
+        if sending is not None and await sending is not None:
+            failed.append(index)
 
-        try:
-            await self.api.post_group_forward_msg(event.group_id, fc.to_forward())
-        except Exception as e:
-            logger.error(f"post_group_forward_msg failed: {e}")
-            await event.reply(f"发送转发消息失败: {e}")
+        if failed:
+            await outbox.reply(
+                event,
+                f"发送转发消息失败: 第 {', '.join(str(i) for i in failed)} 段（共 {index} 段）",
+            )
+
+    @command_registry.command("todo_search", description="搜索待办")
+    async def cmd_search(self, event: GroupMessageEvent, keywords: str):
+        """按关键词搜索待办内容和回复消息文本，多个关键词用空格分隔（需加引号）"""
+        group_id = str(event.group_id)
+        items = self.db.search(group_id, keywords.split())
+
+        if not items:
+            await outbox.reply(event, "未找到相关待办")
+            return
+
+        lines = ["搜索结果:"]
+        for item in items:
+            text = item.content
+            if not text and item.snapshot:
+                text = json.loads(item.snapshot).get("text", "")
+            text = text or "[消息]"
+            if len(text) > 30:
+                text = text[:30] + "..."
+            lines.append(f"  #{item.id} {text}")
+        await outbox.reply(event, "\n".join(lines))
 
     @command_registry.command("todo_done", description="完成待办")
     async def cmd_done(self, event: GroupMessageEvent, id: int):
         """完成待办"""
         group_id = str(event.group_id)
-        items = self.todos.get(group_id, [])
-
-        for i, item in enumerate(items):
-            if item.id == id:
-                items.pop(i)
-                self._save_todos()
-                await event.reply(f"已完成待办 #{id}")
-                return
+        if self.db.remove(group_id, id):
+            await outbox.reply(event, f"已完成待办 #{id}")
+            return
 
-        await event.reply(f"未找到待办 #{id}")
+        await outbox.reply(event, f"未找到待办 #{id}")
 
 
 __all__ = ["TodoPlugin"]
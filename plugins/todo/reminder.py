@@ -0,0 +1,112 @@
+"""待办提醒调度"""
+
+import re
+import time
+import heapq
+import asyncio
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from ncatbot.utils import get_log
+
+logger = get_log("Todo")
+
+# 到期回调: {group_id: [todo_id]}
+FireFunc = Callable[[dict[str, list[int]]], Awaitable[None]]
+
+_DUE_PATTERN = re.compile(
+    r"\s*@(\d+[mhd]|\d{1,2}:\d{2}|\d{1,2}-\d{1,2} \d{1,2}:\d{2}|\d{4}-\d{1,2}-\d{1,2} \d{1,2}:\d{2})$"
+)
+_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def parse_due(text: str, now: Optional[datetime] = None) -> tuple[str, Optional[int]]:
+    """从待办内容末尾解析截止时间，返回 (去掉时间后的内容, 时间戳)
+
+    支持 @30m / @2h / @1d、@18:00（已过则为明天）、@10-20 18:00（已过则为明年）、
+    @2025-10-20 18:00
+    """
+    match = _DUE_PATTERN.search(text)
+    if not match:
+        return text, None
+    now = now or datetime.now()
+    spec = match.group(1)
+    try:
+        if spec[-1] in _UNITS:
+            due = now + timedelta(seconds=int(spec[:-1]) * _UNITS[spec[-1]])
+        elif " " not in spec:
+            due = datetime.combine(now.date(), datetime.strptime(spec, "%H:%M").time())
+            if due <= now:
+                due += timedelta(days=1)
+        elif spec.count("-") == 1:
+            due = datetime.strptime(f"{now.year}-{spec}", "%Y-%m-%d %H:%M")
+            if due <= now:
+                due = due.replace(year=now.year + 1)
+        else:
+            due = datetime.strptime(spec, "%Y-%m-%d %H:%M")
+    except ValueError:
+        return text, None
+    return text[:match.start()].strip(), int(due.timestamp())
+
+
+class ReminderScheduler:
+    """基于最小堆的单任务提醒调度器
+
+    所有待办的提醒共用一个堆和一个后台任务；同一轮到期的提醒按群合并后回调。
+    完成的待办不从堆中删除，由回调方在触发时过滤。
+    """
+
+    def __init__(self, fire: FireFunc):
+        self._fire = fire
+        self._heap: list[tuple[int, str, int]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def load(self, entries: list[tuple[int, str, int]]):
+        """从持久化数据重建堆 [(due_time, group_id, todo_id)]"""
+        self._heap = list(entries)
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def add(self, due_time: int, group_id: str, todo_id: int):
+        entry = (due_time, group_id, todo_id)
+        heapq.heappush(self._heap, entry)
+        # 新提醒早于当前等待目标时唤醒重新计算
+        if self._heap[0] == entry:
+            self._wakeup.set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            timeout = None
+            if self._heap:
+                timeout = max(0.0, self._heap[0][0] - time.time())
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.time()
+            batch: dict[str, list[int]] = {}
+            while self._heap and self._heap[0][0] <= now:
+                _, group_id, todo_id = heapq.heappop(self._heap)
+                batch.setdefault(group_id, []).append(todo_id)
+            try:
+                await self._fire(batch)
+            except Exception as e:
+                logger.error(f"待办提醒发送失败: {e}")
@@ -0,0 +1,724 @@
+"""插件热点路径基准测试
+
+不连接 NapCat，直接调用各插件的解析、数据库和事件处理函数，按提交保存结果，
+并可与历史结果对比找出性能回退:
+
+    python tools/bench.py run                    # 默认规模 (1e5 行)
+    python tools/bench.py run --full -k memberdb # 追加 1e6 行，只跑名称含 memberdb 的项
+    python tools/bench.py compare                # 对比最近两次结果
+    python tools/bench.py compare a1b2c3d HEAD --threshold 15
+    python tools/bench.py scale                  # 分片进程池 0..N 个进程的吞吐对比
+
+结果保存在 bench-results/<提交>.json，工作区有未提交修改时文件名带 -dirty 后缀。
+需在安装了 ncatbot 的环境中运行。
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import sqlite3
+import itertools
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "plugins"))
+
+RESULTS_DIR = ROOT / "bench-results"
+DEFAULT_ROWS = (100_000,)
+FULL_ROWS = (100_000, 1_000_000)
+GROUPS = 50
+
+# 执行 n 次被测操作
+Runner = Callable[[int], None]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[["Context"], Runner]
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(name: str):
+    def decorator(setup: Callable[["Context"], Runner]):
+        BENCHMARKS.append(Benchmark(name, setup))
+        return setup
+    return decorator
+
+
+class Context:
+    """单次运行共享的临时目录和预填充数据"""
+
+    def __init__(self, workdir: Path, rows: tuple[int, ...]):
+        self.workdir = workdir
+        self.rows = rows
+        self.loop = asyncio.new_event_loop()
+        self._member_dbs: dict[int, object] = {}
+        self._todo_dbs: dict[int, object] = {}
+
+    def path(self, name: str) -> Path:
+        return self.workdir / name
+
+    def run_async(self, make: Callable[[int], object]) -> Runner:
+        """把 make(i) 返回的协程包装为 Runner，n 次调用在同一次事件循环中完成"""
+        async def many(n: int):
+            for i in range(n):
+                await make(i)
+        return lambda n: self.loop.run_until_complete(many(n))
+
+    def member_db(self, rows: int):
+        """预填充 rows 条记录的 MemberDB，约 1/5 已退群，1/50 被踢"""
+        if rows not in self._member_dbs:
+            from groupadmin.database import MemberDB
+
+            db = MemberDB(self.path(f"members-{rows}.db"))
+            rng = random.Random(rows)
+            now = int(time.time())
+            data = []
+            for i in range(rows):
+                join_time = now - rng.randint(0, 365 * 86400)
+                left = i % 5 == 0
+                kicked = i % 50 == 0
+                data.append((
+                    str(10_000_000 + i), str(900_000 + i % GROUPS), join_time,
+                    join_time + 3600 if left else None, "37",
+                    "approve", ("kick" if kicked else "leave") if left else None,
+                ))
+            with sqlite3.connect(db.db_path) as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO members
+                    (user_id, group_id, join_time, leave_time, join_answer, join_type, leave_type)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    data,
+                )
+                conn.execute("""
+                    INSERT OR IGNORE INTO kicked_users (group_id, user_id)
+                    SELECT group_id, user_id FROM members WHERE leave_type = 'kick'
+                """)
+                conn.commit()
+            self._member_dbs[rows] = db
+        return self._member_dbs[rows]
+
+    def todo_db(self, rows: int):
+        """预填充 rows 条待办的 TodoDB，均匀分布在 GROUPS 个群中"""
+        if rows not in self._todo_dbs:
+            from todo.database import TodoDB
+
+            db = TodoDB(self.path(f"todo-{rows}.db"))
+            now = int(time.time())
+            per_group = rows // GROUPS
+            with sqlite3.connect(db.db_path) as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO todos (group_id, id, content, user_id, create_time)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (
+                        (str(900_000 + g), i + 1, f"基准测试待办 {g}-{i} 检查版本发布", "10001", now)
+                        for g in range(GROUPS) for i in range(per_group)
+                    ),
+                )
+                conn.executemany(
+                    "INSERT INTO todo_counters (group_id, next_id) VALUES (?, ?)",
+                    ((str(900_000 + g), per_group + 1) for g in range(GROUPS)),
+                )
+                conn.commit()
+            self._todo_dbs[rows] = db
+        return self._todo_dbs[rows]
+
+    def close(self):
+        self.loop.close()
+
+
+# ========== MirrorChyan ==========
+
+RELEASE_NOTE = """<!-- 自动生成 -->
+> 本次更新包含以下内容
+
+### ✨ 新功能
+- **新增** 自动战斗 [文档](https://example.com/docs)
+- 支持 *多账号* 切换
+* 优化启动速度 ![截图](https://example.com/a.png)
+
+### 🐛 Bug修复
+- 修复了某些情况下崩溃的问题
+- 修复 [#1234](https://github.com/example/repo/issues/1234)
+
+### 📝 其他
+- 更新依赖
+"""
+
+
+def _release_note_bench(repeat: int) -> Callable[["Context"], Runner]:
+    def setup(ctx: Context) -> Runner:
+        from mirrorchyan.release_note import parse_release_note
+
+        note = RELEASE_NOTE * repeat
+
+        def run(n: int):
+            for _ in range(n):
+                parse_release_note(note)
+        return run
+    return setup
+
+
+benchmark("mirrorchyan.parse_release_note[1x]")(_release_note_bench(1))
+benchmark("mirrorchyan.parse_release_note[200x]")(_release_note_bench(200))
+
+
+@benchmark("mirrorchyan.calc_sha256[64MB]")
+def bench_sha256(ctx: Context) -> Runner:
+    from mirrorchyan.api import _calc_sha256
+
+    path = ctx.path("sha256.bin")
+    with open(path, "wb") as f:
+        chunk = random.Random(0).randbytes(1024 * 1024)
+        for _ in range(64):
+            f.write(chunk)
+
+    def run(n: int):
+        for _ in range(n):
+            _calc_sha256(str(path))
+    return run
+
+
+# ========== GroupAdmin 成员数据库 ==========
+
+def _memberdb_benches(rows: int):
+    @benchmark(f"memberdb.query_user[{rows}]")
+    def query_user(ctx: Context) -> Runner:
+        db = ctx.member_db(rows)
+
+        def run(n: int):
+            for i in range(n):
+                db.get_member_records(str(900_000 + i % GROUPS), str(10_000_000 + i * 7919 % rows))
+        return run
+
+    @benchmark(f"memberdb.query_group[{rows}]")
+    def query_group(ctx: Context) -> Runner:
+        db = ctx.member_db(rows)
+
+        def run(n: int):
+            for i in range(n):
+                db.get_member_records(str(900_000 + i % GROUPS))
+        return run
+
+    @benchmark(f"memberdb.kicked_users[{rows}]")
+    def kicked_users(ctx: Context) -> Runner:
+        db = ctx.member_db(rows)
+        return lambda n: [db.get_kicked_users() for _ in range(n)]
+
+    @benchmark(f"memberdb.insert[{rows}]")
+    def insert(ctx: Context) -> Runner:
+        db = ctx.member_db(rows)
+        ids = iter(range(20_000_000, 30_000_000))
+        now = int(time.time())
+
+        def run(n: int):
+            for _ in range(n):
+                i = next(ids)
+                db.add_join_record(str(i), str(900_000 + i % GROUPS), now, "37", "approve")
+        return run
+
+    @benchmark(f"memberdb.insert_bulk_500[{rows}]")
+    def insert_bulk(ctx: Context) -> Runner:
+        db = ctx.member_db(rows)
+        ids = iter(range(30_000_000, 90_000_000))
+        now = int(time.time())
+
+        def run(n: int):
+            for _ in range(n):
+                batch = [(str(next(ids)), now) for _ in range(500)]
+                db.add_join_records_bulk("900000", batch, join_type="backfill")
+        return run
+
+    @benchmark(f"memberdb.update_leave[{rows}]")
+    def update_leave(ctx: Context) -> Runner:
+        db = ctx.member_db(rows)
+        # 只取未退群的成员，每次更新不同的人
+        users = [i for i in range(rows) if i % 5]
+        now = int(time.time())
+
+        def run(n: int):
+            for k in range(n):
+                i = users[k % len(users)]
+                db.update_leave_record(str(10_000_000 + i), str(900_000 + i % GROUPS), now, "leave")
+        return run
+
+
+# ========== Todo ==========
+
+def _todo_benches(rows: int):
+    @benchmark(f"todo.add[{rows}]")
+    def add(ctx: Context) -> Runner:
+        db = ctx.todo_db(rows)
+
+        def run(n: int):
+            for i in range(n):
+                db.add(str(900_000 + i % GROUPS), f"新待办 {i}", user_id="10001", create_time=0)
+        return run
+
+    @benchmark(f"todo.done[{rows}]")
+    def done(ctx: Context) -> Runner:
+        db = ctx.todo_db(rows)
+        per_group = rows // GROUPS
+        counter = itertools.count()
+
+        def run(n: int):
+            for _ in range(n):
+                k = next(counter)
+                db.remove(str(900_000 + k % GROUPS), per_group - k // GROUPS)
+        return run
+
+    @benchmark(f"todo.list_page[{rows}]")
+    def list_page(ctx: Context) -> Runner:
+        # 与 /todo_list <页码> 相同: 计数后取一页
+        db = ctx.todo_db(rows)
+        per_group = rows // GROUPS
+
+        def run(n: int):
+            for i in range(n):
+                group_id = str(900_000 + i % GROUPS)
+                db.count(group_id)
+                db.get_todos(group_id, limit=10, offset=(i * 10) % per_group)
+        return run
+
+    @benchmark(f"todo.search[{rows}]")
+    def search(ctx: Context) -> Runner:
+        db = ctx.todo_db(rows)
+
+        def run(n: int):
+            for i in range(n):
+                db.search(str(900_000 + i % GROUPS), ["版本发布", f"{i % GROUPS}-"])
+        return run
+
+
+for _rows in FULL_ROWS:
+    _memberdb_benches(_rows)
+    _todo_benches(_rows)
+
+
+# ========== Help ==========
+
+def _help_plugin():
+    # 导入各插件后命令注册表中即为实际的全部命令
+    import groupadmin, mirrorchyan, status, todo  # noqa: F401
+    from help.plugin import HelpPlugin
+
+    return HelpPlugin.__new__(HelpPlugin)
+
+
+@benchmark("help.build_index")
+def bench_help_index(ctx: Context) -> Runner:
+    plugin = _help_plugin()
+    return lambda n: [plugin._build_help_index() for _ in range(n)]
+
+
+@benchmark("help.match_module")
+def bench_help_match(ctx: Context) -> Runner:
+    plugin = _help_plugin()
+    lookup = plugin._build_help_index()["root"]["lookup"]
+    # 精确、前缀、模糊、无匹配各一次
+    queries = ["群管", "mirror", "groupadmn", "不存在的模块"]
+
+    def run(n: int):
+        for i in range(n):
+            plugin._match_module(lookup, queries[i % len(queries)])
+    return run
+
+
+# ========== GroupAdmin 事件处理 ==========
+
+def _groupadmin_plugin(ctx: Context, name: str):
+    """不经框架加载，直接装配事件处理所需的属性"""
+    from groupadmin.plugin import GroupAdminPlugin
+    from groupadmin.config import GroupAdminConfig, GroupRule
+    from groupadmin.database import MemberDB
+    from groupadmin.pipeline import ApprovalPipeline
+
+    async def apply(flag, approve, reason):
+        pass
+
+    plugin = GroupAdminPlugin.__new__(GroupAdminPlugin)
+    plugin.db = MemberDB(ctx.path(f"{name}.db"))
+    plugin.config = GroupAdminConfig(rules=[
+        GroupRule(group_id=str(900_000 + g), pattern=r"37|三七", auto_reject=True)
+        for g in range(GROUPS)
+    ])
+    plugin.pending_requests = {}
+    plugin._pending_dirty = False
+    plugin.held_requests = {}
+    plugin.kicked_index = plugin.db.get_kicked_users()
+    plugin.pipeline = ApprovalPipeline(apply)
+    plugin._last_activity = time.time()
+    return plugin
+
+
+@benchmark("groupadmin.handle_request")
+def bench_handle_request(ctx: Context) -> Runner:
+    plugin = _groupadmin_plugin(ctx, "ga-request")
+
+    def make(i: int):
+        # 只保留最近的待处理请求，避免缓存无限增长影响后续项
+        if len(plugin.pending_requests) > 1000:
+            plugin.pending_requests.clear()
+        return plugin.handle_group_request(SimpleNamespace(
+            is_group_request=lambda: True,
+            group_id=str(900_000 + i % GROUPS),
+            user_id=str(40_000_000 + i),
+            comment="我是37玩家" if i % 3 else "路过",
+            flag=f"bench-{i}-{time.perf_counter_ns()}",
+        ))
+    return ctx.run_async(make)
+
+
+@benchmark("groupadmin.handle_increase[pending=1000]")
+def bench_handle_increase(ctx: Context) -> Runner:
+    from groupadmin.pipeline import PendingRequest
+
+    plugin = _groupadmin_plugin(ctx, "ga-increase")
+    now = int(time.time())
+    plugin.pending_requests = {
+        f"other-{i}": PendingRequest(str(900_000 + i % GROUPS), str(50_000_000 + i), "37", now)
+        for i in range(1000)
+    }
+
+    def make(i: int):
+        group_id, user_id = str(900_000 + i % GROUPS), str(60_000_000 + i)
+        plugin.pending_requests[f"join-{i}"] = PendingRequest(group_id, user_id, "37", now)
+        return plugin.handle_group_increase(SimpleNamespace(
+            group_id=group_id, user_id=user_id, sub_type="approve", time=now + i,
+        ))
+    return ctx.run_async(make)
+
+
+@benchmark("groupadmin.handle_decrease")
+def bench_handle_decrease(ctx: Context) -> Runner:
+    plugin = _groupadmin_plugin(ctx, "ga-decrease")
+    now = int(time.time())
+
+    def make(i: int):
+        return plugin.handle_group_decrease(SimpleNamespace(
+            notice_type="group_decrease",
+            group_id=str(900_000 + i % GROUPS),
+            user_id=str(70_000_000 + i),
+            sub_type="kick" if i % 10 == 0 else "leave",
+            time=now + i,
+        ))
+    return ctx.run_async(make)
+
+
+# ========== 运行 ==========
+
+def measure(run: Runner, min_time: float, repeat: int) -> dict:
+    """先倍增次数直到单轮耗时不少于 min_time，再重复 repeat 轮，返回单次耗时统计"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        run(number)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        run(number)
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "number": number,
+        "repeat": len(samples),
+    }
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def cmd_run(args) -> int:
+    pattern = re.compile(args.filter) if args.filter else None
+    rows = FULL_ROWS if args.full else DEFAULT_ROWS
+    selected = [
+        b for b in BENCHMARKS
+        if (pattern is None or pattern.search(b.name))
+        and not any(f"[{r}]" in b.name for r in FULL_ROWS if r not in rows)
+    ]
+    if not selected:
+        print("没有匹配的基准测试")
+        return 1
+
+    commit = _git("rev-parse", "--short", "HEAD") or "unknown"
+    dirty = bool(_git("status", "--porcelain", "--untracked-files=no"))
+    results: dict[str, dict] = {}
+    skipped: dict[str, str] = {}
+    with tempfile.TemporaryDirectory(prefix="37bot-bench-") as tmp:
+        ctx = Context(Path(tmp), rows)
+        try:
+            for b in selected:
+                try:
+                    run = b.setup(ctx)
+                    results[b.name] = measure(run, args.min_time, args.repeat)
+                except Exception as e:
+                    skipped[b.name] = f"{type(e).__name__}: {e}"
+                    print(f"{b.name:<45} 跳过: {skipped[b.name]}")
+                    continue
+                r = results[b.name]
+                print(f"{b.name:<45}{_format_time(r['median']):>12}"
+                      f"  (min {_format_time(r['min'])}, {r['number']}x{r['repeat']})")
+        finally:
+            ctx.close()
+
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "subject": _git("log", "-1", "--format=%s"),
+        "time": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "full": args.full,
+        "results": results,
+        "skipped": skipped,
+    }
+    output = args.output or RESULTS_DIR / f"{commit}{'-dirty' if dirty else ''}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    # 同一提交只跑部分项时与已有结果合并
+    if output.exists() and args.filter:
+        previous = json.loads(output.read_text(encoding="utf-8"))
+        report["results"] = {**previous.get("results", {}), **results}
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n结果已保存到 {output}")
+
+    if args.baseline:
+        return compare(_load(args.baseline), report, args.threshold)
+    return 0
+
+
+def _load(ref: str) -> dict:
+    """按文件路径、提交名(可为 HEAD 等引用)或结果文件名查找"""
+    path = Path(ref)
+    if path.is_file():
+        return json.loads(path.read_text(encoding="utf-8"))
+    commit = _git("rev-parse", "--short", ref) or ref
+    for name in (f"{commit}.json", f"{commit}-dirty.json", f"{ref}.json"):
+        if (RESULTS_DIR / name).is_file():
+            return json.loads((RESULTS_DIR / name).read_text(encoding="utf-8"))
+    raise SystemExit(f"找不到结果: {ref}")
+
+
+def compare(old: dict, new: dict, threshold: float) -> int:
+    """对比两次结果各项的最快一轮，变慢超过 threshold% 视为回退，有回退时返回 1
+
+    最快一轮受调度和其它进程干扰最小，比中位数更适合判断回退。
+    """
+    print(f"\n{old['commit']}{' (dirty)' if old.get('dirty') else ''} → "
+          f"{new['commit']}{' (dirty)' if new.get('dirty') else ''}，阈值 ±{threshold:g}%")
+    if old.get("python") != new.get("python") or old.get("platform") != new.get("platform"):
+        print("注意: 两次结果的运行环境不同，对比仅供参考")
+
+    regressions = 0
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        before, after = old["results"].get(name), new["results"].get(name)
+        if after is None:
+            # 只运行了部分项
+            continue
+        if before is None:
+            print(f"{name:<45}{'':>12}{_format_time(after['min']):>12}     新增")
+            continue
+        change = (after["min"] / before["min"] - 1) * 100
+        if change > threshold:
+            mark = "回退"
+            regressions += 1
+        elif change < -threshold:
+            mark = "提升"
+        else:
+            mark = ""
+        print(f"{name:<45}{_format_time(before['min']):>12}{_format_time(after['min']):>12}"
+              f"{change:>+9.1f}%  {mark}")
+
+    if regressions:
+        print(f"\n{regressions} 项性能回退超过 {threshold:g}%")
+        return 1
+    print("\n未发现性能回退")
+    return 0
+
+
+def cmd_compare(args) -> int:
+    if args.old and args.new:
+        old, new = _load(args.old), _load(args.new)
+    else:
+        files = sorted(RESULTS_DIR.glob("*.json"), key=lambda p: json.loads(
+            p.read_text(encoding="utf-8")).get("time", 0))
+        if args.old:
+            old, new = _load(args.old), json.loads(files[-1].read_text(encoding="utf-8"))
+        elif len(files) >= 2:
+            old, new = (json.loads(p.read_text(encoding="utf-8")) for p in files[-2:])
+        else:
+            raise SystemExit("至少需要两次运行结果")
+    return compare(old, new, args.threshold)
+
+
+# ========== 分片扩展性 ==========
+
+def _scale_levels(max_workers: int) -> list[int]:
+    """0 (不分片) 加上 1, 2, 4 ... 直至 max_workers"""
+    levels, n = [0], 1
+    while n < max_workers:
+        levels.append(n)
+        n *= 2
+    levels.append(max_workers)
+    return levels
+
+
+async def _scale_round(pool, workdir: Path, files: list[Path], args) -> dict:
+    """按群混合提交校验、解析、写库和筛选任务，统计吞吐和事件循环最大延迟"""
+    from groupadmin.database import MemberDB
+    from groupadmin.pipeline import match_answer
+    from mirrorchyan.api import _calc_sha256
+    from mirrorchyan.release_note import parse_release_note
+
+    db = MemberDB(workdir / f"scale-{pool.workers}.db")
+    note = RELEASE_NOTE * 20
+    now = int(time.time())
+
+    def task(i: int):
+        group_id = str(900_000 + i % args.groups)
+        kind = i % 4
+        if kind == 0:
+            return pool.run(group_id, _calc_sha256, str(files[i % len(files)]))
+        if kind == 1:
+            return pool.run(group_id, parse_release_note, note)
+        if kind == 2:
+            return pool.call(
+                group_id, db, "add_join_record",
+                user_id=str(40_000_000 + i), group_id=group_id,
+                join_time=now + i, join_answer="37", join_type="approve",
+            )
+        return pool.run(group_id, match_answer, r"37|三七", f"我是37玩家{i}")
+
+    lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag = max(lag, time.perf_counter() - start - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    # 不分片时任务内联执行，逐个 await 与事件处理函数中的用法一致
+    if pool.enabled:
+        await asyncio.gather(*(task(i) for i in range(args.tasks)))
+    else:
+        for i in range(args.tasks):
+            await task(i)
+            await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    done = True
+    await tick
+    return {"workers": pool.workers, "seconds": elapsed, "lag": lag}
+
+
+def cmd_scale(args) -> int:
+    from common.shard import ShardPool
+
+    max_workers = args.max_workers or os.cpu_count() or 1
+    results = []
+    with tempfile.TemporaryDirectory(prefix="37bot-scale-") as tmp:
+        workdir = Path(tmp)
+        files = []
+        chunk = random.Random(0).randbytes(1024 * 1024)
+        for k in range(4):
+            path = workdir / f"scale-{k}.bin"
+            with open(path, "wb") as f:
+                for _ in range(args.file_mb):
+                    f.write(chunk)
+            files.append(path)
+
+        for workers in _scale_levels(max_workers):
+            pool = ShardPool(workers)
+            pool.start()
+            try:
+                results.append(asyncio.run(_scale_round(pool, workdir, files, args)))
+            finally:
+                pool.shutdown()
+
+    base = results[0]["seconds"]
+    print(f"{args.tasks} 个任务, {args.groups} 个群, 校验文件 {args.file_mb}MB, CPU {os.cpu_count()} 核")
+    print(f"{'进程数':>6}  {'耗时':>9}  {'任务/秒':>9}  {'加速比':>6}  {'循环最大延迟':>10}")
+    for r in results:
+        label = "不分片" if r["workers"] == 0 else str(r["workers"])
+        print(
+            f"{label:>6}  {_format_time(r['seconds']):>9}  {args.tasks / r['seconds']:9.0f}"
+            f"  {base / r['seconds']:5.2f}x  {_format_time(r['lag']):>10}"
+        )
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="37Bot 插件基准测试")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="运行基准测试并保存结果")
+    run.add_argument("-k", dest="filter", help="只运行名称匹配该正则的项")
+    run.add_argument("--full", action="store_true", help="追加 1e6 行规模的数据库测试")
+    run.add_argument("--min-time", type=float, default=0.2, help="每轮最短耗时(秒)")
+    run.add_argument("--repeat", type=int, default=5, help="重复轮数")
+    run.add_argument("--output", type=Path, help="结果文件，默认 bench-results/<提交>.json")
+    run.add_argument("--baseline", help="运行后与该提交或结果文件对比")
+    run.add_argument("--threshold", type=float, default=10.0, help="判定回退的变慢百分比")
+    run.set_defaults(func=cmd_run)
+
+    cmp = sub.add_parser("compare", help="对比两次结果，默认为最近两次")
+    cmp.add_argument("old", nargs="?", help="基准提交或结果文件")
+    cmp.add_argument("new", nargs="?", help="对比提交或结果文件，默认为最近一次")
+    cmp.add_argument("--threshold", type=float, default=10.0, help="判定回退的变慢百分比")
+    cmp.set_defaults(func=cmd_compare)
+
+    scale = sub.add_parser("scale", help="测量分片进程池在 0..N 个进程下的吞吐")
+    scale.add_argument("--max-workers", type=int, default=0, help="最大进程数，默认为 CPU 核数")
+    scale.add_argument("--tasks", type=int, default=2000, help="每档提交的任务数")
+    scale.add_argument("--groups", type=int, default=GROUPS, help="任务分布的群数")
+    scale.add_argument("--file-mb", type=int, default=4, help="每个校验文件的大小(MB)")
+    scale.set_defaults(func=cmd_scale)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
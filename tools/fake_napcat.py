@@ -0,0 +1,339 @@
+"""本地 NapCat/OneBot 11 WebSocket 模拟服务
+
+用于压测和端到端调试，机器人配置中 napcat.ws_uri 指向本服务即可:
+
+    napcat:
+      ws_uri: ws://127.0.0.1:3001
+      ws_token: NcatBot
+      remote_mode: true
+      enable_webui: false
+
+单独运行时只应答 API 调用并定时发送心跳，事件注入见 tools/loadtest.py。
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+from collections import OrderedDict
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlparse
+
+import websockets
+
+# 动作回调: (动作名, 参数, 收到时间)
+ActionListener = Callable[[str, dict, float], None]
+
+
+class FakeNapCat:
+    """模拟 NapCat 的正向 WebSocket 服务端
+
+    - 连接后立即发送 lifecycle.connect，之后定时发送心跳
+    - 应答插件用到的 API，群文件操作维护在内存中
+    - api_latency 为每次 API 应答前的模拟延迟(秒)，upload_latency 单独用于上传
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 3001,
+        token: str = "NcatBot",
+        self_id: int = 10000,
+        admins: tuple[int, ...] = (),
+        api_latency: float = 0.0,
+        upload_latency: float = 0.5,
+        heartbeat_interval: float = 30.0,
+        member_count: int = 200,
+    ):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.self_id = self_id
+        self.admins = set(admins)
+        self.api_latency = api_latency
+        self.upload_latency = upload_latency
+        self.heartbeat_interval = heartbeat_interval
+        self.member_count = member_count
+        self.listeners: list[ActionListener] = []
+        self.action_counts: dict[str, int] = {}
+
+        self._clients: set = set()
+        self._connected = asyncio.Event()
+        self._ids = itertools.count(1_000_000)
+        # 已注入/已发送的消息，供 get_msg 查询
+        self._messages: OrderedDict[int, dict] = OrderedDict()
+        # 群文件 {group_id: {folder_id: {"name": str, "files": [str]}}}，"/" 为根目录
+        self._files: dict[int, dict[str, dict]] = {}
+        self._server = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    # ========== 服务 ==========
+
+    async def start(self):
+        self._server = await websockets.serve(self._serve, self.host, self.port, max_size=2**30)
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def wait_connected(self, timeout: Optional[float] = None):
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    async def wait_disconnected(self, timeout: Optional[float] = None):
+        """等待所有客户端断开，超时不报错"""
+        deadline = time.monotonic() + (timeout or 0)
+        while self._clients and (timeout is None or time.monotonic() < deadline):
+            await asyncio.sleep(0.1)
+
+    async def _serve(self, ws, path: Optional[str] = None):
+        # websockets 新版从 request 取路径，旧版为 path 参数或属性
+        request_path = (
+            path or getattr(ws, "path", None) or getattr(getattr(ws, "request", None), "path", "")
+        )
+        token = parse_qs(urlparse(request_path).query).get("access_token", [""])[0]
+        if self.token and token != self.token:
+            await ws.send(json.dumps({"status": "failed", "retcode": 1403, "data": None}))
+            await ws.close()
+            return
+
+        await ws.send(json.dumps(self._meta("lifecycle", sub_type="connect")))
+        self._clients.add(ws)
+        self._connected.set()
+        try:
+            async for raw in ws:
+                request = json.loads(raw)
+                asyncio.create_task(self._answer(ws, request))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._clients.discard(ws)
+            if not self._clients:
+                self._connected.clear()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self.inject(self._meta(
+                "heartbeat",
+                interval=int(self.heartbeat_interval * 1000),
+                status={"online": True, "good": True},
+            ))
+
+    async def inject(self, event: dict):
+        """向所有已连接的客户端推送事件"""
+        data = json.dumps(event, ensure_ascii=False)
+        for ws in list(self._clients):
+            try:
+                await ws.send(data)
+            except websockets.ConnectionClosed:
+                self._clients.discard(ws)
+
+    # ========== 事件构造 ==========
+
+    def _base(self, post_type: str) -> dict:
+        return {"time": int(time.time()), "self_id": self.self_id, "post_type": post_type}
+
+    def _meta(self, meta_event_type: str, **fields) -> dict:
+        return {**self._base("meta_event"), "meta_event_type": meta_event_type, **fields}
+
+    def group_message(self, group_id: int, user_id: int, text: str) -> dict:
+        message_id = next(self._ids)
+        role = "owner" if user_id in self.admins else "member"
+        event = {
+            **self._base("message"),
+            "message_type": "group",
+            "sub_type": "normal",
+            "message_id": message_id,
+            "group_id": group_id,
+            "user_id": user_id,
+            "message": [{"type": "text", "data": {"text": text}}],
+            "raw_message": text,
+            "font": 14,
+            "sender": {"user_id": user_id, "nickname": f"用户{user_id}", "card": "", "role": role},
+        }
+        self._remember(message_id, event)
+        return event
+
+    def group_request(self, group_id: int, user_id: int, comment: str, flag: str) -> dict:
+        return {
+            **self._base("request"),
+            "request_type": "group",
+            "sub_type": "add",
+            "group_id": group_id,
+            "user_id": user_id,
+            "comment": comment,
+            "flag": flag,
+        }
+
+    def group_notice(self, notice_type: str, sub_type: str, group_id: int, user_id: int) -> dict:
+        """group_increase(approve/invite) 或 group_decrease(leave/kick)"""
+        return {
+            **self._base("notice"),
+            "notice_type": notice_type,
+            "sub_type": sub_type,
+            "group_id": group_id,
+            "user_id": user_id,
+            "operator_id": user_id if sub_type in ("approve", "leave") else self.self_id,
+        }
+
+    def _remember(self, message_id: int, event: dict):
+        self._messages[message_id] = event
+        if len(self._messages) > 10000:
+            self._messages.popitem(last=False)
+
+    # ========== API 应答 ==========
+
+    async def _answer(self, ws, request: dict):
+        action = request.get("action", "")
+        params = request.get("params") or {}
+        now = time.perf_counter()
+        self.action_counts[action] = self.action_counts.get(action, 0) + 1
+        for listener in self.listeners:
+            listener(action, params, now)
+
+        delay = self.upload_latency if action == "upload_group_file" else self.api_latency
+        if delay:
+            await asyncio.sleep(delay)
+        response = {**self._respond(action, params), "echo": request.get("echo")}
+        try:
+            await ws.send(json.dumps(response, ensure_ascii=False))
+        except websockets.ConnectionClosed:
+            pass
+
+    def _respond(self, action: str, params: dict) -> dict:
+        """构造应答(不含 echo)，未实现的动作返回空数据"""
+        handler = getattr(self, f"_api_{action}", None)
+        try:
+            data = handler(params) if handler else None
+            return {"status": "ok", "retcode": 0, "data": data, "message": ""}
+        except Exception as e:
+            return {"status": "failed", "retcode": 1400, "data": None, "message": str(e)}
+
+    def _sent(self, params: dict) -> dict:
+        message_id = next(self._ids)
+        self._remember(message_id, {
+            **self._base("message"),
+            "message_type": "group" if params.get("group_id") else "private",
+            "message_id": message_id,
+            "group_id": params.get("group_id"),
+            "user_id": self.self_id,
+            "message": params.get("message") or [],
+            "sender": {"user_id": self.self_id, "nickname": "37Bot"},
+        })
+        return {"message_id": message_id}
+
+    _api_send_group_msg = _sent
+    _api_send_private_msg = _sent
+    _api_send_msg = _sent
+    _api_send_group_forward_msg = _sent
+    _api_send_private_forward_msg = _sent
+    _api_send_forward_msg = _sent
+
+    def _api_get_login_info(self, params: dict) -> dict:
+        return {"user_id": self.self_id, "nickname": "37Bot"}
+
+    def _api_get_msg(self, params: dict) -> dict:
+        event = self._messages.get(int(params["message_id"]))
+        if event is None:
+            raise KeyError(f"消息不存在: {params['message_id']}")
+        return event
+
+    def _member(self, group_id: int, user_id: int) -> dict:
+        now = int(time.time())
+        return {
+            "group_id": group_id,
+            "user_id": user_id,
+            "nickname": f"用户{user_id}",
+            "card": "",
+            "sex": "unknown",
+            "age": 0,
+            "area": "",
+            "level": "1",
+            "qq_level": 1,
+            "join_time": now - random.randint(0, 365 * 86400),
+            "last_sent_time": now,
+            "title_expire_time": 0,
+            "unfriendly": False,
+            "card_changeable": True,
+            "is_robot": False,
+            "shut_up_timestamp": 0,
+            "role": "owner" if user_id in self.admins else "member",
+            "title": "",
+        }
+
+    def _api_get_group_member_info(self, params: dict) -> dict:
+        return self._member(int(params["group_id"]), int(params["user_id"]))
+
+    def _api_get_group_member_list(self, params: dict) -> list[dict]:
+        group_id = int(params["group_id"])
+        return [self._member(group_id, 20000 + i) for i in range(self.member_count)]
+
+    def _group_files(self, group_id) -> dict[str, dict]:
+        return self._files.setdefault(int(group_id), {"/": {"name": "/", "files": []}})
+
+    def _listing(self, folder: dict, folders: list) -> dict:
+        return {
+            "files": [{"file_id": f"file-{n}", "file_name": n} for n in folder["files"]],
+            "folders": folders,
+        }
+
+    def _api_get_group_root_files(self, params: dict) -> dict:
+        tree = self._group_files(params["group_id"])
+        folders = [
+            {"folder_id": fid, "folder_name": f["name"]} for fid, f in tree.items() if fid != "/"
+        ]
+        return self._listing(tree["/"], folders)
+
+    def _api_get_group_files_by_folder(self, params: dict) -> dict:
+        tree = self._group_files(params["group_id"])
+        return self._listing(tree.get(params.get("folder_id"), {"files": []}), [])
+
+    def _api_create_group_file_folder(self, params: dict) -> dict:
+        tree = self._group_files(params["group_id"])
+        tree[f"folder-{next(self._ids)}"] = {"name": params.get("folder_name", ""), "files": []}
+        return {}
+
+    def _api_upload_group_file(self, params: dict) -> dict:
+        tree = self._group_files(params["group_id"])
+        folder = tree.get(params.get("folder") or "/", tree["/"])
+        folder["files"].append(params.get("name", ""))
+        return {}
+
+
+async def _main(args):
+    server = FakeNapCat(
+        args.host, args.port, args.token,
+        admins=tuple(args.admin), api_latency=args.api_latency,
+        upload_latency=args.upload_latency, heartbeat_interval=args.heartbeat,
+    )
+    await server.start()
+    print(f"FakeNapCat 已启动: ws://{args.host}:{args.port}")
+    try:
+        await asyncio.Future()
+    finally:
+        await server.stop()
+
+
+def add_server_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3001)
+    parser.add_argument("--token", default="NcatBot")
+    parser.add_argument("--admin", type=int, action="append", default=[], help="视为群主的 QQ 号，可多次指定")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="API 应答延迟(秒)")
+    parser.add_argument("--upload-latency", type=float, default=0.5, help="上传群文件应答延迟(秒)")
+    parser.add_argument("--heartbeat", type=float, default=30.0, help="心跳间隔(秒)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 NapCat WebSocket 模拟服务")
+    add_server_args(parser)
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
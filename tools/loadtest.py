@@ -0,0 +1,233 @@
+"""机器人端到端压测
+
+启动 FakeNapCat 并等待机器人连接，按给定速率阶梯注入群消息、加群请求和
+成员变动通知，统计每个场景(插件)的吞吐、延迟分位数和超时数。
+
+    python tools/loadtest.py --rates 5,10,20,50 --duration 30
+
+延迟为注入事件到机器人发出对应 API 调用的时间: 命令以带回复引用的发消息
+调用为准，加群请求以 set_group_add_request 为准；通知和普通消息不产生
+调用，只统计注入数。
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import itertools
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_napcat import FakeNapCat, add_server_args  # noqa: E402
+
+SEND_ACTIONS = {
+    "send_group_msg", "send_msg", "send_group_forward_msg", "send_forward_msg",
+}
+
+
+@dataclass
+class Scenario:
+    name: str
+    plugin: str
+    kind: str  # message / request / notice
+    text: Optional[Callable[[int], str]] = None
+    expect: bool = True  # 是否等待机器人响应
+    setup: tuple[str, ...] = ()  # 开始前在每个群中以管理员身份发送的命令
+
+
+SCENARIOS = {
+    s.name: s for s in [
+        Scenario("status", "StatusPlugin", "message", lambda i: "/status"),
+        Scenario("help", "HelpPlugin", "message", lambda i: "/help"),
+        Scenario("todo_add", "TodoPlugin", "message", lambda i: f"/todo_add 压测待办 {i}"),
+        Scenario("todo_list", "TodoPlugin", "message", lambda i: "/todo_list 1"),
+        Scenario("mirror_list", "MirrorChyanPlugin", "message", lambda i: "/mirror_list"),
+        Scenario("ga_status", "GroupAdminPlugin", "message", lambda i: "/ga_status"),
+        Scenario("join", "GroupAdminPlugin", "request", setup=("/ga_enable", "/ga_pattern 37")),
+        Scenario("notice", "GroupAdminPlugin", "notice", expect=False),
+        Scenario("chatter", "on_message", "message", lambda i: f"闲聊消息 {i}", expect=False),
+    ]
+}
+
+
+@dataclass
+class Stats:
+    sent: int = 0
+    done: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class LoadTest:
+    def __init__(self, server: FakeNapCat, scenarios: list[Scenario], groups: int, admin: int):
+        self.server = server
+        self.scenarios = scenarios
+        self.groups = groups
+        self.admin = admin
+        self._users = itertools.count(30000)
+        # 等待响应的事件: 消息 id / 加群 flag -> (场景名, 注入时间)
+        self._pending: dict[str, tuple[str, float]] = {}
+        self._stats: dict[str, Stats] = {}
+        server.listeners.append(self._on_action)
+
+    def _group(self, scenario_index: int, i: int) -> int:
+        return 900000 + scenario_index * 1000 + i % self.groups
+
+    def _on_action(self, action: str, params: dict, now: float):
+        key = None
+        if action in SEND_ACTIONS:
+            for seg in params.get("message") or []:
+                if isinstance(seg, dict) and seg.get("type") == "reply":
+                    key = str(seg.get("data", {}).get("id"))
+                    break
+        elif action == "set_group_add_request":
+            key = str(params.get("flag"))
+        entry = self._pending.pop(key, None) if key else None
+        if entry is not None:
+            name, started = entry
+            stats = self._stats[name]
+            stats.done += 1
+            stats.latencies.append((now - started) * 1000)
+
+    async def setup(self):
+        for index, scenario in enumerate(self.scenarios):
+            for g in range(self.groups if scenario.setup else 0):
+                for text in scenario.setup:
+                    event = self.server.group_message(self._group(index, g), self.admin, text)
+                    await self.server.inject(event)
+        await asyncio.sleep(1)
+
+    async def _inject(self, index: int, scenario: Scenario, i: int):
+        group_id = self._group(index, i)
+        user_id = next(self._users)
+        if scenario.kind == "message":
+            event = self.server.group_message(group_id, user_id, scenario.text(i))
+            key = str(event["message_id"])
+        elif scenario.kind == "request":
+            key = f"loadtest-{user_id}"
+            event = self.server.group_request(group_id, user_id, "37", key)
+        else:
+            notice_type, sub_type = (
+                ("group_increase", "approve") if i % 2 == 0 else ("group_decrease", "leave")
+            )
+            event = self.server.group_notice(notice_type, sub_type, group_id, 20000 + i % 500)
+            key = None
+        stats = self._stats[scenario.name]
+        stats.sent += 1
+        if scenario.expect and key:
+            self._pending[key] = (scenario.name, time.perf_counter())
+        elif not scenario.expect:
+            stats.done += 1
+        await self.server.inject(event)
+
+    async def run_step(self, rate: float, duration: float, timeout: float) -> dict:
+        self._stats = {s.name: Stats() for s in self.scenarios}
+        self._pending.clear()
+        start = time.perf_counter()
+        total = int(rate * duration)
+        for i in range(total):
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            index = i % len(self.scenarios)
+            await self._inject(index, self.scenarios[index], i // len(self.scenarios))
+        offered = total / (time.perf_counter() - start)
+
+        # 等待剩余响应
+        deadline = time.perf_counter() + timeout
+        while self._pending and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - start
+
+        result = {"rate": rate, "offered": round(offered, 2), "scenarios": {}}
+        for scenario in self.scenarios:
+            stats = self._stats[scenario.name]
+            result["scenarios"][scenario.name] = {
+                "plugin": scenario.plugin,
+                "sent": stats.sent,
+                "done": stats.done,
+                "timeouts": stats.sent - stats.done,
+                "throughput": round(stats.done / elapsed, 2),
+                "p50": round(stats.percentile(50), 1),
+                "p95": round(stats.percentile(95), 1),
+                "p99": round(stats.percentile(99), 1),
+                "max": round(max(stats.latencies, default=0.0), 1),
+            }
+        return result
+
+
+def print_step(result: dict):
+    print(f"\n=== 目标 {result['rate']}/s, 实际注入 {result['offered']}/s ===")
+    print(f"{'场景':<12}{'插件':<20}{'注入':>6}{'完成':>6}{'超时':>6}{'吞吐/s':>8}"
+          f"{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name, s in result["scenarios"].items():
+        print(f"{name:<12}{s['plugin']:<20}{s['sent']:>6}{s['done']:>6}{s['timeouts']:>6}"
+              f"{s['throughput']:>8}{s['p50']:>8}ms{s['p95']:>7}ms{s['p99']:>7}ms{s['max']:>7}ms")
+
+
+def saturated(result: dict, p99_limit: float) -> bool:
+    """出现超时或任一场景 p99 超过阈值即视为饱和"""
+    return any(s["timeouts"] or s["p99"] > p99_limit for s in result["scenarios"].values())
+
+
+async def main(args):
+    names = args.scenarios.split(",")
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"未知场景: {', '.join(unknown)}，可用: {', '.join(SCENARIOS)}")
+
+    admins = tuple(args.admin) or (10001,)
+    server = FakeNapCat(
+        args.host, args.port, args.token,
+        admins=admins, api_latency=args.api_latency,
+        upload_latency=args.upload_latency, heartbeat_interval=args.heartbeat,
+    )
+    await server.start()
+    print(f"FakeNapCat 已启动: ws://{args.host}:{args.port}，等待机器人连接...")
+    await server.wait_connected()
+    # 等待插件处理启动事件
+    await asyncio.sleep(args.warmup)
+
+    test = LoadTest(server, [SCENARIOS[n] for n in names], args.groups, admins[0])
+    await test.setup()
+    results = []
+    for rate in (float(r) for r in args.rates.split(",")):
+        result = await test.run_step(rate, args.duration, args.timeout)
+        results.append(result)
+        print_step(result)
+        if saturated(result, args.p99_limit):
+            print(f"\n在 {rate}/s 达到饱和 (出现超时或 p99 > {args.p99_limit}ms)")
+            break
+        await asyncio.sleep(args.cooldown)
+
+    print(f"\nAPI 调用次数: {json.dumps(server.action_counts, ensure_ascii=False)}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="37Bot 端到端压测")
+    add_server_args(parser)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="逗号分隔的场景名")
+    parser.add_argument("--rates", default="5,10,20,50,100", help="逗号分隔的注入速率阶梯(事件/秒)")
+    parser.add_argument("--duration", type=float, default=30.0, help="每级持续时间(秒)")
+    parser.add_argument("--groups", type=int, default=20, help="每个场景使用的群数量")
+    parser.add_argument("--timeout", type=float, default=10.0, help="每级结束后等待响应的时间(秒)")
+    parser.add_argument("--p99-limit", type=float, default=2000.0, help="判定饱和的 p99 阈值(毫秒)")
+    parser.add_argument("--warmup", type=float, default=3.0, help="连接后等待插件就绪的时间(秒)")
+    parser.add_argument("--cooldown", type=float, default=5.0, help="各级之间的间隔(秒)")
+    parser.add_argument("--json", help="结果另存为 JSON 文件")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,217 @@
+"""录制回放与性能分析
+
+把 /record 录制的事件按原始节奏(或加速)重新送入机器人，API 调用优先使用
+录制中参数相同的应答，没有则由 FakeNapCat 生成。机器人在本进程内运行，
+可开启 cProfile 或 tracemalloc:
+
+    python tools/replay.py data/StatusPlugin/recordings --speed 60 --profile cpu
+
+需在机器人目录下运行(读取 config.yaml 和 plugins/)。回放会写入各插件的
+数据目录，建议在副本中运行。
+"""
+
+import sys
+import json
+import time
+import pstats
+import _thread
+import asyncio
+import cProfile
+import argparse
+import threading
+import tracemalloc
+from collections import deque
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT.parent / "plugins"))
+
+from fake_napcat import FakeNapCat  # noqa: E402
+from common.recorder import read_records  # noqa: E402
+
+
+def _key(action: str, params: dict) -> str:
+    return action + json.dumps(params, ensure_ascii=False, sort_keys=True)
+
+
+class ReplayServer(FakeNapCat):
+    """按录制内容应答 API 的模拟服务"""
+
+    def __init__(self, records, use_recorded_latency: bool = False, speed: float = 1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.events: list[tuple[float, dict]] = []
+        self._recorded: dict[str, deque] = {}
+        self._latency: dict[str, deque] = {}
+        self.use_recorded_latency = use_recorded_latency
+        self.speed = speed
+        self.replayed = 0
+        self.recorded_hits = 0
+        self.synthesized = 0
+        self.last_action = time.monotonic()
+        for record in records:
+            if "e" in record:
+                if record["e"].get("post_type") != "meta_event":
+                    self.events.append((record["t"], record["e"]))
+            elif "a" in record:
+                key = _key(record["a"], record.get("p") or {})
+                self._recorded.setdefault(key, deque()).append(record["r"])
+                self._latency.setdefault(key, deque()).append(record.get("ms", 0))
+
+    def _respond(self, action: str, params: dict) -> dict:
+        self.last_action = time.monotonic()
+        responses = self._recorded.get(_key(action, params))
+        if responses:
+            # 循环使用，同一调用多次出现时依次返回
+            response = responses[0]
+            responses.rotate(-1)
+            self.recorded_hits += 1
+            return response
+        self.synthesized += 1
+        return super()._respond(action, params)
+
+    async def _answer(self, ws, request: dict):
+        if self.use_recorded_latency:
+            latencies = self._latency.get(_key(request.get("action", ""), request.get("params") or {}))
+            if latencies:
+                await asyncio.sleep(latencies[0] / 1000 / (self.speed or 1))
+                latencies.rotate(-1)
+        await super()._answer(ws, request)
+
+    async def replay(self):
+        """按录制时间间隔除以 speed 推送事件，speed 为 0 时不等待"""
+        # drain 从最后一个事件或 API 调用开始计时，不计入预热期间
+        self.last_action = time.monotonic()
+        if not self.events:
+            return
+        first = self.events[0][0]
+        start = time.monotonic()
+        for t, event in self.events:
+            if self.speed:
+                delay = start + (t - first) / self.speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await self.inject(event)
+            self.replayed += 1
+            self.last_action = time.monotonic()
+
+
+def run_server(args, records, done: threading.Event, result: dict):
+    interrupted = False
+
+    def stop_bot():
+        # 结束机器人主循环，框架收到 KeyboardInterrupt 后卸载插件
+        nonlocal interrupted
+        if not interrupted:
+            interrupted = True
+            _thread.interrupt_main()
+
+    async def main():
+        server = ReplayServer(
+            records, use_recorded_latency=args.recorded_latency, speed=args.speed,
+            host="127.0.0.1", port=args.port, token=args.token,
+        )
+        await server.start()
+        await server.wait_connected()
+        await asyncio.sleep(args.warmup)
+
+        start = time.monotonic()
+        await server.replay()
+        # 等待机器人处理完剩余事件: 连续 drain 秒没有 API 调用
+        while time.monotonic() - server.last_action < args.drain:
+            await asyncio.sleep(0.2)
+        elapsed = time.monotonic() - start
+
+        if tracemalloc.is_tracing():
+            result["snapshot"] = tracemalloc.take_snapshot()
+            result["peak"] = tracemalloc.get_traced_memory()[1]
+        span = server.events[-1][0] - server.events[0][0] if server.events else 0
+        result.update(
+            replayed=server.replayed, elapsed=elapsed, span=span,
+            recorded_hits=server.recorded_hits, synthesized=server.synthesized,
+            actions=server.action_counts,
+        )
+        # 先让机器人退出再关闭服务，否则适配器会把断开当作 NapCat 异常关闭
+        stop_bot()
+        await server.wait_disconnected(args.drain + 10)
+        await server.stop()
+
+    try:
+        asyncio.run(main())
+    finally:
+        done.set()
+        stop_bot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放录制的事件并分析性能")
+    parser.add_argument("path", type=Path, help="录制文件或目录")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，0 为不等待")
+    parser.add_argument("--profile", choices=("none", "cpu", "mem"), default="none")
+    parser.add_argument("--output", type=Path, default=Path("replay.prof"), help="cProfile 结果文件")
+    parser.add_argument("--top", type=int, default=30, help="报告条目数")
+    parser.add_argument("--recorded-latency", action="store_true", help="按录制的 API 耗时(除以倍速)延迟应答")
+    parser.add_argument("--port", type=int, default=3099)
+    parser.add_argument("--token", default="replay")
+    parser.add_argument("--warmup", type=float, default=3.0, help="连接后等待插件就绪的时间(秒)")
+    parser.add_argument("--drain", type=float, default=3.0, help="回放结束后无 API 调用多久视为处理完毕(秒)")
+    args = parser.parse_args()
+
+    records = list(read_records(args.path))
+    print(f"已读取 {len(records)} 条记录")
+
+    done = threading.Event()
+    result: dict = {}
+    threading.Thread(target=run_server, args=(args, records, done, result), daemon=True).start()
+
+    from ncatbot.core import BotClient
+    from ncatbot.utils import NcatBotConnectionError
+
+    bot = BotClient()
+    profiler = cProfile.Profile() if args.profile == "cpu" else None
+    if args.profile == "mem":
+        tracemalloc.start(25)
+    if profiler:
+        profiler.enable()
+    try:
+        bot.run_frontend(
+            ws_uri=f"ws://127.0.0.1:{args.port}",
+            ws_token=args.token,
+            remote_mode=True,
+            enable_webui=False,
+        )
+    except KeyboardInterrupt:
+        pass
+    except NcatBotConnectionError as e:
+        # 回放服务提前退出(例如回放线程出错)
+        print(f"与回放服务的连接已断开: {e}")
+    finally:
+        if profiler:
+            profiler.disable()
+    done.wait()
+
+    if not result:
+        print("回放未完成")
+        return
+    speedup = result["span"] / result["elapsed"] if result["elapsed"] else 0
+    print(
+        f"\n回放 {result['replayed']} 个事件，录制跨度 {result['span']:.0f}s，"
+        f"耗时 {result['elapsed']:.1f}s (约 {speedup:.1f} 倍速)"
+    )
+    print(f"API 应答: 录制 {result['recorded_hits']} 次，模拟 {result['synthesized']} 次")
+    print(f"API 调用: {json.dumps(result['actions'], ensure_ascii=False)}")
+
+    if profiler:
+        profiler.dump_stats(args.output)
+        print(f"\ncProfile 结果已保存到 {args.output}")
+        stats = pstats.Stats(profiler).strip_dirs()
+        stats.sort_stats("cumulative").print_stats(args.top)
+        stats.sort_stats("tottime").print_stats(args.top)
+    if "snapshot" in result:
+        print(f"\n内存峰值: {result['peak'] / 1024 / 1024:.1f}MB，分配最多的位置:")
+        for stat in result["snapshot"].statistics("lineno")[:args.top]:
+            print(f"  {stat}")
+
+
+if __name__ == "__main__":
+    main()